@@ -1,7 +1,9 @@
 import json
 import os
+import re
+import bisect
 from datetime import datetime
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
 import bson
 from bson import ObjectId
 
@@ -106,24 +108,55 @@ def handle_get_backlinks(db, data, headers):
         query['vendorName'] = data['vendorName']
     
     limit = int(data.get('limit', 10000))
-    skip = int(data.get('skip', 0))
-    backlinks = list(db.backlinks.find(query).sort("createdAt", -1).skip(skip).limit(limit))
+    paged = 'cursor' in data
+    if paged:
+        # Keyset pagination on _id (newest first): each page is an index range scan from
+        # the previous page's last _id, however deep into the campaign it is. An empty
+        # cursor starts from the top; the response carries nextCursor (None at the end).
+        cursor = data.get('cursor')
+        if cursor:
+            if not ObjectId.is_valid(cursor):
+                return response(400, "Invalid cursor", headers)
+            query['_id'] = {"$lt": ObjectId(cursor)}
+        backlinks = list(db.backlinks.find(query).sort("_id", -1).limit(limit))
+    else:
+        skip = int(data.get('skip', 0))
+        backlinks = list(db.backlinks.find(query).sort("createdAt", -1).skip(skip).limit(limit))
+    next_cursor = str(backlinks[-1]['_id']) if paged and len(backlinks) == limit else None
     
-    # Apply pricing rules if cost is missing
-    pricing_rules = list(db.vendor_pricing.find({}))
+    # Apply pricing rules if cost is missing. Imports and bulk pricing write the cost onto
+    # the links themselves, so this only fills older links saved before their rule existed.
+    pricing = None
     for b in backlinks:
         if '_id' in b: b['_id'] = str(b['_id'])
         if not b.get('cost') or b.get('cost') == 0:
-            for rule in pricing_rules:
-                if b.get('vendorName') == rule.get('vendorName'):
-                    if rule.get('startDate') <= b.get('createdAt') <= rule.get('endDate'):
-                        b['cost'] = rule.get('cost')
-                        break
+            if pricing is None:
+                pricing = _pricing_index(db.vendor_pricing.find({}))
+            cost = _rule_cost(pricing, b.get('vendorName'), b.get('createdAt'))
+            if cost is not None:
+                b['cost'] = cost
     
+    if paged:
+        return response(200, {"backlinks": backlinks, "nextCursor": next_cursor}, headers)
     return response(200, backlinks, headers)
 
 def handle_upsert_backlink(db, data, user, headers):
     bid = data.get('id')
+    # Price an incoming link without a cost (sheet imports send 0) from the vendor's
+    # pricing rule now, so listing doesn't have to resolve it on every read. costSource
+    # records whether a cost came from a rule (re-resolved if the vendor changes) or
+    # was entered by hand (left alone).
+    if 'cost' in data:
+        rule = None
+        if data.get('vendorName') and data.get('createdAt'):
+            rule = _rule_cost(_pricing_index(_vendor_rules(db, data['vendorName'])),
+                              data['vendorName'], data['createdAt'])
+        if not data.get('cost') and rule is not None:
+            data['cost'] = rule
+        if data.get('cost'):
+            data['costSource'] = 'rule' if data['cost'] == rule else 'manual'
+        else:
+            data.pop('costSource', None)
     if bid:
         # Get importId before update if not provided
         import_id = data.get('importId')
@@ -205,9 +238,36 @@ def handle_update_import_vendor(db, data, user, headers):
     db.import_history.update_one({"id": import_id}, {"$set": {"vendorName": vendor_name}})
     
     # Update all backlinks associated with this import
+    links = list(db.backlinks.find({"importId": import_id, "deleted": {"$ne": True}},
+                                   {"_id": 1, "id": 1, "vendorName": 1, "createdAt": 1,
+                                    "cost": 1, "costSource": 1}))
     db.backlinks.update_many({"importId": import_id}, {"$set": {"vendorName": vendor_name}})
     
-    return response(200, {"success": True}, headers)
+    # Re-price the links whose cost came from the old vendor's rules (or that had none).
+    # Links from before costSource existed count as rule-priced when their cost still
+    # matches the old vendor's rule. Hand-entered costs are kept.
+    old_vendors = {l.get('vendorName') for l in links if l.get('vendorName')}
+    old_index = _pricing_index(r for v in old_vendors for r in _vendor_rules(db, v))
+    new_index = _pricing_index(_vendor_rules(db, vendor_name))
+    ops, costs = [], {}
+    for l in links:
+        source = l.get('costSource')
+        if l.get('cost') and source != 'rule' and (
+                source == 'manual'
+                or l['cost'] != _rule_cost(old_index, l.get('vendorName'), l.get('createdAt'))):
+            continue
+        cost = _rule_cost(new_index, vendor_name, l.get('createdAt'))
+        if cost:
+            update = {"$set": {"cost": cost, "costSource": "rule"}}
+        else:
+            cost, update = 0, {"$set": {"cost": 0}, "$unset": {"costSource": ""}}
+        if cost != l.get('cost'):
+            costs[l.get('id')] = cost
+        ops.append(UpdateOne({"_id": l['_id']}, update))
+    if ops:
+        db.backlinks.bulk_write(ops, ordered=False)
+    
+    return response(200, {"success": True, "costs": costs}, headers)
 
 def handle_delete_import(db, data, user, headers):
     import_id = data.get('id')
@@ -226,16 +286,20 @@ def handle_bulk_update_pricing(db, data, current_user, headers):
     if not vendor_name or not start_date or not end_date:
         return response(400, "Missing required parameters", headers)
     
-    # Update existing backlinks
-    import re
+    # Update existing backlinks. createdAt is an ISO string on imported links but a
+    # datetime on ones added individually, and a range only matches its own BSON type.
     v_name = vendor_name.strip()
+    in_range = [{"createdAt": {"$gte": start_date, "$lte": end_date}}]
+    start_dt, end_dt = _iso_datetime(start_date), _iso_datetime(end_date)
+    if start_dt and end_dt:
+        in_range.append({"createdAt": {"$gte": start_dt, "$lte": end_dt}})
     query = {
         "vendorName": {"$regex": f"^{re.escape(v_name)}$", "$options": "i"},
-        "createdAt": {"$gte": start_date, "$lte": end_date},
+        "$or": in_range,
         "deleted": {"$ne": True}
     }
     
-    result = db.backlinks.update_many(query, {"$set": {"cost": cost}})
+    result = db.backlinks.update_many(query, {"$set": {"cost": cost, "costSource": "rule"}})
     
     # Persist the pricing rule for future imports/consistency
     db.vendor_pricing.update_one(
@@ -260,6 +324,64 @@ def handle_bulk_update_pricing(db, data, current_user, headers):
     
     return response(200, {"success": True, "count": result.modified_count}, headers)
 
+# --- Vendor pricing ---
+# A vendor_pricing rule prices a vendor's links created within [startDate, endDate]
+# (ISO-string bounds, see handle_bulk_update_pricing). Rules are indexed per vendor by
+# start date so a link's rule is found with a bisect instead of a scan of every rule.
+
+def _vendor_key(name):
+    # Same matching as bulk_update_pricing: trimmed, case-insensitive.
+    return (name or '').strip().lower()
+
+def _vendor_rules(db, vendor_name):
+    return db.vendor_pricing.find(
+        {"vendorName": {"$regex": f"^\\s*{re.escape(vendor_name.strip())}\\s*$", "$options": "i"}})
+
+def _date_key(value):
+    """createdAt as a string comparable with rule bounds (links added individually carry a
+    datetime rather than the ISO string imports send)."""
+    if isinstance(value, datetime):
+        return value.isoformat(timespec='milliseconds') + 'Z'
+    return value if isinstance(value, str) else None
+
+def _iso_datetime(value):
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except (AttributeError, ValueError):
+        return None
+
+def _pricing_index(rules):
+    """{vendor key: (start dates, running max of end dates, rules)}, all sorted by start."""
+    by_vendor = {}
+    for r in rules:
+        if isinstance(r.get('startDate'), str) and isinstance(r.get('endDate'), str):
+            by_vendor.setdefault(_vendor_key(r.get('vendorName')), []).append(r)
+    index = {}
+    for vendor, rs in by_vendor.items():
+        rs.sort(key=lambda r: (r['startDate'], str(r.get('updatedAt') or '')))
+        max_end, reach = [], ''
+        for r in rs:
+            reach = max(reach, r['endDate'])
+            max_end.append(reach)
+        index[vendor] = ([r['startDate'] for r in rs], max_end, rs)
+    return index
+
+def _rule_cost(index, vendor_name, created_at):
+    """Cost from the rule covering `created_at` for this vendor, or None. Where rules
+    overlap, the one starting latest (then updated last) wins."""
+    entry = index.get(_vendor_key(vendor_name))
+    when = _date_key(created_at)
+    if not entry or not when:
+        return None
+    starts, max_end, rules = entry
+    i = bisect.bisect_right(starts, when) - 1
+    # Walk back only while some earlier rule still reaches this date.
+    while i >= 0 and max_end[i] >= when:
+        if when <= rules[i]['endDate']:
+            return rules[i].get('cost')
+        i -= 1
+    return None
+
 # --- Helpers ---
 
 class JSONEncoder(json.JSONEncoder):
@@ -1,11 +1,13 @@
 import json
 import os
+import hashlib
 from datetime import datetime
 import uuid
 import certifi
 import urllib.request
 import urllib.parse
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
 import bson
 from bson import ObjectId
 
@@ -16,6 +18,42 @@ MONGODB_DATABASE = 'chatbot_ai_db'
 # Global client to reuse connection
 client = None
 
+# Guard metadata kept on every conversation doc (see _thread_meta) and read back by
+# the save guards. Together with conversationId these make up the conv_guard index,
+# so _stored_copies is answered from the index without touching the documents.
+_GUARD_FIELDS = ("userId", "rev", "msgCount", "firstUserHash", "firstUserIdx", "lastUpdated")
+# History sidebar listing fields, likewise covered by user_history.
+_LIST_FIELDS = ("conversationId", "userId", "title", "lastUpdated", "mode")
+
+CONVERSATION_INDEXES = [
+    # Dedup key: a save upserts on (conversationId, userId), so this is the one doc per
+    # owner per thread. Drifted userId spellings are still separate docs (the guards
+    # look across them), but two concurrent first saves can no longer both insert.
+    ([("conversationId", ASCENDING), ("userId", ASCENDING)], {"name": "conv_user", "unique": True}),
+    ([("conversationId", ASCENDING)] + [(f, ASCENDING) for f in _GUARD_FIELDS], {"name": "conv_guard"}),
+    ([("userId", ASCENDING), ("lastUpdated", DESCENDING)]
+     + [(f, ASCENDING) for f in ("conversationId", "title", "mode")], {"name": "user_history"}),
+]
+_indexes_checked = False
+
+def _check_indexes(db):
+    """Once per container, warn if any conversations index is missing. Indexes are
+    built by the deploy step (scripts/migrations/conversation_indexes.py), never here:
+    a build on cold start would stall the first request. Without conv_user two
+    concurrent first saves can both insert, and without the covered indexes the
+    guard/listing reads fall back to scans — slower, but still correct."""
+    global _indexes_checked
+    if _indexes_checked:
+        return
+    _indexes_checked = True
+    try:
+        existing = db.conversations.index_information()
+        missing = [opts['name'] for _, opts in CONVERSATION_INDEXES if opts['name'] not in existing]
+        if missing:
+            print(f"conversations indexes missing: {missing} — run scripts/migrations/conversation_indexes.py --apply")
+    except Exception as e:
+        print(f"Index check failed: {str(e)}")
+
 def get_db():
     global client
     if client is None:
@@ -28,7 +66,9 @@ def get_db():
             client = None
             print(f"MongoDB connection error: {str(e)}")
             raise
-    return client[MONGODB_DATABASE]
+    db = client[MONGODB_DATABASE]
+    _check_indexes(db)
+    return db
 
 def lambda_handler(event, context):
     headers = {
@@ -102,6 +142,89 @@ def _first_user_content(msgs):
             return c if isinstance(c, str) else json.dumps(c, sort_keys=True, default=str)
     return ''
 
+def _first_user_hash(content):
+    """Hash of a normalised first-user-message string ('' stays '', meaning "no user message")."""
+    content = (content or '').strip()
+    return hashlib.sha1(content.encode('utf-8')).hexdigest() if content else ''
+
+def _thread_meta(msgs):
+    """Guard metadata stored alongside `messages` on every save, so the data-loss guards
+    can compare threads without reading the arrays back: message count, a hash of the
+    first user message, and that message's index (-1 if there isn't one yet)."""
+    msgs = msgs or []
+    idx = next((i for i, m in enumerate(msgs) if isinstance(m, dict) and m.get('role') == 'user'), -1)
+    return {
+        "msgCount": len(msgs),
+        "firstUserHash": _first_user_hash(_first_user_content(msgs[idx:idx + 1])) if idx >= 0 else '',
+        "firstUserIdx": idx,
+    }
+
+def _stored_copies(db, conv_id):
+    """Guard metadata for every stored copy of `conv_id` (drifted userId dupes included).
+    A covered read on conv_guard — `messages` is never loaded. Copies written before the
+    metadata existed are backfilled once (_backfill_meta) and then read the same way."""
+    proj = {"_id": 0, **{f: 1 for f in _GUARD_FIELDS}}
+    copies = list(db.conversations.find({"conversationId": conv_id}, proj))
+    if any(c.get('firstUserHash') is None or c.get('msgCount') is None for c in copies):
+        computed = _backfill_meta(db, conv_id)
+        copies = list(db.conversations.find({"conversationId": conv_id}, proj))
+        for c in copies:
+            if c.get('firstUserHash') is None and c.get('userId') in computed:
+                c.update(computed[c.get('userId')])   # backfill write didn't stick; use it in memory
+    for c in copies:
+        c['rev'] = int(c.get('rev') or 0)
+        c['msgCount'] = int(c.get('msgCount') or 0)
+        if c.get('firstUserHash') is None:
+            c['firstUserHash'], c['firstUserIdx'] = '', None
+    return copies
+
+def _backfill_meta(db, conv_id):
+    """Compute guard metadata in the pipeline for copies of `conv_id` that predate it and
+    store it on them — only where still missing, so a concurrent save's values win.
+    Returns {userId: meta} for what it computed."""
+    roles = {"$map": {"input": {"$ifNull": ["$messages", []]}, "in": "$$this.role"}}
+    computed = {}
+    for c in db.conversations.aggregate([
+        {"$match": {"conversationId": conv_id, "firstUserHash": {"$exists": False}}},
+        {"$project": {"_id": 0, "userId": 1, "msgCount": {"$size": {"$ifNull": ["$messages", []]}},
+                      "firstUser": {"$let": {"vars": {"i": {"$indexOfArray": [roles, "user"]}}, "in": {
+                          "idx": "$$i",
+                          "msg": {"$cond": [{"$gte": ["$$i", 0]}, {"$arrayElemAt": ["$messages", "$$i"]}, None]}}}}}},
+    ]):
+        first = c.get('firstUser') or {}
+        idx = int(first.get('idx', -1))
+        meta = {
+            "msgCount": int(c.get('msgCount') or 0),
+            "firstUserHash": _first_user_hash(_first_user_content([first.get('msg')])) if idx >= 0 else '',
+            "firstUserIdx": idx,
+        }
+        computed[c.get('userId')] = meta
+        try:
+            db.conversations.update_one(
+                {"conversationId": conv_id, "userId": c.get('userId'), "firstUserHash": {"$exists": False}},
+                {"$set": meta})
+        except Exception as e:
+            print(f"Guard metadata backfill failed for {conv_id}: {str(e)}")
+    return computed
+
+def _shrink_guard(richest, new_count, new_hash):
+    """Guard 2 (see handle_save_conversation) on stored metadata."""
+    return bool(richest and richest['msgCount'] > new_count
+                and richest['firstUserHash'] and richest['firstUserHash'] != new_hash)
+
+def _conflict(db, conv_id, user_id, richest, stored_rev, headers):
+    # The one path that still needs the stored thread itself: the client merges onto it.
+    # `synced` says the returned thread is the saver's own copy at `rev`, so a delta retry
+    # can build on it; a drifted twin's thread is not what the saver's copy holds, so the
+    # client must retry in full.
+    doc = db.conversations.find_one({"conversationId": conv_id, "userId": richest.get("userId")},
+                                    {"messages": 1}) or {}
+    synced = richest.get("userId") == user_id and richest.get("rev") == stored_rev
+    return response(200, {
+        "success": False, "conflict": True, "conversationId": conv_id,
+        "rev": stored_rev, "messages": doc.get('messages') or [], "synced": synced
+    }, headers)
+
 def handle_save_conversation(db, data, headers):
     user_id = data.get('userId', 'global_user')
     conv_id = data.get('conversationId')
@@ -112,6 +235,9 @@ def handle_save_conversation(db, data, headers):
     messages = data.get('messages', [])
     title = data.get('title')
 
+    if data.get('delta') is not None:
+        return _save_delta(db, data, user_id, conv_id, title, headers)
+
     # Inline rename: a title-only update legitimately carries no messages, so it must NOT
     # hit the empty-message guard below (which would skip it and silently drop the rename).
     # Patch just the title across every copy of this id (drifted dupes) without touching
@@ -133,18 +259,19 @@ def handle_save_conversation(db, data, headers):
     # blank/partial history (usually the Atlas shard read hiccup) and then autosaved
     # over a good doc sharing this conversationId. Find the richest stored copy across
     # EVERY userId spelling for this id (a past userId-format change left some
-    # conversations duplicated) and refuse a save that would shrink it.
+    # conversations duplicated) and refuse a save that would shrink it. Compared on the
+    # stored msgCount / firstUserHash (_stored_copies), not the message arrays.
     richest = None
     stored_rev = 0
-    for c in db.conversations.find({"conversationId": conv_id}, {"messages": 1, "rev": 1}):
-        if richest is None or len(c.get('messages') or []) > len(richest.get('messages') or []):
+    for c in _stored_copies(db, conv_id):
+        if richest is None or c['msgCount'] > richest['msgCount']:
             richest = c
-        stored_rev = max(stored_rev, int(c.get('rev') or 0))
-    stored_msgs = (richest or {}).get('messages') or []
+        stored_rev = max(stored_rev, c['rev'])
+    meta = _thread_meta(messages)
 
     # Guard 1: an empty save must never clobber a thread that already has content.
     if not messages:
-        if stored_msgs:
+        if richest and richest['msgCount']:
             return response(200, {
                 "success": True, "conversationId": conv_id,
                 "skipped": "empty_messages_guard"
@@ -157,14 +284,11 @@ def handle_save_conversation(db, data, headers):
     # incoming thread is a different (blank-loaded) conversation reusing the id, so keep
     # the richer copy. Same-thread growth (len >= stored) and same-thread edits
     # (regenerate / edit-and-resend keep the first user message) pass straight through.
-    elif len(stored_msgs) > len(messages):
-        stored_first = _first_user_content(stored_msgs).strip()
-        incoming_first = _first_user_content(messages).strip()
-        if stored_first and stored_first != incoming_first:
-            return response(200, {
-                "success": True, "conversationId": conv_id,
-                "skipped": "shrink_guard"
-            }, headers)
+    elif _shrink_guard(richest, meta['msgCount'], meta['firstUserHash']):
+        return response(200, {
+            "success": True, "conversationId": conv_id,
+            "skipped": "shrink_guard"
+        }, headers)
 
     # Guard 3 (optimistic concurrency): if the client says which revision it based its
     # edit on and the server has since moved past it (another device/tab saved in
@@ -174,10 +298,7 @@ def handle_save_conversation(db, data, headers):
     # baseRev (older cached builds) skip this and still get the shrink/empty guards.
     base_rev = data.get('baseRev')
     if base_rev is not None and richest is not None and int(base_rev) != stored_rev:
-        return response(200, {
-            "success": False, "conflict": True, "conversationId": conv_id,
-            "rev": stored_rev, "messages": stored_msgs
-        }, headers)
+        return _conflict(db, conv_id, user_id, richest, stored_rev, headers)
 
     if not title and messages:
         # Generate a title from the first user message
@@ -196,31 +317,115 @@ def handle_save_conversation(db, data, headers):
         "threadId": data.get('threadId'),
         "mode": data.get('mode'),
         "rev": new_rev,
-        "lastUpdated": datetime.utcnow()
+        "lastUpdated": datetime.utcnow(),
+        **meta
     }
 
-    db.conversations.update_one(
-        {"conversationId": conv_id, "userId": user_id},
-        {"$set": update_doc},
-        upsert=True
-    )
+    try:
+        db.conversations.update_one(
+            {"conversationId": conv_id, "userId": user_id},
+            {"$set": update_doc},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # Lost a race against a concurrent first save of the same thread (the conv_user
+        # unique key rejected our insert) — treat it like any other concurrent write.
+        copies = _stored_copies(db, conv_id)
+        if not copies:
+            raise
+        return _conflict(db, conv_id, user_id, max(copies, key=lambda c: c['msgCount']),
+                         max(c['rev'] for c in copies), headers)
+
+    return response(200, {"success": True, "conversationId": conv_id, "rev": new_rev,
+                          "msgCount": meta['msgCount']}, headers)
+
+def _save_delta(db, data, user_id, conv_id, title, headers):
+    """Append/patch save: `delta` = {"from": i, "messages": [...]} replaces the stored thread
+    from index i onward with the given messages — i == stored count is a pure append, a
+    shorter tail truncates (edit-and-resend). Requires baseRev; the client must have the
+    server's thread at exactly that revision (it tracks what it last synced), so anything
+    the server can't apply safely comes back as `needFull` and the client re-sends whole.
+    Guards run on stored metadata, same as the full path."""
+    delta = data.get('delta') or {}
+    tail = delta.get('messages') or []
+    base_rev = data.get('baseRev')
+    try:
+        start = int(delta.get('from'))
+    except (TypeError, ValueError):
+        return response(400, {"error": "delta.from must be an integer"}, headers)
+    if base_rev is None or not isinstance(tail, list):
+        return response(400, {"error": "delta saves require baseRev and delta.messages"}, headers)
+
+    copies = _stored_copies(db, conv_id)
+    richest = max(copies, key=lambda c: c['msgCount']) if copies else None
+    stored_rev = max((c['rev'] for c in copies), default=0)
+    if richest is not None and int(base_rev) != stored_rev:
+        return _conflict(db, conv_id, user_id, richest, stored_rev, headers)
+    target = next((c for c in copies if c.get('userId') == user_id), None)
+    if (target is None or target['rev'] != stored_rev or target.get('firstUserIdx') is None
+            or not 0 <= start <= target['msgCount']):
+        return response(200, {"success": False, "needFull": True, "conversationId": conv_id}, headers)
+
+    count = start + len(tail)
+    if count == 0:   # Guard 1, delta form
+        return response(200, {"success": True, "conversationId": conv_id, "skipped": "empty_messages_guard"}, headers)
+    fidx = target['firstUserIdx']
+    if fidx == -1 or start <= fidx:
+        # The stored prefix [0:start] has no user message, so the first one (if any) is in the tail.
+        tmeta = _thread_meta(tail)
+        fidx = start + tmeta['firstUserIdx'] if tmeta['firstUserIdx'] >= 0 else -1
+        fhash = tmeta['firstUserHash']
+    else:
+        fhash = target['firstUserHash']
+    if _shrink_guard(richest, count, fhash):
+        return response(200, {"success": True, "conversationId": conv_id, "skipped": "shrink_guard"}, headers)
+
+    new_rev = stored_rev + 1
+    fields = {"rev": new_rev, "msgCount": count, "firstUserHash": fhash, "firstUserIdx": fidx,
+              "lastUpdated": datetime.utcnow()}
+    if title:
+        fields["title"] = title
+    if data.get('threadId') is not None:
+        fields["threadId"] = data.get('threadId')
+    # Compare-and-swap on rev: a save that lands between our read and this write fails the
+    # filter and the client gets a conflict instead of an interleaved thread.
+    flt = {"conversationId": conv_id, "userId": user_id, "rev": stored_rev}
+    if start == target['msgCount']:
+        upd = {"$set": fields}
+        if tail:
+            upd["$push"] = {"messages": {"$each": tail}}
+    elif count == target['msgCount']:
+        upd = {"$set": dict(fields, **{f"messages.{start + j}": m for j, m in enumerate(tail)})}
+    else:
+        upd = [{"$set": dict({k: {"$literal": v} for k, v in fields.items()}, messages={"$concatArrays": [
+            {"$slice": [{"$ifNull": ["$messages", []]}, start]}, {"$literal": tail}]})}]
+    if db.conversations.update_one(flt, upd).modified_count == 0:
+        copies = _stored_copies(db, conv_id)
+        richest = max(copies, key=lambda c: c['msgCount']) if copies else None
+        if richest is None:
+            return response(200, {"success": False, "needFull": True, "conversationId": conv_id}, headers)
+        return _conflict(db, conv_id, user_id, richest, max(c['rev'] for c in copies), headers)
 
-    return response(200, {"success": True, "conversationId": conv_id, "rev": new_rev}, headers)
+    return response(200, {"success": True, "conversationId": conv_id, "rev": new_rev, "msgCount": count}, headers)
 
 def handle_fetch_conversations(db, data, headers):
     user_id = data.get('userId', 'global_user')
     fetch_all = data.get('fetchAll', False) or user_id == 'ALL_USERS'
 
     try:
+        # A single user's listing is a covered read on user_history (equality on userId,
+        # already ordered by lastUpdated desc, every projected field in the key), and the
+        # conv_user unique key means it can't contain duplicates.
         query = {} if fetch_all else {"userId": user_id}
         cursor = db.conversations.find(
             query,
-            {"conversationId": 1, "userId": 1, "title": 1, "lastUpdated": 1, "mode": 1}
+            {"_id": 0, **{f: 1 for f in _LIST_FIELDS}}
         ).sort("lastUpdated", -1).limit(300)
 
         # Collapse duplicate documents that share a conversationId (artifacts of a past
-        # userId-format change). conversationId is unique per conversation, so the cursor
-        # is already sorted newest-first — keep the first (most recent) sighting of each.
+        # userId-format change — only the fetchAll listing spans userIds). conversationId is
+        # unique per conversation, so the cursor is already sorted newest-first — keep the
+        # first (most recent) sighting of each.
         conversations = []
         seen = set()
         for c in cursor:
@@ -258,13 +463,17 @@ def handle_get_conversation(db, data, headers):
         # with a fresh id (see chatbot.html) — so any duplicates are the SAME person's
         # drifted records. A plain find_one() could return the empty twin and open the
         # chat blank, so prefer the requester's own non-empty copy, then fall back to
-        # the richest copy by message count, then most recent.
-        candidates = list(db.conversations.find({"conversationId": conv_id}))
+        # the richest copy by message count, then most recent. The pick is made on the
+        # stored guard metadata; only the chosen copy is read in full.
+        candidates = _stored_copies(db, conv_id)
         if not candidates:
             return response(404, {"error": "Conversation not found"}, headers)
-        own = [c for c in candidates if c.get("userId") == user_id and (c.get("messages") or [])]
+        own = [c for c in candidates if c.get("userId") == user_id and c["msgCount"]]
         pool = own or candidates
-        conv = max(pool, key=lambda c: (len(c.get("messages") or []), str(c.get("lastUpdated") or "")))
+        pick = max(pool, key=lambda c: (c["msgCount"], str(c.get("lastUpdated") or "")))
+        conv = db.conversations.find_one({"conversationId": conv_id, "userId": pick.get("userId")})
+        if not conv:
+            return response(404, {"error": "Conversation not found"}, headers)
     else:
         conv = db.conversations.find_one({"conversationId": conv_id, "userId": user_id})
         if not conv:
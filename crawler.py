@@ -1,149 +1,347 @@
 import json
-import urllib.request
+import asyncio
+import time
+import urllib.robotparser
+import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urljoin
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 import os
 
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36'
+
+# Crawl engine tuning. CRAWL_CONCURRENCY pages are in flight at once overall, at most
+# CRAWL_PER_HOST of them against any one host, with request starts to a host spaced
+# CRAWL_DELAY seconds apart (or robots.txt's Crawl-delay, whichever is longer — but a
+# robots delay is honoured only up to CRAWL_MAX_DELAY, so one site can't stall a run).
+# In Lambda the crawl stops CRAWL_DEADLINE_MARGIN seconds before the invocation's time
+# runs out and returns the pages it has.
+CRAWL_CONCURRENCY = int(os.environ.get('CRAWL_CONCURRENCY', '16'))
+CRAWL_PER_HOST = int(os.environ.get('CRAWL_PER_HOST', '8'))
+CRAWL_DELAY = float(os.environ.get('CRAWL_DELAY', '0'))
+CRAWL_MAX_DELAY = float(os.environ.get('CRAWL_MAX_DELAY', '5'))
+CRAWL_TIMEOUT = float(os.environ.get('CRAWL_TIMEOUT', '20'))
+CRAWL_DEADLINE_MARGIN = float(os.environ.get('CRAWL_DEADLINE_MARGIN', '10'))
+CRAWL_RESPECT_ROBOTS = os.environ.get('CRAWL_RESPECT_ROBOTS', '1') != '0'
+SITEMAP_MAX_FILES = 20   # sitemap index fan-out cap
+
+
 def lambda_handler(event, context):
     homepage = event['url']
     max_pages = int(event['max_pages'])
-    
-    data = {}
-    
-    opener = urllib.request.build_opener()
-    opener.addheaders = [('User-Agent', 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36')]
-    urllib.request.install_opener(opener)
-
-    request_url = urllib.request.urlopen(homepage)
-    
-    soup = BeautifulSoup(request_url.read(), 'html.parser')
-    
-    links = []
-    crawled = [homepage]
-    
-    for link in soup.find_all('a', href=True):
-        if link['href'] not in links and homepage in link['href'] and link['href'][-4] != "." and link['href'][-5] != ".":
-            links.append(link['href'])
-    
-    while len(data.keys())<max_pages:
-        for url in links:
-            if url not in crawled and len(data.keys())<max_pages:
-                request_url = urllib.request.urlopen(url)
-                crawled.append(url)
-                try:
-                    soup = BeautifulSoup(request_url.read(), 'html.parser')
-                    data[url] = {}
-                    if request_url.geturl() == url:
-                        data[url]['code'] = request_url.status
-                        data[url]['title'] = soup.title.string
-                    else:
-                        data[url]['code'] = requests.get(url).status_code
-                        data[url]['title'] = soup.title.string
-                    try:
-                        value = soup.find_all('meta', attrs={'name': 'description'})[0]
-                        if value == "" or value == [[]] or value == []:
-                            data[url]['description'] = "None"
-                        else:
-                            data[url]['description'] = soup.find_all('meta', attrs={'name': 'description'})[0]['content']
-                    except:
-                        data[url]['description'] = ""
-                    try:
-                        data[url]['canonical'] = soup.select('link[rel*=canonical]')[0]['href']
-                    except:
-                        data[url]['canonical'] = ""
-                    try:
-                        value = soup.find_all('link', rel='alternate', hreflang=True)
-                        hreflangs = []
-                        for hreflang in value:
-                            hreflangs.append(hreflang['hreflang'])
-                        if value == []:
-                            data[url]['hreflang'] = "None"
-                        else:
-                            data[url]['hreflang'] = "\n• ".join(hreflangs)
-                    except Exception as e:
-                        print(e)
-                        data[url]['hreflang'] = "None"
-                    for link in soup.find_all('a', href=True):
-                        if link['href'] not in links and homepage in link['href'] and link['href'][-4] != "." and link['href'][-5] != ".":
-                            links.append(link['href'])
-                    
-                    # Use CSS selectors to exclude common invisible elements:
-                    for script in soup(["script", "style"]):
-                        script.extract()
-
-                    # Extract text and join with spaces:
-                    text_elements = [t.strip() for t in soup.find_all(text=True) if t.strip()]
-
-                    data[url]['word_count'] = len(text_elements)
-                            
-                    value = soup.find_all('img')
-                    if value == "" or value == [[]] or value == []:
-                        data[url]['alt_text'] = "None"
-                    else:
-                        alt_texts = []
-                        for image in value:
-                            try:
-                                alt_text = image.attrs['alt']
-                                if alt_text not in alt_texts and alt_text !="":
-                                    alt_texts.append(alt_text)
-                            except:
-                                continue
-                    data[url]['alt_text'] = ',<br>'.join(alt_texts)
-                    
-                    value = soup.find_all('h1')
-                    if value == "" or value == [[]] or value == []:
-                        data[url]['h1'] = "None"
-                    else:
-                        h1s = []
-                        for header in value:
-                            h1 = header.text
-                            if h1 not in h1s and h1 !="":
-                                h1s.append(h1)
-                    data[url]['h1'] = ',<br>'.join(h1s)
-                    
-                    value = soup.find_all('h2')
-                    if value == "" or value == [[]] or value == []:
-                        data[url]['h2'] = "None"
-                    else:
-                        h2s = []
-                        for header in value:
-                            h2 = header.text
-                            if h2 not in h2s and h2 !="":
-                                h2s.append(h2)
-                    try:
-                        data[url]['h2'] = ',<br>'.join(h2s)
-                    except:
-                        data[url]['h2'] = ""
-
-                    try:
-                        #getting GPT to summarise based on page content
-                        api_url = "https://api.openai.com/v1/chat/completions"
-
-                        prompt = "Evaluate if this webpage has a good UI/UX. Output 'Good' or 'Bad' with a short summary why. Here is an excerpt of the page HTML: " +str(soup)[:100000]
-
-                        querystring = {"model":"gpt-4o-mini",
-                                    "messages":[{"role": "user", "content": prompt}]}
-
-                        openai_key = os.environ.get('OPENAI_API_KEY')
-                        headers = {
-                            "Content-Type": "application/json",
-                            'Authorization': f'Bearer {openai_key}'
-                        }
-
-                        response = requests.post(api_url, headers=headers, json=querystring)
-
-                        print(response.json()['choices'][0]['message']['content'])
-
-                        data[url]['uiux'] = response.json()['choices'][0]['message']['content']
-
-                    except Exception as e:
-                        print(e)
-                        data[url]['uiux'] = ""
-                except:
-                    continue
-                
-        
+    deadline = None
+    if hasattr(context, 'get_remaining_time_in_millis'):
+        deadline = time.monotonic() + context.get_remaining_time_in_millis() / 1000 - CRAWL_DEADLINE_MARGIN
+
+    data = asyncio.run(crawl_site(
+        homepage, max_pages,
+        sitemap=event.get('sitemap', True),
+        uiux=event.get('uiux', True),
+        deadline=deadline,
+    ))
+
     return {
         'statusCode': 200,
         'body': json.loads(json.dumps(data, default=str))
     }
+
+
+async def crawl_site(homepage, max_pages, **opts):
+    """Run crawl() to completion and return {url: record}."""
+    data = {}
+    async for url, record in crawl(homepage, max_pages, **opts):
+        data[url] = record
+    return data
+
+
+# --- Page records ---
+
+def _wanted(href, homepage):
+    # Absolute links on the site that don't end in a file extension (".pdf", ".jpeg").
+    return homepage in href and href[-4:-3] != "." and href[-5:-4] != "."
+
+
+def _unique_texts(values):
+    out = []
+    for v in values:
+        if v not in out and v != "":
+            out.append(v)
+    return out
+
+
+def page_record(status, body, homepage):
+    """(record, links, soup) for one fetched page: the per-URL audit record, the
+    in-site links found on it (document order), and the soup with scripts/styles
+    stripped (what the UI/UX prompt is built from)."""
+    soup = BeautifulSoup(body, 'html.parser')
+    record = {'code': status, 'title': soup.title.string if soup.title else None}
+
+    meta = soup.find_all('meta', attrs={'name': 'description'})
+    record['description'] = (meta[0].get('content') or "") if meta else ""
+
+    canonical = soup.select('link[rel*=canonical]')
+    record['canonical'] = (canonical[0].get('href') or "") if canonical else ""
+
+    hreflangs = [h['hreflang'] for h in soup.find_all('link', rel='alternate', hreflang=True)]
+    record['hreflang'] = "\n• ".join(hreflangs) if hreflangs else "None"
+
+    links = [a['href'] for a in soup.find_all('a', href=True) if _wanted(a['href'], homepage)]
+
+    # Use CSS selectors to exclude common invisible elements:
+    for script in soup(["script", "style"]):
+        script.extract()
+
+    # Count the non-empty text nodes:
+    record['word_count'] = len([t for t in soup.find_all(string=True) if t.strip()])
+
+    images = soup.find_all('img')
+    record['alt_text'] = ',<br>'.join(_unique_texts(i.attrs['alt'] for i in images if 'alt' in i.attrs)) if images else "None"
+    for tag in ('h1', 'h2'):
+        headers = soup.find_all(tag)
+        record[tag] = ',<br>'.join(_unique_texts(h.text for h in headers)) if headers else "None"
+    return record, links, soup
+
+
+def uiux_review(soup):
+    """GPT's UI/UX verdict on a page ('' if unavailable)."""
+    openai_key = os.environ.get('OPENAI_API_KEY')
+    if not openai_key:
+        return ""
+    try:
+        #getting GPT to summarise based on page content
+        api_url = "https://api.openai.com/v1/chat/completions"
+
+        prompt = "Evaluate if this webpage has a good UI/UX. Output 'Good' or 'Bad' with a short summary why. Here is an excerpt of the page HTML: " + str(soup)[:100000]
+
+        querystring = {"model": "gpt-4o-mini",
+                       "messages": [{"role": "user", "content": prompt}]}
+
+        headers = {
+            "Content-Type": "application/json",
+            'Authorization': f'Bearer {openai_key}'
+        }
+
+        response = requests.post(api_url, headers=headers, json=querystring, timeout=60)
+        return response.json()['choices'][0]['message']['content']
+    except Exception as e:
+        print(e)
+        return ""
+
+
+# --- Crawl engine ---
+# An asyncio frontier (FIFO, so pages come in the order the old link walk visited
+# them) over a seen-set, fed by the homepage's links, then robots.txt/sitemap URLs,
+# then every crawled page's links. Fetching and parsing are blocking (requests +
+# BeautifulSoup) and run on a thread pool sharing one keep-alive Session, so each
+# host's connections are reused across pages. Records are yielded as pages finish.
+
+def _session(pool):
+    session = requests.Session()
+    session.headers['User-Agent'] = USER_AGENT
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(pool, 1))
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _fetch(session, url):
+    """(final status, body) — redirects followed, so the status is the landing page's."""
+    resp = session.get(url, timeout=CRAWL_TIMEOUT)
+    return resp.status_code, resp.content
+
+
+def _load_robots(session, origin):
+    robots = urllib.robotparser.RobotFileParser(origin + '/robots.txt')
+    try:
+        resp = session.get(origin + '/robots.txt', timeout=CRAWL_TIMEOUT)
+        if resp.status_code in (401, 403):
+            robots.disallow_all = True
+        elif resp.status_code < 400:
+            robots.parse(resp.text.splitlines())
+        else:
+            robots.allow_all = True
+    except requests.exceptions.RequestException:
+        robots.allow_all = True
+    return robots
+
+
+def _sitemap_urls(session, sitemaps):
+    """Page URLs listed in the given sitemaps, following sitemap indexes."""
+    queue, seen, urls = deque(sitemaps), set(), []
+    while queue and len(seen) < SITEMAP_MAX_FILES:
+        sm = queue.popleft()
+        if sm in seen:
+            continue
+        seen.add(sm)
+        try:
+            resp = session.get(sm, timeout=CRAWL_TIMEOUT)
+            if resp.status_code >= 400:
+                continue
+            root = ET.fromstring(resp.content)
+        except (requests.exceptions.RequestException, ET.ParseError):
+            continue
+        for node in root:
+            loc = next((c.text.strip() for c in node if c.tag.endswith('loc') and c.text), None)
+            if not loc:
+                continue
+            if node.tag.endswith('sitemap'):
+                queue.append(loc)
+            else:
+                urls.append(loc)
+    return urls
+
+
+class _Host:
+    """Per-host politeness: a concurrency cap, request spacing, and robots rules."""
+
+    def __init__(self, per_host, delay):
+        self.slots = asyncio.Semaphore(per_host)
+        self.delay = delay
+        self.next_at = 0.0
+        self.robots = None
+
+
+async def crawl(homepage, max_pages, concurrency=None, per_host=None, delay=None,
+                robots=None, sitemap=True, uiux=True, deadline=None):
+    """Crawl `homepage`'s site, yielding (url, record) for up to `max_pages` pages as
+    they complete. As before, only absolute in-site links are followed, the homepage
+    itself is fetched for links but not recorded, and a page that can't be fetched or
+    parsed is skipped (it doesn't count toward max_pages). `deadline` (a
+    time.monotonic() value) ends the crawl early: no page starts after it, and pages
+    still in flight when it passes are dropped."""
+    concurrency = concurrency or CRAWL_CONCURRENCY
+    per_host = per_host or CRAWL_PER_HOST
+    delay = CRAWL_DELAY if delay is None else delay
+    robots = CRAWL_RESPECT_ROBOTS if robots is None else robots
+
+    loop = asyncio.get_running_loop()
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    session = _session(concurrency)
+    hosts = {}
+    seen = {homepage}
+    frontier = asyncio.Queue()
+    results = asyncio.Queue()
+    budget = asyncio.Condition()
+    state = {'recorded': 0, 'inflight': 0}
+
+    def blocking(fn, *args):
+        return loop.run_in_executor(pool, fn, *args)
+
+    def expired():
+        return deadline is not None and time.monotonic() >= deadline
+
+    async def host_for(url):
+        parts = urlsplit(url)
+        origin = f'{parts.scheme}://{parts.netloc}'
+        host = hosts.get(origin)
+        if host is None:
+            host = hosts[origin] = _Host(per_host, delay)
+            if robots:
+                host.robots = await blocking(_load_robots, session, origin)
+                robots_delay = float(host.robots.crawl_delay(USER_AGENT) or 0)
+                host.delay = max(delay, min(robots_delay, CRAWL_MAX_DELAY))
+        return host
+
+    async def polite_fetch(url):
+        host = await host_for(url)
+        if host.robots is not None and not host.robots.can_fetch(USER_AGENT, url):
+            return None
+        async with host.slots:
+            now = time.monotonic()
+            start = max(now, host.next_at)
+            host.next_at = start + host.delay
+            if start > now:
+                await asyncio.sleep(start - now)
+            return await blocking(_fetch, session, url)
+
+    def enqueue(urls):
+        for url in urls:
+            if url not in seen:
+                seen.add(url)
+                frontier.put_nowait(url)
+
+    async def visit(url):
+        fetched = await polite_fetch(url)
+        if fetched is None:
+            return None
+        record, links, soup = await blocking(page_record, fetched[0], fetched[1], homepage)
+        enqueue(links)
+        if uiux:
+            record['uiux'] = await blocking(uiux_review, soup)
+        else:
+            record['uiux'] = ""
+        return record
+
+    async def worker():
+        while True:
+            url = await frontier.get()
+            try:
+                async with budget:
+                    # Only as many pages in flight as could still be recorded; a failed
+                    # page frees its slot for the next URL.
+                    await budget.wait_for(lambda: state['recorded'] >= max_pages
+                                          or state['recorded'] + state['inflight'] < max_pages)
+                    if state['recorded'] >= max_pages or expired():
+                        continue
+                    state['inflight'] += 1
+                record = None
+                try:
+                    record = await visit(url)
+                except Exception as e:
+                    print(f"Crawl error for {url}: {e}")
+                async with budget:
+                    state['inflight'] -= 1
+                    if record is not None and state['recorded'] < max_pages:
+                        state['recorded'] += 1
+                        results.put_nowait((url, record))
+                    budget.notify_all()
+            finally:
+                frontier.task_done()
+
+    async def run():
+        try:
+            try:
+                status, body = await blocking(_fetch, session, homepage)
+                _, links, _ = await blocking(page_record, status, body, homepage)
+                enqueue(links)
+            except Exception as e:
+                print(f"Homepage fetch failed for {homepage}: {e}")
+            if sitemap:
+                host = await host_for(homepage)
+                maps = (host.robots.site_maps() if host.robots else None) or [urljoin(homepage, '/sitemap.xml')]
+                enqueue(u for u in await blocking(_sitemap_urls, session, maps) if _wanted(u, homepage))
+            workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+            try:
+                await frontier.join()
+            finally:
+                for w in workers:
+                    w.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+        finally:
+            results.put_nowait(None)
+
+    runner = asyncio.create_task(run())
+    try:
+        while True:
+            wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = await asyncio.wait_for(results.get(), wait)
+            except asyncio.TimeoutError:
+                # Pages already recorded still go out; only in-flight ones are dropped.
+                while not results.empty():
+                    item = results.get_nowait()
+                    if item is not None:
+                        yield item
+                print(f"Crawl deadline reached for {homepage}: returning {state['recorded']} pages")
+                break
+            if item is None:
+                await runner
+                break
+            yield item
+    finally:
+        runner.cancel()
+        pool.shutdown(wait=False)
+        session.close()
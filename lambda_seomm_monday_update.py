@@ -1,8 +1,10 @@
+import gzip
 import json
 import os
 import time
 import re
 import math
+import threading
 import boto3
 import requests
 import pandas as pd
@@ -26,41 +28,353 @@ def get_secret(secret_name, region='ap-southeast-1'):
     return json.loads(resp['SecretString'])
 
 
-def fetch_monday_board(api_key, board_id, pages=6):
-    """Paginate through a Monday board and return all items."""
-    api_url = "https://api.monday.com/v2"
-    headers = {"Authorization": api_key, "API-Version": "2025-04"}
+# ---------------------------------------------------------------------------
+# Monday board export engine
+# ---------------------------------------------------------------------------
 
-    query = (
-        '{boards (ids:' + str(board_id) + ')'
-        '{items_page (limit:100)'
-        '{cursor items { group {title id} id name '
-        'column_values{ column{ id title } text value}'
-        'subitems { column_values{text value}}}}}}'
-    )
-    r = requests.post(url=api_url, json={"query": query}, headers=headers)
-    board_data = r.json()
-    cursor = board_data["data"]["boards"][0]["items_page"]["cursor"]
-    items = list(board_data["data"]["boards"][0]["items_page"]["items"])
+MONDAY_API_URL = "https://api.monday.com/v2"
+MONDAY_API_VERSION = "2025-04"
+COMPLEXITY_FIELDS = "complexity { before after query reset_in_x_seconds }"
 
-    for _ in range(pages - 1):
-        if not cursor:
-            break
-        query = (
-            '{next_items_page (limit:100, cursor:"' + cursor + '") '
-            '{cursor items { group {title id} id name '
-            'column_values{ column{ id title } text value}'
-            'subitems { column_values{text value}}}}}'
+# Column titles the SEOMM dataframe logic reads. Runs that don't export the full
+# board to Google Sheets only ask Monday for these.
+SEOMM_DF_COLUMNS = [
+    "SEO Campaign Status", "SEO Campaign Type", "[BD]Project Type", "[SEO]SEO",
+    "SE Ranking Project Name", "SEO [Reg] P1 KWs", "SEO [Reg] KPI KWs",
+    "SEO [Cluster] Clusters Hit", "SEO [Cluster] KPI", "SEO KW Manual Check",
+]
+
+
+class ComplexityBudget:
+    """Shared pacing on Monday's per-minute complexity budget.
+
+    Every query reports the budget left after it ran and when it resets; callers
+    wait only when the next page would not fit, instead of sleeping a fixed
+    interval between pages. Thread-safe so parallel group fetches share it.
+    """
+
+    def __init__(self, safety=1.2):
+        self.lock = threading.Lock()
+        self.remaining = None     # budget left after the last query
+        self.reset_at = 0.0       # epoch seconds when the budget refills
+        self.page_cost = 0        # most expensive page seen so far
+        self.safety = safety
+
+    def wait_for_room(self):
+        with self.lock:
+            need = self.page_cost * self.safety
+            pause = 0.0
+            if self.remaining is not None and self.remaining < need:
+                pause = max(0.0, self.reset_at - time.time())
+                # Assume the refill happened; the next response corrects it.
+                self.remaining = None
+        if pause:
+            print(f"Monday budget low — pausing {pause:.1f}s for reset")
+            time.sleep(pause)
+
+    def record(self, complexity):
+        if not complexity:
+            return
+        with self.lock:
+            self.page_cost = max(self.page_cost, complexity.get("query") or 0)
+            self.remaining = complexity.get("after")
+            self.reset_at = time.time() + (complexity.get("reset_in_x_seconds") or 60)
+
+
+def _monday_query(api_key, query, budget, retries=6):
+    """POST one query paced on `budget`; retry on complexity/rate-limit errors.
+    Returns the response's `data` dict."""
+    headers = {"Authorization": api_key, "API-Version": MONDAY_API_VERSION}
+    for attempt in range(retries):
+        budget.wait_for_room()
+        r = requests.post(url=MONDAY_API_URL, json={"query": query}, headers=headers, timeout=60)
+        if r.status_code == 429 or r.status_code >= 500:
+            wait = int(r.headers.get("Retry-After") or 5 * (attempt + 1))
+            print(f"Monday HTTP {r.status_code} — retrying in {wait}s")
+            time.sleep(wait)
+            continue
+        payload = r.json()
+        errors = payload.get("errors") or []
+        if errors:
+            ext = errors[0].get("extensions") or {}
+            code = str(ext.get("code") or "").lower()
+            msg = str(errors[0].get("message") or "").lower()
+            if "complexity" in code or "complexity" in msg or "rate" in code:
+                m = re.search(r"(\d+) seconds", msg)
+                wait = ext.get("retry_in_seconds") or (int(m.group(1)) if m else 10)
+                print(f"Monday complexity limit hit — retrying in {wait}s")
+                time.sleep(wait)
+                continue
+            raise RuntimeError(f"Monday API error: {errors}")
+        data = payload.get("data") or {}
+        budget.record(data.get("complexity"))
+        return data
+    raise RuntimeError("Monday API: retries exhausted on complexity/rate limits")
+
+
+def _item_fields(column_ids, include_subitems):
+    cols = ("column_values(ids:" + json.dumps(column_ids) + ")" if column_ids else "column_values")
+    fields = "id name updated_at group {title id} " + cols + "{ column{ id title } text value}"
+    if include_subitems:
+        fields += " subitems { column_values{text value}}"
+    return fields
+
+
+def _board_columns(api_key, board_id, budget):
+    data = _monday_query(
+        api_key, "{ " + COMPLEXITY_FIELDS + " boards(ids:" + str(board_id) + "){ columns { id title type } } }", budget)
+    return data["boards"][0]["columns"]
+
+
+def _resolve_column_ids(api_key, board_id, titles, budget):
+    by_title = {c["title"]: c["id"] for c in _board_columns(api_key, board_id, budget)}
+    missing = [t for t in titles if t not in by_title]
+    if missing:
+        print(f"Columns not on board {board_id}: {missing}")
+    return [by_title[t] for t in titles if t in by_title]
+
+
+def _drain_items_page(api_key, first_page_query, page_key, fields, page_size, budget, pages):
+    """Follow one items_page cursor to the end (or `pages` pages when set)."""
+    data = _monday_query(api_key, first_page_query, budget)
+    page = page_key(data)
+    items = list(page["items"])
+    cursor = page.get("cursor")
+    fetched = 1
+    while cursor and (pages is None or fetched < pages):
+        data = _monday_query(
+            api_key,
+            "{ " + COMPLEXITY_FIELDS + ' next_items_page(limit:' + str(page_size)
+            + ', cursor:"' + cursor + '"){ cursor items { ' + fields + " } } }",
+            budget,
         )
-        r = requests.post(url=api_url, json={"query": query}, headers=headers)
-        board_data = r.json()
-        cursor = board_data["data"]["next_items_page"]["cursor"]
-        items += board_data["data"]["next_items_page"]["items"]
-        time.sleep(2)
+        page = data["next_items_page"]
+        items += page["items"]
+        cursor = page.get("cursor")
+        fetched += 1
+    return items
+
 
+def fetch_monday_board(api_key, board_id, pages=None, columns=None, by_group=False,
+                       page_size=100, include_subitems=False, max_workers=4,
+                       query_params=None, budget=None):
+    """Export every item on a Monday board.
+
+    columns:      column titles to request (None = all columns).
+    by_group:     split the board by group and fetch groups in parallel.
+    pages:        optional per-cursor page cap (None = follow cursors to the end).
+    query_params: optional items_page query_params literal (ungrouped fetch only).
+    Pacing follows the complexity budget reported by each response rather than
+    a fixed sleep between pages.
+    """
+    budget = budget or ComplexityBudget()
+    column_ids = _resolve_column_ids(api_key, board_id, columns, budget) if columns else None
+    fields = _item_fields(column_ids, include_subitems)
+    started = time.time()
+
+    if not by_group:
+        qp = ", query_params:" + query_params if query_params else ""
+        items = _drain_items_page(
+            api_key,
+            "{ " + COMPLEXITY_FIELDS + " boards(ids:" + str(board_id) + "){ items_page(limit:"
+            + str(page_size) + qp + "){ cursor items { " + fields + " } } } }",
+            lambda d: d["boards"][0]["items_page"],
+            fields, page_size, budget, pages,
+        )
+        print(f"Fetched {len(items)} items from board {board_id} in {time.time() - started:.1f}s")
+        return items
+
+    data = _monday_query(
+        api_key, "{ " + COMPLEXITY_FIELDS + " boards(ids:" + str(board_id) + "){ groups { id } } }", budget)
+    group_ids = [g["id"] for g in data["boards"][0]["groups"]]
+
+    def _fetch_group(group_id):
+        return _drain_items_page(
+            api_key,
+            "{ " + COMPLEXITY_FIELDS + " boards(ids:" + str(board_id) + '){ groups(ids:["' + group_id
+            + '"]){ items_page(limit:' + str(page_size) + "){ cursor items { " + fields + " } } } } }",
+            lambda d: d["boards"][0]["groups"][0]["items_page"],
+            fields, page_size, budget, pages,
+        )
+
+    # Keep board (group) order in the result regardless of completion order.
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        per_group = list(executor.map(_fetch_group, group_ids))
+    items = [item for group_items in per_group for item in group_items]
+    print(f"Fetched {len(items)} items from {len(group_ids)} groups of board {board_id} "
+          f"in {time.time() - started:.1f}s")
     return items
 
 
+# ---------------------------------------------------------------------------
+# Incremental board sync (local item store)
+# ---------------------------------------------------------------------------
+
+# The store is one gzipped JSON object in S3:
+#   {version, board_id, columns: [column ids], full_at, watermark, items: {id: item}}
+# Each run asks Monday only for items updated since the watermark (plus a light
+# id-only listing to drop deleted/moved items) and merges them in, so the daily
+# run scales with the day's churn rather than board size. A changed column set,
+# a missing store or a stale full snapshot falls back to a full export.
+# Mirror, lookup and dependency columns change without touching the item's own
+# updated_at (they follow linked items on other boards), so the watermark can't
+# see them. SEOMM_DERIVED_REFRESH picks which unchanged items get just those
+# columns re-read on an incremental run:
+#   linked (default) - items with at least one connected item; an item that links
+#                      to nothing has nothing to mirror, and its formulas only move
+#                      when its own columns do (which the watermark catches)
+#   all              - every stored item (also catches TODAY()-style formulas)
+#   off              - none; derived values catch up at the next full export
+ITEM_STORE_BUCKET = os.environ.get("SEOMM_ITEM_STORE_BUCKET", "")
+ITEM_STORE_KEY = "seomm/item-store/board-{board_id}.json.gz"
+ITEM_STORE_VERSION = 1
+ITEM_STORE_FULL_REFRESH_DAYS = int(os.environ.get("SEOMM_FULL_REFRESH_DAYS", "7"))
+DERIVED_COLUMN_TYPES = {"mirror", "lookup", "formula", "dependency"}
+RELATION_COLUMN_TYPES = {"board_relation", "dependency"}
+DERIVED_REFRESH = os.environ.get("SEOMM_DERIVED_REFRESH", "linked").lower()
+
+
+def _has_links(item, relation_ids):
+    """True if any of the item's connect-boards/dependency columns links an item."""
+    for v in item.get("column_values") or []:
+        if v["column"]["id"] in relation_ids and v.get("value"):
+            try:
+                if json.loads(v["value"]).get("linkedPulseIds"):
+                    return True
+            except (ValueError, AttributeError):
+                continue
+    return False
+
+
+def load_item_store(board_id):
+    if not ITEM_STORE_BUCKET:
+        return None
+    try:
+        obj = boto3.client("s3").get_object(
+            Bucket=ITEM_STORE_BUCKET, Key=ITEM_STORE_KEY.format(board_id=board_id))
+        store = json.loads(gzip.decompress(obj["Body"].read()))
+    except Exception as exc:
+        print(f"Item store unavailable ({exc}) — full export")
+        return None
+    return store if store.get("version") == ITEM_STORE_VERSION else None
+
+
+def save_item_store(board_id, store):
+    if not ITEM_STORE_BUCKET:
+        return
+    try:
+        boto3.client("s3").put_object(
+            Bucket=ITEM_STORE_BUCKET, Key=ITEM_STORE_KEY.format(board_id=board_id),
+            Body=gzip.compress(json.dumps(store).encode("utf-8")),
+            ContentType="application/json", ContentEncoding="gzip",
+        )
+    except Exception as exc:
+        print(f"Item store save failed: {exc}")
+
+
+def _fetch_board_item_ids(api_key, board_id, budget):
+    """Every item id on the board, in board order (ids only — cheap)."""
+    items = _drain_items_page(
+        api_key,
+        "{ " + COMPLEXITY_FIELDS + " boards(ids:" + str(board_id)
+        + "){ items_page(limit:500){ cursor items { id } } } }",
+        lambda d: d["boards"][0]["items_page"],
+        "id", 500, budget, None,
+    )
+    return [item["id"] for item in items]
+
+
+def _fetch_items_by_id(api_key, item_ids, budget):
+    fields = _item_fields(None, False)
+    out = []
+    for i in range(0, len(item_ids), 100):
+        data = _monday_query(
+            api_key,
+            "{ " + COMPLEXITY_FIELDS + " items(ids:" + json.dumps([int(x) for x in item_ids[i:i + 100]])
+            + ", limit:100){ " + fields + " } }",
+            budget,
+        )
+        out += data.get("items") or []
+    return out
+
+
+def _fetch_column_values(api_key, item_ids, column_ids, budget):
+    """{item id: column_values} for just `column_ids` of the given items."""
+    fields = "id column_values(ids:" + json.dumps(column_ids) + "){ column{ id title } text value}"
+    out = {}
+    for i in range(0, len(item_ids), 100):
+        data = _monday_query(
+            api_key,
+            "{ " + COMPLEXITY_FIELDS + " items(ids:" + json.dumps([int(x) for x in item_ids[i:i + 100]])
+            + ", limit:100){ " + fields + " } }",
+            budget,
+        )
+        for item in data.get("items") or []:
+            out[item["id"]] = item["column_values"]
+    return out
+
+
+def sync_monday_board(api_key, board_id):
+    """All board items (all columns), refreshed incrementally from the item store."""
+    budget = ComplexityBudget()
+    board_columns = _board_columns(api_key, board_id, budget)
+    columns = [c["id"] for c in board_columns]
+    derived = [c["id"] for c in board_columns if c.get("type") in DERIVED_COLUMN_TYPES]
+    relations = {c["id"] for c in board_columns if c.get("type") in RELATION_COLUMN_TYPES}
+    store = load_item_store(board_id)
+    now = datetime.utcnow()
+
+    full = (
+        store is None
+        or store.get("columns") != columns
+        or (now - datetime.fromisoformat(store["full_at"])).days >= ITEM_STORE_FULL_REFRESH_DAYS
+    )
+    if full:
+        items = fetch_monday_board(api_key, board_id, by_group=True, budget=budget)
+        store = {
+            "version": ITEM_STORE_VERSION, "board_id": str(board_id), "columns": columns,
+            "full_at": now.isoformat(), "items": {item["id"]: item for item in items},
+        }
+        order = [item["id"] for item in items]
+        print(f"Item store: full export of {len(items)} items")
+    else:
+        # __last_updated__ filters by day, so re-read the watermark's whole day.
+        since = store["watermark"][:10]
+        query_params = (
+            '{rules:[{column_id:"__last_updated__", compare_value:["EXACT","' + since + '"], '
+            'operator:greater_than_or_equals, compare_attribute:"UPDATED_AT"}]}'
+        )
+        changed = fetch_monday_board(api_key, board_id, query_params=query_params, budget=budget)
+        order = _fetch_board_item_ids(api_key, board_id, budget)
+        for item in changed:
+            store["items"][item["id"]] = item
+        unseen = [i for i in order if i not in store["items"]]
+        for item in _fetch_items_by_id(api_key, unseen, budget):
+            store["items"][item["id"]] = item
+        live = set(order)
+        dropped = [i for i in store["items"] if i not in live]
+        for i in dropped:
+            del store["items"][i]
+        fresh = {item["id"] for item in changed} | set(unseen)
+        stale = [] if DERIVED_REFRESH == "off" else [
+            i for i in order if i in store["items"] and i not in fresh
+            and (DERIVED_REFRESH == "all" or _has_links(store["items"][i], relations))]
+        if derived and stale:
+            for item_id, values in _fetch_column_values(api_key, stale, derived, budget).items():
+                by_id = {v["column"]["id"]: v for v in values}
+                item = store["items"][item_id]
+                item["column_values"] = [by_id.get(v["column"]["id"], v) for v in item["column_values"]]
+        print(f"Item store: {len(changed)} changed since {since}, {len(unseen)} new, "
+              f"{len(dropped)} removed, {len(order)} total, "
+              f"{len(derived)} mirror/formula columns refreshed on {len(stale) if derived else 0} "
+              f"items ({DERIVED_REFRESH})")
+
+    stamps = [item.get("updated_at") or "" for item in store["items"].values()]
+    store["watermark"] = max(stamps) if any(stamps) else now.isoformat()
+    save_item_store(board_id, store)
+    return [store["items"][i] for i in order if i in store["items"]]
+
+
 def build_integrated_df(combined_query):
     """Convert raw Monday board items into a DataFrame."""
     dictionary = {}
@@ -177,25 +491,97 @@ def monday_update_column(item_id, column_id, value, api_key,
     return requests.post(url=api_url, json={"query": query}, headers=headers).json()
 
 
+MUTATION_OPS_MAX = 50            # aliased operations per request, hard cap
+MUTATION_COMPLEXITY_CAP = 1_000_000   # keep one request well inside the per-minute budget
+
+
+def _send_aliased_mutation(ops, api_key, api_url, budget):
+    """Send [(alias, item_id, {column_id: value})] as one aliased
+    change_multiple_column_values document. Returns ({alias: error}, complexity)."""
+    parts = [
+        f'{alias}: change_multiple_column_values(item_id: {item_id}, board_id: {BOARD_ID}, '
+        f'column_values: {json.dumps(json.dumps(values))}) {{ id }}'
+        for alias, item_id, values in ops
+    ]
+    query = "mutation { " + COMPLEXITY_FIELDS + " " + " ".join(parts) + " }"
+    headers = {"Authorization": api_key, "API-Version": MONDAY_API_VERSION}
+    budget.wait_for_room()
+    try:
+        r = requests.post(url=api_url, json={"query": query}, headers=headers, timeout=60)
+        payload = r.json()
+    except Exception as exc:
+        return {alias: str(exc) for alias, _, _ in ops}, None
+    if r.status_code == 429:
+        time.sleep(int(r.headers.get("Retry-After") or 10))
+    data = payload.get("data") or {}
+    budget.record(data.get("complexity"))
+    failed = {}
+    for err in payload.get("errors") or []:
+        path = err.get("path") or []
+        msg = err.get("message") or "error"
+        if path and path[0] != "complexity":
+            failed[path[0]] = msg
+        else:
+            # Document-level error (complexity, auth, parse): nothing applied.
+            ext = err.get("extensions") or {}
+            if "complexity" in msg.lower() or "complexity" in str(ext.get("code", "")).lower():
+                time.sleep(ext.get("retry_in_seconds") or 10)
+            return {alias: msg for alias, _, _ in ops}, data.get("complexity")
+    for alias, _, _ in ops:
+        if alias not in failed and data.get(alias) is None:
+            failed[alias] = "no result returned"
+    return failed, data.get("complexity")
+
+
 def batch_monday_updates(updates, api_key,
-                          api_url="https://api.monday.com/v2", batch_size=10):
+                          api_url="https://api.monday.com/v2", batch_size=MUTATION_OPS_MAX,
+                          retries=3):
     """
     updates: list of (item_id, column_id, value)
-    Sends multiple mutations per request using GraphQL aliases.
+    All columns for an item collapse into one change_multiple_column_values
+    operation; operations are packed into aliased mutation documents sized from
+    the complexity Monday reports, so a few hundred campaigns take a few
+    requests. Per-alias errors don't fail the batch — only the failed aliases
+    are retried. Returns {"updated": n, "failed": {item_id: error}}.
     """
-    headers = {"Authorization": api_key, "API-Version": "2025-04"}
-    for i in range(0, len(updates), batch_size):
-        batch = updates[i : i + batch_size]
-        parts = []
-        for j, (item_id, col_id, val) in enumerate(batch):
-            parts.append(
-                f'u{j}: change_simple_column_value('
-                f'item_id: {item_id}, board_id: {BOARD_ID}, '
-                f'column_id: "{col_id}", value: "{val}") {{ id }}'
-            )
-        query = "mutation { " + " ".join(parts) + " }"
-        r = requests.post(url=api_url, json={"query": query}, headers=headers)
-        print(r.json())
+    per_item = {}
+    for item_id, col_id, val in updates:
+        per_item.setdefault(str(item_id), {})[col_id] = str(val)
+    pending = [(f"u{n}", item_id, values) for n, (item_id, values) in enumerate(per_item.items())]
+    budget = ComplexityBudget()
+    chunk_size = min(batch_size, MUTATION_OPS_MAX)
+    errors = {}
+    updated = 0
+
+    for attempt in range(retries):
+        if not pending:
+            break
+        retry = []
+        i = 0
+        while i < len(pending):
+            chunk = pending[i : i + chunk_size]
+            i += len(chunk)
+            failed, complexity = _send_aliased_mutation(chunk, api_key, api_url, budget)
+            updated += len(chunk) - len(failed)
+            for alias, item_id, values in chunk:
+                if alias in failed:
+                    errors[item_id] = failed[alias]
+                    retry.append((alias, item_id, values))
+                else:
+                    errors.pop(item_id, None)
+            if complexity and complexity.get("query"):
+                per_op = max(1, complexity["query"] // len(chunk))
+                room = min(MUTATION_COMPLEXITY_CAP, complexity.get("after") or MUTATION_COMPLEXITY_CAP)
+                chunk_size = max(1, min(batch_size, MUTATION_OPS_MAX, room // per_op))
+        if retry:
+            print(f"Monday batch: {len(retry)} operation(s) failed, retry {attempt + 1}/{retries}")
+            time.sleep(2 * (attempt + 1))
+        pending = retry
+
+    print(f"Monday batch: {updated}/{len(per_item)} items updated, {len(errors)} failed")
+    for item_id, err in errors.items():
+        print(f"  item {item_id}: {err}")
+    return {"updated": updated, "failed": errors}
 
 
 def monday_create_update(item_id, body, api_key,
@@ -334,8 +720,17 @@ def lambda_handler(event, context):
     today_str = datetime.today().strftime("%Y-%m-%d")
 
     # --- 1. Fetch Monday board (once for initial data) ---
+    # With an item store configured only the day's changes are pulled. Without
+    # one, full-board runs export every column to Google Sheets and item-specific
+    # runs only need the columns the KPI logic reads.
     print("Fetching Monday board...")
-    combined = fetch_monday_board(monday_api_key, BOARD_ID, pages=6)
+    if ITEM_STORE_BUCKET:
+        combined = sync_monday_board(monday_api_key, BOARD_ID)
+    else:
+        combined = fetch_monday_board(
+            monday_api_key, BOARD_ID, by_group=True,
+            columns=None if not item_ids_set else SEOMM_DF_COLUMNS,
+        )
     df_integrated, _ = build_integrated_df(combined)
 
     df_integrated = df_integrated[
@@ -816,7 +1211,11 @@ def lambda_handler(event, context):
     # --- 16. Staff KPI summary (full-board runs only) ---
     if not item_ids_set:
         print("Re-fetching board for staff KPI summary...")
-        combined_final = fetch_monday_board(monday_api_key, BOARD_ID, pages=6)
+        if ITEM_STORE_BUCKET:
+            combined_final = sync_monday_board(monday_api_key, BOARD_ID)
+        else:
+            combined_final = fetch_monday_board(monday_api_key, BOARD_ID, by_group=True,
+                                                columns=SEOMM_DF_COLUMNS)
         df_final, _ = build_integrated_df(combined_final)
         df_final = df_final[
             (~df_final["SEO Campaign Status"].str.contains("Expired", na=False))
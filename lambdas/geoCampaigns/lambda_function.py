@@ -22,6 +22,8 @@ CAMPAIGNS_TABLE (default 'geoCampaigns').
 import base64
 import calendar
 import concurrent.futures
+import gzip
+import hashlib
 import json
 import os
 import re
@@ -30,6 +32,7 @@ import time
 import urllib.error
 import urllib.request
 import uuid
+import zlib
 from datetime import datetime, timedelta, timezone
 
 import boto3
@@ -318,8 +321,8 @@ def h_list():
     out = []
     for it in items:
         iid = str(it.get("id") or "")
-        if iid.startswith(RUN_PREFIX) or "#m#" in iid or it.get("type") == "metrics_month":
-            continue  # live-run jobs + per-month snapshots share this table — never list them as campaigns
+        if not _is_campaign_id(iid) or it.get("type") == "metrics_month":
+            continue  # live-run jobs, queue items + per-month snapshots share this table — never list them as campaigns
         self_vis, days = None, 0
         if it.get("metrics"):
             try:
@@ -432,18 +435,30 @@ def _snapshot_point(date, model):
     return p
 
 
+# Answer-store layout (v2), one prefix per run:
+#   answers/<cid>/<month>/<runId>/index.json     — run header + one row per cell, no answer text
+#   answers/<cid>/<month>/<runId>/p<pi>.jsonl    — that prompt's cells, one JSON object per line
+#   answers/<cid>/<month>/<runId>/p<pi>.idx.json — {"<ei>|<pl>": [offset, length]} into the .jsonl
+#   answers/<cid>/<month>/<runId>/answers.json.gz — the whole run in the legacy shape, for exports
+# Expanding one answer is a ~100-byte offsets GET plus a byte-range GET of that cell; a partial
+# re-run rewrites one prompt's objects and the index, not the run. Keys written before this end in
+# `<runId>.json` (a single document) and are still read by every function below.
+_ANSWERS_INDEX = "index.json"
+_ANSWERS_BULK = "answers.json.gz"
+_ANSWER_INDEX_FIELDS = ("ei", "pi", "pl", "engine", "entity", "prompt", "ok",
+                        "mentioned", "sentiment", "theme", "score", "rank", "cited")
+
+
 def _answers_key(cid, month, run_id):
-    return f"answers/{cid}/{month}/{run_id}.json"
+    return f"answers/{cid}/{month}/{run_id}/{_ANSWERS_INDEX}"
 
 
-def _write_answers(cid, month, run_id, cfg, results):
-    """Persist every AI answer from a run to S3 — including cells where the brand was NOT
-    mentioned and competitor cells, both of which used to be discarded. The absent case is the
-    most actionable one ("who did it recommend instead of us?"), so it must be kept.
+def _answers_prefix(key):
+    """The run prefix of a v2 index key, or None for a legacy single-document key."""
+    return key[:-len(_ANSWERS_INDEX)] if key and key.endswith("/" + _ANSWERS_INDEX) else None
 
-    Returns the S3 key, or None if the write failed. A failure is non-fatal: the run still
-    archives, just without browsable answers, rather than losing the whole month's metrics."""
-    prompts = cfg.get("prompts") or []
+
+def _answer_cells(cfg, results):
     entities = cfg.get("entities") or []
     cells = []
     for o in results:
@@ -462,15 +477,66 @@ def _write_answers(cid, month, run_id, cfg, results):
             "citations": r.get("citations") or [],
             "response": r.get("response") or "",
         })
-    blob = {"campaignId": cid, "month": month, "runId": run_id, "createdAt": _now(),
-            "brand": cfg.get("brand") or "", "target": cfg.get("target") or "",
-            "entities": [e.get("name") if isinstance(e, dict) else str(e) for e in entities],
-            "prompts": prompts, "cells": cells}
+    return cells
+
+
+def _index_row(c):
+    row = {k: c.get(k) for k in _ANSWER_INDEX_FIELDS}
+    # A row re-spliced from an existing index has no text, only its recorded length.
+    row["chars"] = len(c.get("response") or "") if "response" in c else c.get("chars", 0)
+    return row
+
+
+def _put_prompt_objects(prefix, pi, cells):
+    """Write one prompt's cells as JSON Lines plus the offsets that make each line range-readable."""
+    body, offsets = bytearray(), {}
+    for c in cells:
+        line = (json.dumps(c) + "\n").encode("utf-8")
+        offsets[f"{c.get('ei')}|{c.get('pl')}"] = [len(body), len(line)]
+        body += line
+    _s3.put_object(Bucket=ANSWERS_BUCKET, Key=f"{prefix}p{pi}.jsonl", Body=bytes(body),
+                   ContentType="application/x-ndjson")
+    _s3.put_object(Bucket=ANSWERS_BUCKET, Key=f"{prefix}p{pi}.idx.json",
+                   Body=json.dumps(offsets).encode("utf-8"), ContentType="application/json")
+
+
+def _put_answers_v2(prefix, header, cells, only_pi=None, bulk=True):
+    """Write a run's answer objects under `prefix`. With `only_pi`, only that prompt's objects are
+    rewritten and the index is spliced; the bulk export is then marked stale rather than rebuilt.
+    The index goes last, so readers never see rows whose objects don't exist yet."""
+    by_pi = {}
+    for c in cells:
+        by_pi.setdefault(c.get("pi"), []).append(c)
+    todo = {pi: cs for pi, cs in by_pi.items() if only_pi is None or pi == only_pi}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as ex:
+        list(ex.map(lambda kv: _put_prompt_objects(prefix, kv[0], kv[1]), todo.items()))
+    index = dict(header, layout=2, index=[_index_row(c) for c in cells], updatedAt=_now())
+    if bulk:
+        legacy = dict(header, cells=cells)
+        _s3.put_object(Bucket=ANSWERS_BUCKET, Key=prefix + _ANSWERS_BULK,
+                       Body=gzip.compress(json.dumps(legacy).encode("utf-8")),
+                       ContentType="application/json", ContentEncoding="gzip")
+        index["bulkAt"] = index["updatedAt"]
+    _s3.put_object(Bucket=ANSWERS_BUCKET, Key=prefix + _ANSWERS_INDEX,
+                   Body=json.dumps(index).encode("utf-8"), ContentType="application/json")
+    return index
+
+
+def _write_answers(cid, month, run_id, cfg, results):
+    """Persist every AI answer from a run to S3 — including cells where the brand was NOT
+    mentioned and competitor cells, both of which used to be discarded. The absent case is the
+    most actionable one ("who did it recommend instead of us?"), so it must be kept.
+
+    Returns the S3 key, or None if the write failed. A failure is non-fatal: the run still
+    archives, just without browsable answers, rather than losing the whole month's metrics."""
+    entities = cfg.get("entities") or []
+    header = {"campaignId": cid, "month": month, "runId": run_id, "createdAt": _now(),
+              "brand": cfg.get("brand") or "", "target": cfg.get("target") or "",
+              "entities": [e.get("name") if isinstance(e, dict) else str(e) for e in entities],
+              "prompts": cfg.get("prompts") or []}
     key = _answers_key(cid, month, run_id)
     try:
-        _s3.put_object(Bucket=ANSWERS_BUCKET, Key=key,
-                       Body=json.dumps(blob).encode("utf-8"),
-                       ContentType="application/json")
+        _put_answers_v2(_answers_prefix(key), header, _answer_cells(cfg, results))
         return key
     except Exception as e:
         print(f"[GEO] answer-store write failed for {cid}/{month}: {e}")
@@ -478,54 +544,97 @@ def _write_answers(cid, month, run_id, cfg, results):
 
 
 def _merge_answers(cid, month, run_id, cfg, results, prompt_index):
-    """Fold a single-prompt run's answers into the month's existing answer blob.
+    """Fold a single-prompt run's answers into the month's existing answer store.
 
-    Read-modify-write: cells for this prompt are replaced, every other prompt is left alone. If the
-    month has no blob yet (or it can't be read), this writes a fresh one containing just this
-    prompt — better than nothing, and the next full run supersedes it.
+    Cells for this prompt are replaced, every other prompt is left alone. On a v2 store that is
+    one prompt's objects plus the index; a legacy single-document store is migrated to a v2 store
+    under this run's prefix. If the month has no store yet (or it can't be read), this writes a
+    fresh one containing just this prompt — better than nothing, and the next full run supersedes it.
 
     Returns the S3 key, or None if the write failed (non-fatal — the answers still come back to the
     browser through run_status, so a re-run is useful even when persistence is unavailable)."""
-    existing = None
     it = _table.get_item(Key={"id": _month_item_id(cid, month)}).get("Item") or {}
     old_key = it.get("answersKey")
+    existing = None
     if old_key:
         try:
-            existing = _read_answers(old_key)
+            existing = (_read_answer_index(old_key) if _answers_prefix(old_key)
+                        else _read_answers(old_key))
         except Exception as e:
             print(f"[GEO] merge: could not read existing answers {old_key}: {e}")
-    # Reuse _write_answers' cell shape by building the new blob through it, then splicing.
-    fresh_key = _write_answers(cid, month, run_id, cfg, results)
-    if not fresh_key:
-        return None
-    try:
-        fresh = _read_answers(fresh_key)
-    except Exception:
-        return fresh_key
     if not existing:
-        return fresh_key
-    kept = [c for c in (existing.get("cells") or []) if c.get("pi") != prompt_index]
-    existing["cells"] = kept + (fresh.get("cells") or [])
-    existing["updatedAt"] = _now()
+        return _write_answers(cid, month, run_id, cfg, results)
+    fresh = _answer_cells(cfg, results)
+    header = {k: v for k, v in existing.items() if k not in ("cells", "index", "layout", "bulkAt", "updatedAt")}
     try:
-        _s3.put_object(Bucket=ANSWERS_BUCKET, Key=old_key,
-                       Body=json.dumps(existing).encode("utf-8"),
-                       ContentType="application/json")
-        return old_key
+        if _answers_prefix(old_key):
+            # The index rows stand in for the untouched prompts' cells: only `fresh` is rewritten.
+            kept = [r for r in (existing.get("index") or []) if r.get("pi") != prompt_index]
+            _put_answers_v2(_answers_prefix(old_key), header, kept + fresh, only_pi=prompt_index, bulk=False)
+            return old_key
+        kept = [c for c in (existing.get("cells") or []) if c.get("pi") != prompt_index]
+        key = _answers_key(cid, month, run_id)
+        _put_answers_v2(_answers_prefix(key), header, kept + fresh)
+        return key
     except Exception as e:
-        print(f"[GEO] merge: write-back to {old_key} failed: {e}")
-        return fresh_key
+        print(f"[GEO] merge: write to the answer store failed: {e}")
+        return _write_answers(cid, month, run_id, cfg, results)
+
+
+def _s3_body(key, byte_range=None):
+    kw = {"Range": "bytes=%d-%d" % byte_range} if byte_range else {}
+    return _s3.get_object(Bucket=ANSWERS_BUCKET, Key=key, **kw)["Body"].read()
+
+
+def _read_answer_index(key):
+    return json.loads(_s3_body(key).decode("utf-8"))
+
+
+def _read_prompt_cells(prefix, pi):
+    return [json.loads(ln) for ln in _s3_body(f"{prefix}p{pi}.jsonl").decode("utf-8").splitlines() if ln]
 
 
 def _read_answers(key):
-    obj = _s3.get_object(Bucket=ANSWERS_BUCKET, Key=key)
-    return json.loads(obj["Body"].read().decode("utf-8"))
+    """A run's answers in the legacy single-document shape ({..., "cells": [...]}), whichever
+    layout they were written in. Reads the bulk export when it's current, else every prompt."""
+    prefix = _answers_prefix(key)
+    if not prefix:
+        return json.loads(_s3_body(key).decode("utf-8"))
+    index = _read_answer_index(key)
+    if index.get("bulkAt") and index.get("bulkAt") == index.get("updatedAt"):
+        try:
+            return json.loads(gzip.decompress(_s3_body(prefix + _ANSWERS_BULK)).decode("utf-8"))
+        except Exception:
+            pass
+    pis = sorted({r.get("pi") for r in (index.get("index") or [])}, key=lambda p: (p is None, p))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as ex:
+        parts = list(ex.map(lambda pi: _read_prompt_cells(prefix, pi), pis))
+    header = {k: v for k, v in index.items() if k not in ("index", "layout", "bulkAt")}
+    return dict(header, cells=[c for part in parts for c in part])
+
+
+def _answers_export_url(key):
+    """Presigned URL to the gzip bulk form of a v2 store, rebuilding it first if a partial re-run
+    left it stale. Exports go straight to S3, clear of Lambda's 6MB response cap."""
+    prefix = _answers_prefix(key)
+    index = _read_answer_index(key)
+    if index.get("bulkAt") != index.get("updatedAt"):
+        blob = _read_answers(key)
+        _s3.put_object(Bucket=ANSWERS_BUCKET, Key=prefix + _ANSWERS_BULK,
+                       Body=gzip.compress(json.dumps(blob).encode("utf-8")),
+                       ContentType="application/json", ContentEncoding="gzip")
+        index["bulkAt"] = index["updatedAt"]
+        _s3.put_object(Bucket=ANSWERS_BUCKET, Key=key, Body=json.dumps(index).encode("utf-8"),
+                       ContentType="application/json")
+    return _s3.generate_presigned_url("get_object", ExpiresIn=900,
+                                      Params={"Bucket": ANSWERS_BUCKET, "Key": prefix + _ANSWERS_BULK})
 
 
 def h_get_answers(req):
     """Fetch stored AI answers. Without pi/ei this returns an INDEX (no answer text) so the UI can
     render the list cheaply; with pi (and optionally ei) it returns those cells' full text. That
-    keeps the dashboard's normal load free of megabyte payloads — text arrives only on expand."""
+    keeps the dashboard's normal load free of megabyte payloads — text arrives only on expand.
+    `export: true` returns a short-lived download URL for the whole run (gzip JSON) instead."""
     cid = str(req.get("id") or "")
     month = str(req.get("month") or "").strip()
     if not cid or not month:
@@ -536,7 +645,27 @@ def h_get_answers(req):
         key = it.get("answersKey")
         if not key:
             return _resp(404, {"error": "no stored answers for that month — re-run the campaign"})
+    pi, ei, pl = req.get("pi"), req.get("ei"), req.get("pl")
+    prefix = _answers_prefix(key)
     try:
+        if prefix and req.get("export"):
+            return _resp(200, {"month": month, "url": _answers_export_url(key), "expiresIn": 900})
+        if prefix and pi is None and ei is None:
+            index = _read_answer_index(key)
+            return _resp(200, {"month": index.get("month"), "prompts": index.get("prompts") or [],
+                               "entities": index.get("entities") or [], "index": index.get("index") or [],
+                               "createdAt": index.get("createdAt")})
+        if prefix and pi is not None:
+            if ei is not None and pl:
+                # One cell: its offsets, then exactly its bytes.
+                offsets = json.loads(_s3_body(f"{prefix}p{pi}.idx.json").decode("utf-8"))
+                at = offsets.get(f"{ei}|{pl}")
+                sel = ([json.loads(_s3_body(f"{prefix}p{pi}.jsonl", (at[0], at[0] + at[1] - 1)))]
+                       if at else [])
+            else:
+                sel = [c for c in _read_prompt_cells(prefix, pi)
+                       if (ei is None or c.get("ei") == ei) and (not pl or c.get("pl") == pl)]
+            return _resp(200, {"month": month, "cells": sel})
         blob = _read_answers(key)
     except Exception as e:
         # Never surface the raw boto error: S3 answers a missing key with AccessDenied (not
@@ -546,18 +675,15 @@ def h_get_answers(req):
         return _resp(404, {"error": "no stored answers for that month — re-run the campaign"})
 
     cells = blob.get("cells") or []
-    pi, ei = req.get("pi"), req.get("ei")
     if pi is None and ei is None:
-        idx = [{k: c.get(k) for k in ("ei", "pi", "pl", "engine", "entity", "prompt", "ok",
-                                      "mentioned", "sentiment", "theme", "score", "rank", "cited")}
-               for c in cells]
-        for c, i in zip(cells, idx):
-            i["chars"] = len(c.get("response") or "")
+        if req.get("export"):
+            return _resp(200, {"month": blob.get("month"), "cells": cells})
         return _resp(200, {"month": blob.get("month"), "prompts": blob.get("prompts") or [],
-                           "entities": blob.get("entities") or [], "index": idx,
+                           "entities": blob.get("entities") or [], "index": [_index_row(c) for c in cells],
                            "createdAt": blob.get("createdAt")})
     sel = [c for c in cells
-           if (pi is None or c.get("pi") == pi) and (ei is None or c.get("ei") == ei)]
+           if (pi is None or c.get("pi") == pi) and (ei is None or c.get("ei") == ei)
+           and (not pl or c.get("pl") == pl)]
     return _resp(200, {"month": blob.get("month"), "cells": sel})
 
 
@@ -659,6 +785,8 @@ def _archive_model(cid, month, model, answers_key=None, run_date=None):
     if names:  # DynamoDB rejects an empty ExpressionAttributeNames
         kwargs["ExpressionAttributeNames"] = names
     _table.update_item(**kwargs)
+    # The snapshot's prompts back the range model's query-table fallback (build_model_from_db).
+    _bump_data_version(cid)
     return months
 
 
@@ -690,6 +818,7 @@ def h_save_metrics(req):
         ExpressionAttributeNames={"#m": "metrics"},
         ExpressionAttributeValues={":m": model_json, ":h": True, ":t": now},
     )
+    _bump_data_version(cid)
     return _resp(200, {"ok": True, "id": cid, "metricsUpdatedAt": now})
 
 
@@ -761,7 +890,8 @@ def _wd_get_metrics(eid, pid, dimension, interval="daily", range_qs=None):
     return rows
 
 
-def _wd_get_citations(eid, pid, dimension, range_qs=None, on_page=None, deadline=None, max_pages=1000):
+def _wd_get_citations(eid, pid, dimension, range_qs=None, on_page=None, deadline=None, max_pages=1000,
+                      cursor=None, on_rows=None):
     """Paginated rows from Workduo's /core/v1/citations — a separate endpoint from
     /data/v1/metrics, with dimension='url'|'domain'|'query'. One row per
     dimensionValue per day; caller aggregates across the requested range.
@@ -775,8 +905,14 @@ def _wd_get_citations(eid, pid, dimension, range_qs=None, on_page=None, deadline
     got cut off both times). `max_pages` is just a runaway backstop, set high
     enough to never bind before the deadline does for any dataset seen so far.
     on_page(pages, rows_so_far), if given, fires after every page — the async
-    worker uses this to persist live progress for the frontend to poll."""
-    rows, token, pages, page_size = [], None, 0, 500
+    worker uses this to persist live progress for the frontend to poll.
+    Resumable: `cursor` is a dict ({token, pageSize, pages, done}) updated in place
+    after every page, so a caller can persist it and pick the stream up in a later
+    invocation. `on_rows(page_rows)`, if given, receives each page instead of it
+    being kept — the returned list stays empty and memory stays one page deep."""
+    cur = cursor if cursor is not None else {}
+    rows, seen, pages = [], 0, 0
+    token, page_size = cur.get("token"), cur.get("pageSize", 500)
     rng = range_qs or f"dateRange={METRICS_DATE_RANGE}"
     base = (f"{WD_CORE}/citations?projectId={pid}&entityId={eid}"
             f"&{rng}&dimension={dimension}")
@@ -789,18 +925,26 @@ def _wd_get_citations(eid, pid, dimension, range_qs=None, on_page=None, deadline
         st, b = _wd_get(u)
         if st != 200:
             if page_size:          # some windows reject pageSize — retry without it
-                page_size = 0
+                page_size = cur["pageSize"] = 0
                 continue
+            cur["failed"] = True
             break
-        rows.extend(_rows(b))
+        page = _rows(b)
+        seen += len(page)
+        if on_rows:
+            on_rows(page)
+        else:
+            rows.extend(page)
         token = b.get("nextPageToken") if isinstance(b, dict) else None
         pages += 1
+        cur.update(token=token, pageSize=page_size, pages=cur.get("pages", 0) + 1)
         if on_page:
             try:
-                on_page(pages, len(rows))
+                on_page(pages, seen)
             except Exception:
                 pass
         if not token:
+            cur["done"] = True
             return rows, False   # exhausted — complete
     return rows, True            # hit the deadline/max_pages backstop — truncated
 
@@ -819,30 +963,44 @@ def _citations_model(eid, pid, range_qs=None, on_page=None, deadline=None):
     Note: Workduo doesn't expose a per-URL x per-query cross-tab, so `queryCount`
     is the citation's real times-used count (citationUsedCount), not a distinct-
     query count — the closest genuine signal Workduo offers for that column."""
+    agg = {}
     try:
-        rows, truncated = _wd_get_citations(eid, pid, "url", range_qs=range_qs, on_page=on_page, deadline=deadline)
+        truncated = _wd_get_citations(eid, pid, "url", range_qs=range_qs, on_page=on_page, deadline=deadline,
+                                      on_rows=lambda rows: _cit_fold(agg, rows))[1]
     except Exception:
         return [], [], False, True
-    agg = {}
+    cits, citation_types = _citations_from_agg(agg)
+    return cits, citation_types, True, truncated
+
+
+def _cit_fold(agg, rows):
+    """Fold one page of url-dimension rows into `agg` ({url: [count, usedCount, responses, type]}).
+    Lists rather than dicts because the worker checkpoints agg between invocations."""
     for r in rows:
         url = r.get("dimensionValue")
         if not url:
             continue
-        a = agg.setdefault(url, {"count": 0, "usedCount": 0, "responses": 0, "type": r.get("type") or "OTHERS"})
-        a["count"] += r.get("citationCount", 0) or 0
-        a["usedCount"] += r.get("citationUsedCount", 0) or 0
-        a["responses"] += r.get("responseCount", 0) or 0
+        a = agg.get(url)
+        if a is None:
+            a = agg[url] = [0, 0, 0, r.get("type") or "OTHERS"]
+        a[0] += r.get("citationCount", 0) or 0
+        a[1] += r.get("citationUsedCount", 0) or 0
+        a[2] += r.get("responseCount", 0) or 0
         if r.get("type"):
-            a["type"] = r["type"]
-    total = sum(a["count"] for a in agg.values()) or 1
+            a[3] = r["type"]
+
+
+def _citations_from_agg(agg):
+    """(citations, citationTypes) in the dashboard table's shape from a _cit_fold aggregate."""
+    total = sum(a[0] for a in agg.values()) or 1
     cits = []
-    for url, a in agg.items():
-        label = _CIT_TYPE_LABEL.get(a["type"], "Other")
+    for url, (count, used, responses, typ) in agg.items():
+        label = _CIT_TYPE_LABEL.get(typ, "Other")
         cits.append({
-            "url": url, "domain": domain_of(url), "count": a["count"],
-            "queryCount": a["usedCount"],
-            "used": round(a["usedCount"] / a["responses"] * 100, 1) if a["responses"] else 0,
-            "share": round(a["count"] / total * 100, 1),
+            "url": url, "domain": domain_of(url), "count": count,
+            "queryCount": used,
+            "used": round(used / responses * 100, 1) if responses else 0,
+            "share": round(count / total * 100, 1),
             "owned": label == "Owned", "type": label,
         })
     cits.sort(key=lambda c: -c["count"])
@@ -851,7 +1009,7 @@ def _citations_model(eid, pid, range_qs=None, on_page=None, deadline=None):
         type_totals[c["type"]] = type_totals.get(c["type"], 0) + c["count"]
     citation_types = [{"type": t, "count": n, "color": _CIT_TYPE_COLOR[t]}
                        for t, n in type_totals.items() if n > 0]
-    return cits, citation_types, True, truncated
+    return cits, citation_types
 
 
 def _agg_overall(rows):
@@ -1057,6 +1215,80 @@ def _acc_overall(dst, r):
         dst["os"] += r["ownedCitationShare"]; dst["on"] += 1
 
 
+# ---------------------------------------------------------------------------
+# Daily row encoding. Legacy rows carry a JSON `blob` of nested dicts that repeats every entity
+# id, query id, topic and counter name on every row. Packed rows (v2) carry a zlib'd binary
+# `pack` instead: id/query/topic dictionaries plus fixed-order counter arrays. Readers go through
+# _row_data, which accepts either, so a campaign can hold a mix of both across the switch.
+# DAILY_BLOB_FORMAT=json keeps writing the legacy form (e.g. while rolling back).
+# ---------------------------------------------------------------------------
+DAILY_BLOB_FORMAT = os.environ.get("DAILY_BLOB_FORMAT", "packed")
+_DAY_PACK_VERSION = 2
+_CTR = ("m", "r", "em", "ps", "pc", "oc", "os", "on")   # _blank()'s counters, in packed order
+
+
+def _pack_day(data):
+    """Legacy day dict -> v2 columnar dict: rows are [entity#, (topic#|query#,) *counters]."""
+    ids, qids, topics = {}, {}, {}
+
+    def ix(table, k):
+        return table.setdefault(k, len(table))
+
+    def ctr(c):
+        return [c.get(f, 0) for f in _CTR]
+
+    out = {"v": _DAY_PACK_VERSION,
+           "ents": [[ix(ids, eid)] + ctr(c) for eid, c in (data.get("ents") or {}).items()],
+           "entTopics": [[ix(ids, eid), ix(topics, tp)] + ctr(c)
+                         for eid, tm in (data.get("entTopics") or {}).items() for tp, c in tm.items()],
+           "qs": [[ix(ids, eid), ix(qids, qid)] + ctr(c)
+                  for eid, byq in (data.get("qs") or {}).items() for qid, c in byq.items()],
+           "selfTopics": [[ix(topics, tp), c.get("m", 0), c.get("r", 0)]
+                          for tp, c in (data.get("selfTopics") or {}).items()]}
+    out.update(ids=list(ids), qids=list(qids), topics=list(topics))
+    extra = {k: v for k, v in data.items() if k not in ("ents", "entTopics", "qs", "selfTopics")}
+    if extra:
+        out["x"] = extra
+    return out
+
+
+def _unpack_day(p):
+    ids, qids, topics = p.get("ids") or [], p.get("qids") or [], p.get("topics") or []
+    n = len(_CTR)
+    data = dict(p.get("x") or {})
+    data["ents"] = {ids[r[0]]: dict(zip(_CTR, r[1:1 + n])) for r in p.get("ents") or []}
+    for key, names in (("entTopics", topics), ("qs", qids)):
+        rows = p.get(key) or []
+        if rows:
+            nested = data.setdefault(key, {})
+            for r in rows:
+                nested.setdefault(ids[r[0]], {})[names[r[1]]] = dict(zip(_CTR, r[2:2 + n]))
+    if p.get("selfTopics"):
+        data["selfTopics"] = {topics[r[0]]: {"m": r[1], "r": r[2]} for r in p["selfTopics"]}
+    return data
+
+
+def _zpack(obj):
+    return zlib.compress(json.dumps(obj, separators=(",", ":")).encode(), 9)
+
+
+def _row_item(cid, date, data, columnar=True):
+    """Item for a daily-table row in the configured encoding. `columnar` applies the day layout;
+    other packed rows (rollups) are just compressed JSON."""
+    if DAILY_BLOB_FORMAT == "json":
+        return {"campaignId": cid, "date": date, "blob": json.dumps(data)}
+    return {"campaignId": cid, "date": date, "pack": _zpack(_pack_day(data) if columnar else data)}
+
+
+def _row_data(it):
+    """A daily-table row's payload, whichever encoding it was written in."""
+    if it.get("pack") is not None:
+        raw = it["pack"]
+        obj = json.loads(zlib.decompress(bytes(getattr(raw, "value", raw))).decode())
+        return _unpack_day(obj) if obj.get("v") == _DAY_PACK_VERSION and "ids" in obj else obj
+    return json.loads(it["blob"])
+
+
 _OVR_PREFIX = "__ovr__"
 
 
@@ -1064,7 +1296,7 @@ def _ovr_date_key(date):
     return _OVR_PREFIX + date
 
 
-def _load_day_overrides(cid, start, end):
+def _load_day_overrides(cid, start, end, consistent=False):
     """Manual per-date corrections for a window, as {date: {"ents": {...}, "queries": {...}}}.
 
     Stored one row per date under a `__ovr__<date>` sort key in the SAME daily table, which buys
@@ -1072,13 +1304,16 @@ def _load_day_overrides(cid, start, end):
     can't clobber them — it only ever put_items real `<date>` rows plus `__meta__`. The prefix
     also sorts clear of the real dates ('_' > any digit), so `between(start, end)` on the metrics
     query never picks these up.
+
+    `consistent` forces strongly consistent reads — for callers that just wrote these rows.
     """
     out = {}
     cond = Key("campaignId").eq(cid) & Key("date").between(_ovr_date_key(start), _ovr_date_key(end))
-    resp = _daily_tbl.query(KeyConditionExpression=cond)
+    resp = _daily_tbl.query(KeyConditionExpression=cond, ConsistentRead=consistent)
     items = resp.get("Items", [])
     while "LastEvaluatedKey" in resp:
-        resp = _daily_tbl.query(KeyConditionExpression=cond, ExclusiveStartKey=resp["LastEvaluatedKey"])
+        resp = _daily_tbl.query(KeyConditionExpression=cond, ConsistentRead=consistent,
+                                ExclusiveStartKey=resp["LastEvaluatedKey"])
         items.extend(resp.get("Items", []))
     for it in items:
         try:
@@ -1140,6 +1375,216 @@ def _patch_day_query(ov, qo):
     return o
 
 
+# ---------------------------------------------------------------------------
+# Range rollups. A year-to-date view used to read and re-fold every daily row, so it got slower
+# every day we collected data. Each day is reduced (overrides applied) to a "part" — exactly what
+# build_model_from_db folds — and parts are pre-summed into calendar-month and Mon–Sun week rows,
+# so a range reads its whole months + whole edge weeks + a few edge days. Rollup rows live in the
+# daily table under `__roll__M#<YYYY-MM>` / `__roll__W#<monday>`; like `__ovr__`, the prefix sorts
+# clear of real dates. Rebuilt by every writer of the rows they summarise: export_daily and the
+# day-override set/clear handlers. A missing rollup just means its days are read instead.
+# ---------------------------------------------------------------------------
+_ROLL_PREFIX = "__roll__"
+
+
+def _roll_key(kind, period):
+    return f"{_ROLL_PREFIX}{kind}#{period}"
+
+
+def _query_daily(cid, lo, hi, consistent=False):
+    cond = Key("campaignId").eq(cid) & Key("date").between(lo, hi)
+    resp = _daily_tbl.query(KeyConditionExpression=cond, ConsistentRead=consistent)
+    items = resp.get("Items", [])
+    while "LastEvaluatedKey" in resp:
+        resp = _daily_tbl.query(KeyConditionExpression=cond, ConsistentRead=consistent,
+                                ExclusiveStartKey=resp["LastEvaluatedKey"])
+        items.extend(resp.get("Items", []))
+    return items
+
+
+def _vis(c):
+    return round(c["m"] / c["r"] * 100, 1) if c.get("r") else 0
+
+
+def _day_part(d, data, dov, self_eid):
+    """One day's blob reduced to a foldable part: corrected whole-brand counters, raw per-topic
+    counters (topic views stay uncorrected — see build_model_from_db), per-query counters with the
+    self brand's query corrections applied, and the day's trend-chart points."""
+    ents = data.get("ents") or {}
+    if dov.get("ents"):
+        ents = _patch_day_counters(ents, dov["ents"])
+    ent_topics = data.get("entTopics") or {}
+    dq_ov = dov.get("queries") or {}
+    qs = {eid: {qid: (_patch_day_query(qov, dq_ov[qid]) if eid == self_eid and dq_ov.get(qid) else qov)
+                for qid, qov in byq.items()}
+          for eid, byq in (data.get("qs") or {}).items()}
+    self_topics = data.get("selfTopics") or {}
+    topics = set(self_topics)
+    point = {"v": {eid: _vis(ov) for eid, ov in ents.items()}}
+    for eid, tm in ent_topics.items():
+        topics.update(tm)
+        for tp, ov in tm.items():
+            if ov:
+                point.setdefault("tv", {}).setdefault(tp, {})[eid] = _vis(ov)
+    if self_topics:
+        point["st"] = {tp: _vis(v) for tp, v in self_topics.items()}
+    return {"ents": ents, "entTopics": ent_topics, "qs": qs, "topics": sorted(topics), "days": {d: point}}
+
+
+def _sum_into(dst, src):
+    for k, ov in src.items():
+        t = dst.setdefault(k, _blank())
+        for f in t:
+            t[f] += ov.get(f, 0) or 0
+
+
+def _merge_parts(parts):
+    out = {"ents": {}, "entTopics": {}, "qs": {}, "topics": set(), "days": {}}
+    for p in parts:
+        _sum_into(out["ents"], p.get("ents") or {})
+        for eid, tm in (p.get("entTopics") or {}).items():
+            _sum_into(out["entTopics"].setdefault(eid, {}), tm)
+        for eid, byq in (p.get("qs") or {}).items():
+            _sum_into(out["qs"].setdefault(eid, {}), byq)
+        out["topics"].update(p.get("topics") or [])
+        out["days"].update(p.get("days") or {})
+    out["topics"] = sorted(out["topics"])
+    return out
+
+
+def _iso(d):
+    return d.isoformat()
+
+
+def _parse_day(s):
+    return datetime.strptime(s, "%Y-%m-%d").date()
+
+
+def _month_bounds(d):
+    first = d.replace(day=1)
+    return first, first.replace(day=calendar.monthrange(first.year, first.month)[1])
+
+
+def _coalesce(spans):
+    """Merge overlapping/adjacent (start, end) ISO-date spans so each becomes one range query."""
+    out = []
+    for a, b in sorted(spans):
+        if out and _parse_day(a) <= _parse_day(out[-1][1]) + timedelta(days=1):
+            out[-1] = (out[-1][0], max(out[-1][1], b))
+        else:
+            out.append((a, b))
+    return out
+
+
+def _rollup_plan(start, end):
+    """Cover [start, end] with whole calendar months, then whole Mon–Sun weeks in the leftover
+    edges, then single days. Returns (months, weeks, day_spans); periods are (key, start, end)."""
+    s, e = _parse_day(start), _parse_day(end)
+    months, cur = [], s if s.day == 1 else _month_bounds(s)[1] + timedelta(days=1)
+    first_month = cur
+    while cur <= e:
+        m_first, m_last = _month_bounds(cur)
+        if m_last > e:
+            break
+        months.append((cur.strftime("%Y-%m"), _iso(m_first), _iso(m_last)))
+        cur = m_last + timedelta(days=1)
+    edges = [(s, first_month - timedelta(days=1)), (cur, e)] if months else [(s, e)]
+    weeks, days = [], []
+    for a, b in edges:
+        d = a
+        while d <= b:
+            if d.weekday() == 0 and d + timedelta(days=6) <= b:
+                weeks.append((_iso(d), _iso(d), _iso(d + timedelta(days=6))))
+                d += timedelta(days=7)
+            else:
+                days.append((_iso(d), _iso(d)))
+                d += timedelta(days=1)
+    return months, weeks, _coalesce(days)
+
+
+def _range_parts(cid, start, end, self_eid):
+    """The parts covering [start, end]: rollup rows where they exist, day rows for the rest."""
+    try:
+        months, weeks, spans = _rollup_plan(start, end)
+    except ValueError:
+        months, weeks, spans = [], [], [(start, end)]
+    parts = []
+    for kind, periods in (("M", months), ("W", weeks)):
+        if not periods:
+            continue
+        got = {str(it["date"]): it for it in _query_daily(cid, _roll_key(kind, periods[0][0]),
+                                                               _roll_key(kind, periods[-1][0]))}
+        for key, ps, pe in periods:
+            it = got.get(_roll_key(kind, key))
+            if it:
+                parts.append(_row_data(it))
+            else:
+                spans.append((ps, pe))
+    for a, b in _coalesce(spans):
+        day_ovr = _load_day_overrides(cid, a, b)
+        for it in _query_daily(cid, a, b):
+            d = str(it["date"])
+            parts.append(_day_part(d, _row_data(it), day_ovr.get(d) or {}, self_eid))
+    return parts
+
+
+def _rebuild_rollups(cid, dates):
+    """Recompute every month and week rollup containing any of `dates` from the stored day rows
+    and overrides. A period with no day rows left loses its rollup row. Every read here is
+    strongly consistent: the rebuild runs straight after the put_item it summarises, and an
+    eventually consistent read could miss that write and bake the old value into the rollup."""
+    if not dates:
+        return 0
+    meta_item = _daily_tbl.get_item(Key={"campaignId": cid, "date": "__meta__"},
+                                    ConsistentRead=True).get("Item")
+    meta = json.loads(meta_item["blob"]) if meta_item else {}
+    self_eid = next((eid for eid, m in (meta.get("entities") or {}).items() if m.get("isSelf")), None)
+    periods = {}
+    for ds in set(dates):
+        d = _parse_day(ds)
+        m_first, m_last = _month_bounds(d)
+        periods[_roll_key("M", d.strftime("%Y-%m"))] = (_iso(m_first), _iso(m_last))
+        w = d - timedelta(days=d.weekday())
+        periods[_roll_key("W", _iso(w))] = (_iso(w), _iso(w + timedelta(days=6)))
+    lo = min(a for a, _ in periods.values())
+    hi = max(b for _, b in periods.values())
+    day_ovr = _load_day_overrides(cid, lo, hi, consistent=True)
+    parts = {}
+    for it in _query_daily(cid, lo, hi, consistent=True):
+        d = str(it["date"])
+        try:
+            parts[d] = _day_part(d, _row_data(it), day_ovr.get(d) or {}, self_eid)
+        except Exception:
+            continue
+    with _daily_tbl.batch_writer() as bw:
+        for key, (a, b) in periods.items():
+            in_period = [p for d, p in parts.items() if a <= d <= b]
+            if in_period:
+                bw.put_item(Item=_row_item(cid, key, _merge_parts(in_period), columnar=False))
+            else:
+                bw.delete_item(Key={"campaignId": cid, "date": key})
+    return len(periods)
+
+
+def _refresh_rollups(cid, dates):
+    """_rebuild_rollups that never fails the write it follows. If the rebuild fails, the affected
+    rollups are deleted instead, so reads fall back to the (correct) day rows, never a stale sum."""
+    try:
+        return _rebuild_rollups(cid, dates)
+    except Exception as e:
+        print("[GEO] rollup rebuild failed for %s: %s" % (cid, str(e)[:200]))
+        try:
+            with _daily_tbl.batch_writer() as bw:
+                for ds in set(dates):
+                    d = _parse_day(ds)
+                    bw.delete_item(Key={"campaignId": cid, "date": _roll_key("M", d.strftime("%Y-%m"))})
+                    bw.delete_item(Key={"campaignId": cid,
+                                        "date": _roll_key("W", _iso(d - timedelta(days=d.weekday())))})
+        except Exception:
+            pass
+        return 0
+
+
 def export_daily(campaign, proj=None, max_windows=24):
     """Pull available daily history from Workduo and store it per (campaign, date)
     in geoCampaignDaily. Walks backward in 30-day windows until the data runs out
@@ -1228,7 +1673,9 @@ def export_daily(campaign, proj=None, max_windows=24):
     _daily_tbl.put_item(Item={"campaignId": pid, "date": "__meta__", "blob": json.dumps(meta)})
     with _daily_tbl.batch_writer() as bw:
         for d, data in days.items():
-            bw.put_item(Item={"campaignId": pid, "date": d, "blob": json.dumps(data)})
+            bw.put_item(Item=_row_item(pid, d, data))
+    rollups = _refresh_rollups(pid, list(days))
+    _bump_data_version(pid)
     # mark the definition row so the frontend knows daily data is queryable.
     # Never shrink dailyDays: an incremental refresh (small max_windows) writes
     # only recent days but must not clobber the full-history count already stored.
@@ -1244,7 +1691,7 @@ def export_daily(campaign, proj=None, max_windows=24):
                            ExpressionAttributeValues={":h": True, ":d": stored_days, ":t": _now()})
     except Exception:
         pass
-    return {"days": len(days), "windows": windows_used, "entities": len(metas)}
+    return {"days": len(days), "windows": windows_used, "entities": len(metas), "rollups": rollups}
 
 
 def _range_dates(req):
@@ -1288,64 +1735,33 @@ def build_model_from_db(cid, start, end, label, topic=None):
     meta = json.loads(meta_item["blob"])
     ents_meta, primary_id = meta["entities"], meta.get("primaryId")
 
-    cond = Key("campaignId").eq(cid) & Key("date").between(start, end)
-    resp = _daily_tbl.query(KeyConditionExpression=cond)
-    items = resp.get("Items", [])
-    while "LastEvaluatedKey" in resp:
-        resp = _daily_tbl.query(KeyConditionExpression=cond, ExclusiveStartKey=resp["LastEvaluatedKey"])
-        items.extend(resp.get("Items", []))
-
-    day_ovr = _load_day_overrides(cid, start, end)
     self_eid = next((eid for eid, m in ents_meta.items() if m.get("isSelf")), None)
-    q_self, q_comp, q_seen = {}, {}, {}
-
-    ent_tot, series, topic_by_date, avail_topics = {}, {}, {}, set()
-    for it in items:
-        d = it["date"]
-        data = json.loads(it["blob"])
-        dov = day_ovr.get(d) or {}
-        ent_topics = data.get("entTopics") or {}
-        for _tm in ent_topics.values():
-            avail_topics.update(_tm.keys())
-        # Per-day per-entity source: topic-scoped slice when a topic is requested, else the
-        # whole-brand overall. entTopics values share the `ents` shape so the math is identical.
-        if topic:
-            src = {eid: (tm.get(topic)) for eid, tm in ent_topics.items() if tm.get(topic)}
-        else:
-            src = data.get("ents", {})
-            # Corrections are recorded against the whole-brand day, so they'd be double-counted
-            # (and mis-scaled) if also applied to a single topic's slice — topic views stay raw.
-            if dov.get("ents"):
-                src = _patch_day_counters(src, dov["ents"])
-
-        # Per-query daily accumulators for self + the primary competitor, so the query table is
-        # range-accurate rather than borrowed from the month snapshot.
-        qmap = data.get("qs") or {}
-        dq_ov = dov.get("queries") or {}
-        for _eid, byq in qmap.items():
-            tgt = q_self if _eid == self_eid else (q_comp if _eid == primary_id else None)
-            if tgt is None:
-                continue
-            for qid, qov in byq.items():
-                if tgt is q_self:
-                    q_seen[qid] = 1
-                    if dq_ov.get(qid):
-                        qov = _patch_day_query(qov, dq_ov[qid])
-                t = tgt.setdefault(qid, _blank())
-                for k in t:
-                    t[k] += qov.get(k, 0) or 0
-
-        for eid, ov in src.items():
-            t = ent_tot.setdefault(eid, _blank())
-            for k in t:
-                t[k] += ov.get(k, 0)
-            nm = (ents_meta.get(eid) or {}).get("name") or eid
-            series.setdefault(d, {})[nm] = round(ov["m"] / ov["r"] * 100, 1) if ov.get("r") else 0
-        st = data.get("selfTopics") or {}
-        if st:
-            avail_topics.update(st.keys())
-            topic_by_date[d] = {tp: round(v["m"] / v["r"] * 100, 1) if v.get("r") else 0
-                                for tp, v in st.items()}
+    # Whole months/weeks come pre-folded (overrides applied) from the rollup rows; only the edge
+    # days are read and reduced here. See _range_parts.
+    agg = _merge_parts(_range_parts(cid, start, end, self_eid))
+    avail_topics = set(agg["topics"])
+
+    # Per-entity source: topic-scoped slice when a topic is requested, else the whole-brand
+    # overall. entTopics values share the `ents` shape so the math is identical. Corrections are
+    # recorded against the whole-brand day, so they'd be double-counted (and mis-scaled) if also
+    # applied to a single topic's slice — topic views stay raw.
+    if topic:
+        ent_tot = {eid: tm[topic] for eid, tm in agg["entTopics"].items() if topic in tm}
+    else:
+        ent_tot = agg["ents"]
+    series, topic_by_date = {}, {}
+    for d, point in agg["days"].items():
+        vals = ((point.get("tv") or {}).get(topic) or {}) if topic else point.get("v") or {}
+        for eid, v in vals.items():
+            series.setdefault(d, {})[(ents_meta.get(eid) or {}).get("name") or eid] = v
+        if point.get("st"):
+            topic_by_date[d] = point["st"]
+
+    # Per-query accumulators for self + the primary competitor, so the query table is
+    # range-accurate rather than borrowed from the month snapshot.
+    q_self = agg["qs"].get(self_eid) or {} if self_eid else {}
+    q_comp = agg["qs"].get(primary_id) or {} if primary_id else {}
+    q_seen = dict.fromkeys(q_self, 1)
     if topic and not ent_tot:
         raise RuntimeError("no per-topic data for this range yet — re-export daily history to populate topics")
 
@@ -1476,6 +1892,7 @@ def h_import_metrics(req):
         ExpressionAttributeNames={"#m": "metrics"},
         ExpressionAttributeValues={":m": json.dumps(model), ":h": True, ":t": _now(), ":s": "workduo"},
     )
+    _bump_data_version(cid)
     return _resp(200, {"ok": True, "id": cid, "entities": len(model["entities"]),
                        "prompts": len(model["prompts"]), "days": len(model["visibilitySeries"]),
                        "self": model["self"]})
@@ -1487,61 +1904,143 @@ def h_import_citations(req):
     ~7-9s/page) — far past any API Gateway integration timeout — so the actual
     work runs in a separate self-invoked ('Event') Lambda execution with its own
     full 900s budget, decoupled from this request entirely. The frontend polls
-    `get` and watches citationsStatus / citationsProgress on the campaign record."""
+    `get` and watches citationsStatus / citationsProgress on the campaign record.
+    A long import spans several chained worker invocations (see h_citations_worker);
+    citationsChunkAt is their heartbeat, so "already running" means a chunk started
+    recently, not that the whole import did."""
     cid = str(req.get("id") or "")
     it = _table.get_item(Key={"id": cid}).get("Item")
     if not it:
         return _resp(404, {"error": "campaign not found"})
     if not it.get("entityId"):
         return _resp(400, {"error": "campaign has no entityId — re-import its definition first"})
-    if it.get("citationsStatus") == "running" and it.get("citationsStartedAt"):
+    beat = it.get("citationsChunkAt") or it.get("citationsStartedAt")
+    if it.get("citationsStatus") == "running" and beat:
         try:
-            started = calendar.timegm(time.strptime(it["citationsStartedAt"], "%Y-%m-%dT%H:%M:%SZ"))
+            started = calendar.timegm(time.strptime(beat, "%Y-%m-%dT%H:%M:%SZ"))
             age = time.time() - started
         except Exception:
             age = 0
         if age < 900:   # can't outlive the worker's own Lambda timeout
             return _resp(200, {"ok": True, "id": cid, "status": "already_running"})
+    run_id = uuid.uuid4().hex
+    now = _now()
     _table.update_item(
         Key={"id": cid},
-        UpdateExpression="SET citationsStatus = :s, citationsStartedAt = :t, citationsProgress = :p REMOVE citationsError",
-        ExpressionAttributeValues={":s": "running", ":t": _now(), ":p": {"pages": 0, "rows": 0}},
+        UpdateExpression=("SET citationsStatus = :s, citationsStartedAt = :t, citationsChunkAt = :t, "
+                          "citationsRunId = :r, citationsProgress = :p REMOVE citationsError"),
+        ExpressionAttributeValues={":s": "running", ":t": now, ":r": run_id, ":p": {"pages": 0, "rows": 0}},
     )
     _lambda_client.invoke(FunctionName=FUNCTION_NAME, InvocationType="Event",
-                          Payload=json.dumps({"action": "_citations_worker", "id": cid}).encode())
+                          Payload=json.dumps({"action": "_citations_worker", "id": cid, "runId": run_id}).encode())
     return _resp(200, {"ok": True, "id": cid, "status": "started"})
 
 
 CITATIONS_WORKER_BUDGET_SEC = 800   # leaves ~100s buffer under this Lambda's 900s function timeout
+# The citations endpoint is cursor-only, so one stream is strictly sequential. The import window
+# is cut into this many contiguous custom date ranges instead, each its own cursor, fetched in
+# parallel — rows are per URL per day, so summing the windows is exact. 1 = the single preset query.
+CITATIONS_STREAMS = int(os.environ.get("GEO_CITATIONS_STREAMS", "4"))
+CITATIONS_MAX_CHUNKS = int(os.environ.get("GEO_CITATIONS_MAX_CHUNKS", "8"))   # re-invoke backstop
+CITATIONS_DAYS = 30
+
+
+def _citation_windows():
+    """Range query strings covering the last CITATIONS_DAYS days (the same window as the
+    last30days preset, per _range_dates), split CITATIONS_STREAMS ways."""
+    n = max(1, min(CITATIONS_STREAMS, CITATIONS_DAYS))
+    if n == 1:
+        return ["dateRange=last%ddays" % CITATIONS_DAYS]
+    start = _today() - timedelta(days=CITATIONS_DAYS - 1)
+    out = []
+    for k in range(n):
+        a = start + timedelta(days=CITATIONS_DAYS * k // n)
+        b = start + timedelta(days=CITATIONS_DAYS * (k + 1) // n - 1)
+        out.append(f"dateRange=custom&startDate={a.isoformat()}&endDate={b.isoformat()}")
+    return out
+
+
+def _citations_checkpoint_key(cid, run_id):
+    return "citations/%s/%s.json.gz" % (cid, run_id)
+
+
+def _load_citations_checkpoint(cid, run_id):
+    try:
+        body = _s3.get_object(Bucket=ANSWERS_BUCKET, Key=_citations_checkpoint_key(cid, run_id))["Body"].read()
+        return json.loads(gzip.decompress(body).decode("utf-8"))
+    except Exception:
+        return None
 
 
 def h_citations_worker(req):
     """Runs ONLY via self-invoke from h_import_citations — not meant to be called
     synchronously by an HTTP client. Fetches full per-URL citation detail for one
     campaign and merges it into the saved metrics snapshot, updating live progress
-    in DynamoDB after every page so the frontend can poll a status/ETA. Bounded by
-    a wall-clock deadline rather than a page count — see _wd_get_citations."""
+    in DynamoDB after every page so the frontend can poll a status/ETA.
+
+    The window is fetched as CITATIONS_STREAMS parallel date-range cursors, each
+    page folded straight into a per-URL aggregate (no row list is ever held). When
+    the wall-clock budget runs out with cursors left, the cursors + aggregate are
+    checkpointed to S3 and the worker re-invokes itself with `chunk + 1` to carry
+    on; only after CITATIONS_MAX_CHUNKS chunks does it settle for a truncated
+    result. `runId` ties the chain to one import — a newer import supersedes it."""
     cid = str(req.get("id") or "")
+    run_id = str(req.get("runId") or "")
+    chunk = int(req.get("chunk") or 0)
     it = _table.get_item(Key={"id": cid}).get("Item")
     if not it or not it.get("entityId"):
         return _resp(200, {"ok": False, "error": "campaign missing or has no entityId"})
+    if run_id and it.get("citationsRunId") and it["citationsRunId"] != run_id:
+        return _resp(200, {"ok": False, "error": "superseded by a newer import"})
     eid = it["entityId"]
-    progress = {"pages": 0, "rows": 0}
+    state = (_load_citations_checkpoint(cid, run_id) if chunk else None) or {
+        "streams": [{"qs": q} for q in _citation_windows()], "agg": {}, "pages": 0, "rows": 0}
+    agg, lock = state["agg"], threading.Lock()
 
-    def on_page(pages, rows):
-        progress["pages"], progress["rows"] = pages, rows
+    def on_rows(rows):
+        with lock:
+            _cit_fold(agg, rows)
+            state["pages"] += 1
+            state["rows"] += len(rows)
+            progress = {"pages": state["pages"], "rows": state["rows"], "chunk": chunk + 1}
         try:
             _table.update_item(Key={"id": cid}, UpdateExpression="SET citationsProgress = :p",
                                ExpressionAttributeValues={":p": progress})
         except Exception:
             pass
 
+    def run_stream(stream, deadline):
+        try:
+            _wd_get_citations(eid, cid, "url", range_qs=stream["qs"], deadline=deadline,
+                              cursor=stream, on_rows=on_rows)
+        except Exception as e:
+            stream["failed"] = True
+            print("[GEO] citations stream failed (%s): %s" % (stream["qs"], str(e)[:160]))
+
+    ckey = _citations_checkpoint_key(cid, run_id)
     try:
+        try:
+            _table.update_item(Key={"id": cid}, UpdateExpression="SET citationsChunkAt = :t",
+                               ExpressionAttributeValues={":t": _now()})
+        except Exception:
+            pass
         deadline = time.time() + CITATIONS_WORKER_BUDGET_SEC
-        cits, citation_types, ok, truncated = _citations_model(
-            eid, cid, range_qs="dateRange=last30days", on_page=on_page, deadline=deadline)
-        if not ok:
+        live = [st for st in state["streams"] if not st.get("done") and not st.get("failed")]
+        if live:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=len(live)) as pool:
+                list(pool.map(lambda st: run_stream(st, deadline), live))
+        if all(st.get("failed") for st in state["streams"]) and not agg:
             raise RuntimeError("Workduo citations fetch failed")
+        left = [st for st in state["streams"] if not st.get("done") and not st.get("failed")]
+        if left and chunk + 1 < CITATIONS_MAX_CHUNKS:
+            _s3.put_object(Bucket=ANSWERS_BUCKET, Key=ckey, ContentType="application/json",
+                           ContentEncoding="gzip", Body=gzip.compress(json.dumps(state).encode("utf-8")))
+            _lambda_client.invoke(FunctionName=FUNCTION_NAME, InvocationType="Event",
+                                  Payload=json.dumps({"action": "_citations_worker", "id": cid,
+                                                      "runId": run_id, "chunk": chunk + 1}).encode())
+            return _resp(200, {"ok": True, "id": cid, "chunk": chunk, "continued": True})
+        truncated = bool(left) or any(st.get("failed") for st in state["streams"])
+        cits, citation_types = _citations_from_agg(agg)
         snap = _table.get_item(Key={"id": cid}).get("Item") or {}
         metrics = json.loads(snap["metrics"]) if snap.get("metrics") else {}
         metrics.update({"citations": cits, "citationTypes": citation_types,
@@ -1552,23 +2051,94 @@ def h_citations_worker(req):
                               "citationsLastRunPages = :lp, citationsTruncated = :tr REMOVE citationsError"),
             ExpressionAttributeNames={"#m": "metrics"},
             ExpressionAttributeValues={":m": json.dumps(metrics), ":s": "done", ":t": _now(),
-                                       ":lp": progress["pages"], ":tr": truncated},
+                                       ":lp": state["pages"], ":tr": truncated},
         )
+        _bump_data_version(cid)
     except Exception as e:
         _table.update_item(Key={"id": cid}, UpdateExpression="SET citationsStatus = :s, citationsError = :e",
                            ExpressionAttributeValues={":s": "error", ":e": str(e)[:500]})
+    if chunk:
+        try:
+            _s3.delete_object(Bucket=ANSWERS_BUCKET, Key=ckey)
+        except Exception:
+            pass
     return _resp(200, {"ok": True, "id": cid})
 
 
+# ---------------------------------------------------------------------------
+# Range-model cache. A historical range's model only changes when its inputs do, so computed
+# models are kept per (campaign, start, end, topic) in the daily table (`__model__…` rows, packed
+# like rollups) alongside the campaign's data version (`__ver__`). Every writer of an input —
+# export_daily, the day-override and campaign-override handlers, and every writer of the
+# campaign's `metrics` snapshot (build_model_from_db's fallback): _archive_model, the legacy
+# save_metrics path, import_metrics / the bulk import and the citations worker — bumps the version, which
+# invalidates all of that campaign's cached models at once. Rows also carry `ttl` so churned keys
+# (rolling presets move daily) age out where table TTL is enabled; reads honour it too, since
+# TTL deletion can lag expiry by days.
+# ---------------------------------------------------------------------------
+_VER_KEY = "__ver__"
+_MODEL_PREFIX = "__model__"
+MODEL_CACHE_TTL_SECONDS = int(os.environ.get("GEO_MODEL_CACHE_TTL_SEC", str(7 * 24 * 3600)))
+
+
+def _bump_data_version(cid):
+    """Invalidate every cached range model for `cid`. Never raises — a failed bump must not fail
+    the write it follows (worst case the cache serves until its ttl, as before this existed)."""
+    try:
+        _daily_tbl.update_item(Key={"campaignId": cid, "date": _VER_KEY},
+                               UpdateExpression="ADD v :one", ExpressionAttributeValues={":one": 1})
+    except Exception as e:
+        print("[GEO] data version bump failed for %s: %s" % (cid, str(e)[:160]))
+
+
+def _cached_model_from_db(cid, start, end, label, topic=None):
+    """build_model_from_db behind the range-model cache: one BatchGetItem (version + cached
+    model) on a hit, a full build + write-back on a miss. The read is strongly consistent so a
+    version bump that just landed is always seen; if either key comes back unprocessed the
+    version is unknown, so the model is built without being cached."""
+    ckey = {"campaignId": cid, "date": "%s%s#%s#%s" % (_MODEL_PREFIX, start, end, topic or "")}
+    vkey = {"campaignId": cid, "date": _VER_KEY}
+    ver, cached = 0, None
+    try:
+        got = _ddb.batch_get_item(RequestItems={DAILY_TABLE: {"Keys": [vkey, ckey], "ConsistentRead": True}})
+        for it in (got.get("Responses") or {}).get(DAILY_TABLE) or []:
+            if it.get("date") == _VER_KEY:
+                ver = it.get("v") or 0
+            else:
+                cached = it
+        if got.get("UnprocessedKeys"):
+            ver, cached = None, None
+    except Exception as e:
+        print("[GEO] model cache read failed:", str(e)[:160])
+        ver, cached = None, None
+    if cached is not None and cached.get("ver") == ver and int(cached.get("ttl") or 0) > time.time():
+        try:
+            model = _row_data(cached)
+            model["dateRange"] = label  # presets share a window (e.g. last30days vs custom)
+            return model
+        except Exception:
+            pass
+    model = build_model_from_db(cid, start, end, label, topic=topic)
+    if ver is None:
+        return model
+    try:
+        _daily_tbl.put_item(Item={**_row_item(cid, ckey["date"], model, columnar=False), "ver": ver,
+                                  "ttl": int(time.time()) + MODEL_CACHE_TTL_SECONDS})
+    except Exception as e:
+        print("[GEO] model cache write failed:", str(e)[:160])
+    return model
+
+
 def h_metrics_for_range(req):
     """On-demand: build a campaign's model for a chosen date range straight from our
-    DynamoDB daily store — NO Workduo calls. Fast (single DynamoDB date-range query)."""
+    DynamoDB daily store — NO Workduo calls. Served from the range-model cache when nothing
+    under the range has changed since it was last built."""
     cid = str(req.get("id") or "")
     start, end, preset, label = _range_dates(req)
     topic = (req.get("topic") or "").strip() or None
     if topic and topic.lower() in ("all", "all topics"):
         topic = None
-    model = build_model_from_db(cid, start, end, label, topic=topic)
+    model = _cached_model_from_db(cid, start, end, label, topic=topic)
     model["dateRangePreset"] = preset
     return _resp(200, {"id": cid, "model": model})
 
@@ -1609,6 +2179,7 @@ def h_migrate_all(req):
                     ExpressionAttributeNames={"#m": "metrics"},
                     ExpressionAttributeValues={":m": json.dumps(model), ":h": True, ":t": _now(), ":s": "workduo"},
                 )
+            _bump_data_version(pid)
             results.append({"id": pid, "name": name, "status": "done", "visibility": vis})
         except Exception as e:
             results.append({"id": pid, "name": name, "status": "error", "error": str(e)})
@@ -1761,16 +2332,114 @@ def _alert(text):
         print("[GEO-ALERT] webhook failed:", str(e)[:160])
 
 
+# Raw engine answers, shared across entities, runs and campaigns. The answer to a
+# (prompt, platform, location) doesn't depend on which brand is being graded, so a run checking
+# the self brand + N competitors used to pay DataForSEO N+1 times for the same text. It's now
+# fetched once per day and graded per entity. Lives in the daily table (`ans#<hash>` partition,
+# the day as sort key) rather than the campaigns table, so campaign scans never page through the
+# answer blobs, and expires via `ttl` like the model cache.
+ANSWER_CACHE_PREFIX = "ans#"
+ANSWER_CACHE_TTL_SECONDS = int(os.environ.get("GEO_ANSWER_CACHE_TTL_SEC", str(36 * 3600)))
+_answer_flights = {}                 # cache id -> {"ev", "val"|"err"}: one fetch in flight per key
+_answer_flights_lock = threading.Lock()
+
+
+def _answer_cache_id(prompt, model, location, day):
+    raw = "\x1f".join([(prompt or "").strip(), model or "", (location or "").strip().lower(), day])
+    return ANSWER_CACHE_PREFIX + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _fetch_engine_answer(cid, prompt, model, location, day):
+    try:
+        it = _daily_tbl.get_item(Key={"campaignId": cid, "date": day}).get("Item")
+        if it and "answer" in it:
+            return {"answer": it["answer"], "citations": it.get("citations") or [],
+                    "model_name": it.get("model_name") or model}
+    except Exception as e:
+        print("[GEO] answer cache read failed:", str(e)[:160])
+    _st, raw = _post_json(DFS_ENDPOINT, {"action": "fetch_answer", "prompt": prompt,
+                                         "location": location, "models": [model]}, timeout=90)
+    data = _unwrap(raw)
+    if not isinstance(data, dict) or data.get("error") or "answer" not in data:
+        raise RuntimeError((data or {}).get("error") if isinstance(data, dict) else "no data")
+    val = {"answer": data.get("answer") or "",
+           "citations": [{"url": c.get("url"), "title": c.get("title") or ""}
+                         for c in (data.get("citations") or []) if isinstance(c, dict) and c.get("url")],
+           "model_name": data.get("model_name") or model}
+    try:
+        _daily_tbl.put_item(Item={"campaignId": cid, "date": day, "type": "answer_cache",
+                                  "prompt": prompt[:500], "model": model, "location": location, **val,
+                                  "ttl": int(time.time()) + ANSWER_CACHE_TTL_SECONDS})
+    except Exception as e:
+        print("[GEO] answer cache write failed:", str(e)[:160])
+    return val
+
+
+def _engine_answer(prompt, model, location):
+    """The DataForSEO engine's answer for (prompt, platform, location) today, fetched at most
+    once: concurrent callers for the same key wait on the first one's fetch, later ones read the
+    cached item. Raises on failure (and caches nothing) so _verify_one's retry policy applies."""
+    day = _today().strftime("%Y-%m-%d")
+    cid = _answer_cache_id(prompt, model, location, day)
+    with _answer_flights_lock:
+        flight = _answer_flights.get(cid)
+        leader = flight is None
+        if leader:
+            flight = _answer_flights[cid] = {"ev": threading.Event()}
+    if not leader:
+        flight["ev"].wait(120)
+        if "val" in flight:
+            return flight["val"]
+        raise RuntimeError(flight.get("err") or "answer fetch timed out")
+    try:
+        flight["val"] = _fetch_engine_answer(cid, prompt, model, location, day)
+        return flight["val"]
+    except Exception as e:
+        flight["err"] = str(e)[:200]
+        raise
+    finally:
+        with _answer_flights_lock:
+            _answer_flights.pop(cid, None)
+        flight["ev"].set()
+
+
 def _verify_one(prompt, brand, url, model, source, location, deadline=None, aliases=None):
     """Retry wrapper around one prompt×brand×platform check. Successful results (incl. a valid
     'not mentioned') return immediately; only failures are retried, with short backoff, and only
     when they look transient — so a flaky DataForSEO call self-heals instead of silently dropping
     the data point. Bounded to 3 attempts and never re-tries a permanent/bad-request error."""
+    return _with_retries(lambda: _verify_once(prompt, brand, url, model, source, location, deadline, aliases),
+                         deadline)
+
+
+def _verify_group(prompt, ents, model, location, deadline=None):
+    """Every entity ({brand, url, aliases}) checked against one prompt×platform in a single
+    DataForSEO request: one shared engine answer, one grading call. Returns one result per
+    entity, in order; the retry policy is _verify_one's, applied to the group as a whole."""
+    def once():
+        try:
+            payload = {"action": "verify_mentions", "prompt": prompt, "location": location,
+                       "models": [model], "entities": ents}
+            payload.update(_engine_answer(prompt, model, location))
+            _st, raw = _post_json(DFS_ENDPOINT, payload, timeout=90)
+            data = _unwrap(raw)
+            ver = (data.get("verification") if isinstance(data, dict) else None) or []
+            if len(ver) != len(ents):
+                raise RuntimeError((ver[0] if ver else {}).get("error") or "no data")
+            return {"ok": True, "results": [_verification_result(v) for v in ver]}
+        except Exception as e:
+            return {"ok": False, "error": str(e)[:200]}
+
+    res = _with_retries(once, deadline)
+    return res["results"] if res.get("ok") else [{"ok": False, "error": res.get("error")} for _ in ents]
+
+
+def _with_retries(attempt_fn, deadline=None):
     last = {"ok": False, "error": "no attempt"}
     for attempt in range(3):
         if deadline and time.time() > deadline:
             return {"ok": False, "error": "deadline exceeded"}
-        res = _verify_once(prompt, brand, url, model, source, location, deadline, aliases)
+        res = attempt_fn()
         if res.get("ok"):
             return res
         last = res
@@ -1787,9 +2456,13 @@ def _verify_once(prompt, brand, url, model, source, location, deadline=None, ali
     Returns the same dict shape the JS buildModel consumes. Never raises."""
     endpoint = DFS_ENDPOINT if source == "dataforseo" else AI_ENDPOINT
     try:
-        _st, raw = _post_json(endpoint, {"action": "verify_mentions", "prompt": prompt,
-                                         "brand": brand, "url": url, "location": location,
-                                         "models": [model], "aliases": aliases or []}, timeout=90)
+        payload = {"action": "verify_mentions", "prompt": prompt, "brand": brand, "url": url,
+                   "location": location, "models": [model], "aliases": aliases or []}
+        if source == "dataforseo":
+            # Grade against the shared answer; geoDataForSeo skips the engine call when given one.
+            # Bright Data's aiMentions has no grade-only mode, so it still queries per entity.
+            payload.update(_engine_answer(prompt, model, location))
+        _st, raw = _post_json(endpoint, payload, timeout=90)
         data = _unwrap(raw)
         ver = data.get("verification") if isinstance(data, dict) else None
         result = ver[0] if ver else None
@@ -1811,6 +2484,14 @@ def _verify_once(prompt, brand, url, model, source, location, deadline=None, ali
                     break
                 if isinstance(pd, dict) and pd.get("error"):
                     raise RuntimeError(pd["error"])
+        return _verification_result(result)
+    except Exception as e:
+        return {"ok": False, "error": str(e)[:200]}
+
+
+def _verification_result(result):
+    """One engine `verification` entry → the dict shape the JS buildModel consumes. Never raises."""
+    try:
         if not result or result.get("status") == "error":
             raise RuntimeError((result or {}).get("error") or "no data")
         a = result.get("analysis")
@@ -2018,19 +2699,18 @@ def _build_jobs(cfg):
     return jobs
 
 
-def h_start_live_run(req):
-    """Kick off a durable live analysis and return a runId immediately. The heavy
-    fan-out runs in a self-invoked worker; the frontend polls run_status."""
+def _live_run_config(req):
+    """Validate a start_run request into a run config. Returns (cfg, error_response)."""
     brand = (req.get("brand") or "").strip()
     target = (req.get("target") or "").strip()
     prompts = [str(p).strip() for p in (req.get("prompts") or []) if str(p).strip()]
     platforms = [str(p).strip() for p in (req.get("platforms") or []) if str(p).strip()]
     if not brand or not target:
-        return _resp(400, {"error": "brand and target are required"})
+        return None, _resp(400, {"error": "brand and target are required"})
     if not prompts:
-        return _resp(400, {"error": "at least one prompt is required"})
+        return None, _resp(400, {"error": "at least one prompt is required"})
     if not platforms:
-        return _resp(400, {"error": "at least one platform is required"})
+        return None, _resp(400, {"error": "at least one platform is required"})
 
     cfg = {"brand": brand, "target": target, "location": req.get("location") or "",
            "source": req.get("source") or "dataforseo",
@@ -2053,7 +2733,16 @@ def h_start_live_run(req):
            "partial": bool(req.get("partial")),
            "promptIndex": int(req.get("promptIndex")) if str(req.get("promptIndex", "")).lstrip("-").isdigit() else -1}
     if cfg["partial"] and cfg["promptIndex"] < 0:
-        return _resp(400, {"error": "promptIndex is required for a partial run"})
+        return None, _resp(400, {"error": "promptIndex is required for a partial run"})
+    return cfg, None
+
+
+def h_start_live_run(req):
+    """Kick off a durable live analysis and return a runId immediately. The heavy
+    fan-out runs in a self-invoked worker; the frontend polls run_status."""
+    cfg, err = _live_run_config(req)
+    if err:
+        return err
     total = len(_build_jobs(cfg))
     run_id = uuid.uuid4().hex
     _table.put_item(Item={
@@ -2155,8 +2844,8 @@ def _due_reason(it, today):
 
 
 def h_monthly_run_all(req):
-    """Scheduled fan-out: start a live analysis for every eligible campaign, each of which
-    archives itself server-side (see h_live_run_worker) under the target month + run date.
+    """Scheduled fan-out: queue a live analysis for every eligible campaign, each of which
+    archives itself server-side (see h_sched_finalize) under the target month + run date.
     Fired daily by the EventBridge rule geoCampaigns-daily-scheduled-run (as `scheduled_run_all`,
     i.e. dueOnly=True, which honours each campaign's own runFrequency); also callable manually.
 
@@ -2172,6 +2861,8 @@ def h_monthly_run_all(req):
                each campaign's own monthlyPlatforms setting overrides this.
     limit    — safety cap on how many runs to start in one invocation (default 200)
     dryRun   — list who WOULD run (with estimated call counts) without starting anything
+    direct   — start each run as its own 900s worker (the pre-queue behaviour) instead of
+               enqueueing its work units (see the scheduled-run work queue below)
 
     Per-campaign settings (set via save_monthly_config) control cost:
       monthlyEnabled            — False excludes the campaign from the schedule
@@ -2193,6 +2884,7 @@ def h_monthly_run_all(req):
     limit = int(req.get("limit") or 200)
     dry = bool(req.get("dryRun"))
     force = bool(req.get("force"))  # ignore idempotency and re-run even already-archived months
+    direct = bool(req.get("direct"))  # bypass the work queue: one self-invoked worker per campaign
     run_date = today.strftime("%Y-%m-%d")
 
     items, kwargs = [], {}
@@ -2206,7 +2898,7 @@ def h_monthly_run_all(req):
     started, skipped, est_calls = [], [], 0
     for it in items:
         iid = str(it.get("id") or "")
-        if iid.startswith(RUN_PREFIX) or "#m#" in iid or it.get("type") == "metrics_month":
+        if not _is_campaign_id(iid) or it.get("type") == "metrics_month":
             continue
         name = it.get("name") or ""
         if flt and flt not in name.lower():
@@ -2257,15 +2949,20 @@ def h_monthly_run_all(req):
             started.append({"id": iid, "name": name, "engines": platforms, "frequency": freq,
                             "competitors": len(competitors), "prompts": len(prompts), "estCalls": calls})
             continue
-        r = h_start_live_run({"id": iid, "brand": brand, "target": target,
-                              "location": it.get("region") or "", "competitors": competitors,
-                              "aliases": it.get("alternativeNames") or [],
-                              "prompts": prompts, "platforms": platforms,
-                              "source": source, "month": month, "runDate": run_date})
+        run_req = {"id": iid, "brand": brand, "target": target,
+                   "location": it.get("region") or "", "competitors": competitors,
+                   "aliases": it.get("alternativeNames") or [],
+                   "prompts": prompts, "platforms": platforms,
+                   "source": source, "month": month, "runDate": run_date}
+        rid = None
         try:
-            rid = json.loads(r.get("body") or "{}").get("runId")
-        except Exception:
-            rid = None
+            if direct:
+                rid = json.loads(h_start_live_run(run_req).get("body") or "{}").get("runId")
+            else:
+                cfg, _err = _live_run_config(run_req)
+                rid = _sched_enqueue(cfg) if cfg else None
+        except Exception as e:
+            print("[GEO] could not start %s: %s" % (iid, str(e)[:160]))
         # Stamp the cadence clock on START, not on success: a campaign whose runs keep failing then
         # waits its normal interval instead of being retried on every daily fire (which would burn
         # budget). The monthly cadence has the reconcile pass; sub-monthly ones retry within 14 days.
@@ -2277,6 +2974,8 @@ def h_monthly_run_all(req):
         started.append({"id": iid, "name": name, "engines": platforms, "frequency": freq,
                         "runId": rid, "estCalls": calls})
 
+    if not dry and not direct and started:
+        _sched_invoke({"action": "_sched_tick"})
     if not dry:
         no_rid = [s["name"] for s in started if not s.get("runId")]
         msg = ("GEO monthly run (%s): started %d campaign(s), ~%d calls (≈$%.2f); skipped %d."
@@ -2418,9 +3117,11 @@ def h_save_monthly_config(req):
 
 
 def _is_campaign_id(cid):
-    """True for real campaign records — excludes live-run jobs and per-month snapshots,
-    which share this table under prefixed / derived ids."""
-    return bool(cid) and not cid.startswith(RUN_PREFIX) and "#m#" not in cid
+    """True for real campaign records — excludes live-run jobs, scheduler queue items, per-month
+    snapshots and answer-cache rows written before the cache moved to the daily table, which share
+    this table under prefixed / derived ids."""
+    return (bool(cid) and not cid.startswith(RUN_PREFIX) and not cid.startswith(SCHED_PREFIX)
+            and not cid.startswith(ANSWER_CACHE_PREFIX) and "#m#" not in cid)
 
 
 def _workduo_topics_for(pid):
@@ -2573,6 +3274,7 @@ def h_set_override(req):
         ExpressionAttributeNames={"#k": key},
         ExpressionAttributeValues={":e": entry, ":u": _now()},
     )
+    _bump_data_version(cid)
     return _resp(200, {"ok": True, "id": cid, "key": key, "override": entry})
 
 
@@ -2593,6 +3295,7 @@ def h_clear_override(req):
         ExpressionAttributeNames={"#k": key},
         ExpressionAttributeValues={":u": _now()},
     )
+    _bump_data_version(cid)
     return _resp(200, {"ok": True, "id": cid, "key": key})
 
 
@@ -2646,6 +3349,8 @@ def h_set_day_override(req):
     entry = {"v": value, "rec": req.get("recorded"), "by": str(req.get("by") or "")[:120], "at": _now()}
     blob.setdefault(scope, {}).setdefault(target, {})[field] = entry
     _daily_tbl.put_item(Item={**key, "blob": json.dumps(blob)})
+    _refresh_rollups(cid, [date])
+    _bump_data_version(cid)
     return _resp(200, {"ok": True, "id": cid, "date": date, "scope": scope,
                        "targetId": target, "field": field, "override": entry})
 
@@ -2687,6 +3392,8 @@ def h_clear_day_override(req):
         _daily_tbl.put_item(Item={**key, "blob": json.dumps(blob)})
     else:
         _daily_tbl.delete_item(Key=key)
+    _refresh_rollups(cid, [date])
+    _bump_data_version(cid)
     return _resp(200, {"ok": True, "id": cid, "date": date, "remaining": blob})
 
 
@@ -2767,7 +3474,7 @@ def h_list_day_values(req):
     for it in items:
         d = str(it["date"])
         try:
-            data = json.loads(it["blob"])
+            data = _row_data(it)
         except Exception:
             continue
         if scope == "ents":
@@ -2948,10 +3655,143 @@ def h_set_prompts(req):
     return _resp(200, {"ok": True, "id": cid, "prompts": prompts[:60], "topics": topics})
 
 
+# Live-run concurrency per engine: (start, floor, ceiling). DataForSEO answers synchronously and
+# rate-limits hard; Bright Data jobs spend most of their life sleeping between snapshot polls,
+# so they tolerate far more in flight. Override with GEO_CONCURRENCY_<ENGINE>="start,min,max".
+_ENGINE_CONCURRENCY = {"dataforseo": (4, 2, 16), "brightdata": (6, 2, 24)}
+_THROTTLE_MARKERS = ("429", "rate limit", "too many", "timed out", "timeout", "503", "502")
+
+
+def _engine_of(source):
+    return "dataforseo" if source == "dataforseo" else "brightdata"
+
+
+def _engine_concurrency(engine):
+    raw = os.environ.get("GEO_CONCURRENCY_" + engine.upper(), "")
+    try:
+        start, lo, hi = (int(x) for x in raw.split(","))
+        return start, lo, hi
+    except ValueError:
+        return _ENGINE_CONCURRENCY[engine]
+
+
+class _AdaptiveConcurrency:
+    """AIMD limit on in-flight verify calls. Each clean completion at healthy latency
+    (within 2x the best EWMA seen) earns +1/limit, so the limit grows by ~1 per full
+    window; a 429/timeout halves it, at most once per cooldown so one burst of
+    throttling isn't punished N times."""
+
+    def __init__(self, start, lo, hi, cooldown=10.0):
+        self.lo, self.hi = lo, max(lo, hi)
+        self.limit = float(max(lo, min(start, self.hi)))
+        self.peak = int(self.limit)
+        self.cooldown = cooldown
+        self.last_cut = 0.0
+        self.ewma = None        # smoothed call latency (s)
+        self.best = None        # lowest EWMA seen — the "healthy" baseline
+        self.calls = self.throttled = 0
+        self.lock = threading.Lock()
+
+    def current(self):
+        with self.lock:
+            return int(self.limit)
+
+    def observe(self, latency, res):
+        err = "" if res.get("ok") else (res.get("error") or "").lower()
+        with self.lock:
+            self.calls += 1
+            if any(m in err for m in _THROTTLE_MARKERS):
+                self.throttled += 1
+                now = time.time()
+                if now - self.last_cut >= self.cooldown:
+                    self.limit = max(self.lo, self.limit / 2)
+                    self.last_cut = now
+                return
+            self.ewma = latency if self.ewma is None else 0.8 * self.ewma + 0.2 * latency
+            self.best = self.ewma if self.best is None else min(self.best, self.ewma)
+            if not err and self.ewma <= 2 * self.best:
+                self.limit = min(self.hi, self.limit + 1.0 / self.limit)
+                self.peak = max(self.peak, int(self.limit))
+
+    def expected_latency(self):
+        with self.lock:
+            return self.ewma or 0.0
+
+
+def _run_verify_jobs(jobs, idxs, source, location, deadline, on_result):
+    """Verify jobs[i] for every i in `idxs` under the engine's adaptive concurrency limit,
+    calling on_result(i, res) as each lands (from worker threads). Stops starting work it
+    can't finish by `deadline`. Returns (never-started idxs, throughput summary)."""
+    engine = _engine_of(source)
+    start_c, lo_c, hi_c = _engine_concurrency(engine)
+
+    # DataForSEO grades every entity against a prompt×platform's answer in one request, so the
+    # unit of work there is the (prompt, platform) group; Bright Data still runs per entity.
+    if source == "dataforseo":
+        groups = {}
+        for idx in idxs:
+            groups.setdefault((jobs[idx]["pi"], jobs[idx]["pl"]), []).append(idx)
+        units = list(groups.values())
+    else:
+        units = [[idx] for idx in idxs]
+
+    def run_unit(unit):
+        j0 = jobs[unit[0]]
+        t0 = time.time()
+        if len(unit) > 1:
+            try:
+                ress = _verify_group(j0["prompt"], [{"brand": jobs[i]["brand"], "url": jobs[i]["url"],
+                                                     "aliases": jobs[i].get("aliases") or []} for i in unit],
+                                     j0["pl"], location, deadline)
+            except Exception as e:
+                ress = [{"ok": False, "error": str(e)[:200]} for _ in unit]
+        else:
+            try:
+                ress = [_verify_one(j0["prompt"], j0["brand"], j0["url"], j0["pl"], source, location,
+                                    deadline, j0.get("aliases"))]
+            except Exception as e:
+                ress = [{"ok": False, "error": str(e)[:200]}]
+        ctl.observe(time.time() - t0, ress[0])
+        for idx, res in zip(unit, ress):
+            on_result(idx, res)
+
+    # A small campaign never needs more threads than it has calls.
+    n_units = max(1, len(units))
+    ctl = _AdaptiveConcurrency(min(start_c, n_units), min(lo_c, n_units), min(hi_c, n_units))
+
+    started = time.time()
+    pending = list(units)
+    in_flight = set()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=ctl.hi) as ex:
+        while pending or in_flight:
+            # Don't start a call that can't finish before the deadline at current latency.
+            while (pending and len(in_flight) < ctl.current()
+                   and time.time() + ctl.expected_latency() < deadline):
+                in_flight.add(ex.submit(run_unit, pending.pop(0)))
+            if not in_flight:
+                break
+            done, in_flight = concurrent.futures.wait(
+                in_flight, timeout=5, return_when=concurrent.futures.FIRST_COMPLETED)
+    skipped = [idx for unit in pending for idx in unit]
+    elapsed = max(time.time() - started, 0.001)
+    # Rates are strings: boto3 rejects Python floats for DynamoDB numbers.
+    throughput = {"engine": engine, "calls": ctl.calls, "seconds": int(elapsed),
+                  "callsPerMin": str(round(ctl.calls * 60 / elapsed, 1)),
+                  "startConcurrency": min(start_c, n_units), "peakConcurrency": ctl.peak,
+                  "finalConcurrency": ctl.current(), "throttled": ctl.throttled,
+                  "skippedAtDeadline": len(skipped)}
+    return skipped, throughput
+
+
+def _job_out(j, res):
+    return {"ei": j["ei"], "pi": j["pi"], "pl": j["pl"], "prompt": j["prompt"], "res": res}
+
+
 def h_live_run_worker(req):
     """Runs ONLY via self-invoke from h_start_live_run. Fans out the verify checks
-    with a 6-way thread pool, persisting progress after each so the frontend can
-    poll, then stores the raw results for the client to build its model from."""
+    under an adaptive per-engine concurrency limit, persisting progress after each
+    so the frontend can poll, then stores the raw results for the client to build
+    its model from."""
     run_id = str(req.get("runId") or "")
     key = {"id": RUN_PREFIX + run_id}
     it = _table.get_item(Key=key).get("Item")
@@ -2959,7 +3799,6 @@ def h_live_run_worker(req):
         return _resp(200, {"ok": False, "error": "run not found"})
     cfg = it.get("config") or {}
     source, location = cfg.get("source") or "dataforseo", cfg.get("location") or ""
-    campaign_id = cfg.get("campaignId") or ""
     jobs = _build_jobs(cfg)
     total = len(jobs)
     deadline = time.time() + 840  # leave headroom under the 900s Lambda limit for the final write
@@ -2967,18 +3806,12 @@ def h_live_run_worker(req):
     lock = threading.Lock()
     state = {"done": 0, "last_write": 0.0}
 
-    def run_job(idx):
-        j = jobs[idx]
-        try:
-            res = _verify_one(j["prompt"], j["brand"], j["url"], j["pl"], source, location,
-                              deadline, j.get("aliases"))
-        except Exception as e:
-            res = {"ok": False, "error": str(e)[:200]}
+    def record(idx, res):
         # Answers for every cell — self AND competitors — are kept here and written to the S3
         # answer store below. They used to be dropped for competitors to fit DynamoDB's item cap;
         # S3 removes that constraint, and competitor answers are what make "who got recommended
         # instead of us?" answerable.
-        outs[idx] = {"ei": j["ei"], "pi": j["pi"], "pl": j["pl"], "prompt": j["prompt"], "res": res}
+        outs[idx] = _job_out(jobs[idx], res)
         with lock:
             state["done"] += 1
             n, now = state["done"], time.time()
@@ -2993,116 +3826,454 @@ def h_live_run_worker(req):
                 pass
 
     try:
-        with concurrent.futures.ThreadPoolExecutor(max_workers=6) as ex:
-            list(ex.map(run_job, range(total)))
-        results = [o for o in outs if o is not None]
-        archive_month = cfg.get("month") or _cur_month()
-        archive_date = cfg.get("runDate") or _today().strftime("%Y-%m-%d")
-        is_partial = bool(cfg.get("partial"))
-
-        # A partial run was given a one-prompt list, so its jobs came back as pi=0. Restore the
-        # prompt's real index before anything persists it, or the merged cells would collide with
-        # prompt 0 and the model's {ei,pi,pl} coordinates would point at the wrong answer.
-        if is_partial:
-            real_pi = int(cfg.get("promptIndex", -1))
-            for o in results:
-                o["pi"] = real_pi
-
-        # 1. Full answers → S3 (no size ceiling), while `results` still carries the text.
-        answers_key = None
-        if campaign_id:
-            answers_key = (_merge_answers(campaign_id, archive_month, run_id, cfg, results, int(cfg.get("promptIndex", -1)))
-                           if is_partial
-                           else _write_answers(campaign_id, archive_month, run_id, cfg, results))
-
-        # 2. Now that the text is safely in S3, strip it from the DynamoDB copy — the UI
-        #    lazy-loads it by {ei,pi,pl}, so the run item stays small and the old shed-cascade
-        #    (1200 chars → 400 → dropped) that silently degraded big campaigns is gone.
-        #
-        #    If the S3 write FAILED, do NOT strip: fall back to the previous behaviour (a bounded
-        #    inline excerpt for the self brand). Stripping unconditionally would delete the only
-        #    copy of the text and leave users worse off than before this change.
-        if is_partial:
-            # One prompt × a few platforms is a handful of answers — orders of magnitude under the
-            # item cap. Keep the text on the run item so run_status hands it straight back and the
-            # page renders the moment the run finishes, with or without the answer store.
+        skipped, throughput = _run_verify_jobs(jobs, range(total), source, location, deadline, record)
+        for idx in skipped:   # never started: out of time
+            outs[idx] = _job_out(jobs[idx], {"ok": False, "error": "deadline exceeded"})
+        print("[GEO] live run %s throughput: %s" % (run_id, json.dumps(throughput)))
+        try:
+            _table.update_item(Key=key, UpdateExpression="SET throughput = :t",
+                               ExpressionAttributeValues={":t": throughput})
+        except Exception:
             pass
-        elif answers_key:
-            for o in results:
-                (o.get("res") or {}).pop("response", None)
-        else:
-            print("[GEO] no answer-store key — keeping inline excerpts as fallback")
-            for o in results:
-                r = o.get("res") or {}
-                if o.get("ei") != 0:
-                    r.pop("response", None)
-                elif r.get("response"):
-                    r["response"] = r["response"][:1200]
-        payload = json.dumps(results)
-        if len(payload) > MAX_ITEM_BYTES:
-            # Backstop for the fallback path (and unbounded citations).
-            for o in results:
-                r = o.get("res") or {}
-                if r.get("response"):
-                    r["response"] = r["response"][:400]
-                if isinstance(r.get("citations"), list):
-                    r["citations"] = r["citations"][:3]
-            payload = json.dumps(results)
-        if len(payload) > MAX_ITEM_BYTES:
-            for o in results:
-                (o.get("res") or {}).pop("response", None)
-            payload = json.dumps(results)
-        upd = ("SET #s = :s, results = :r, finishedAt = :t, progress = :p"
-               + (", answersKey = :ak" if answers_key else ""))
-        vals = {":s": "done", ":r": payload, ":t": _now(), ":p": {"done": total, "total": total}}
-        if answers_key:
-            vals[":ak"] = answers_key
-        _table.update_item(
-            Key=key, UpdateExpression=upd,
-            ExpressionAttributeNames={"#s": "status"},
-            ExpressionAttributeValues=vals,
-        )
-        # Headless archive: build the model server-side and persist it permanently under this
-        # month, so scheduled (cron) runs archive with no browser open. Interactive runs are also
-        # archived here, then harmlessly overwritten by the browser's richer client-built model.
-        # BUT only archive a run that mostly succeeded — a degraded run (e.g. rate-limited/low
-        # balance, most calls failed) is left UNarchived so the reconcile pass re-runs just this
-        # campaign, instead of freezing bad data into the permanent monthly history.
-        # A partial run must NOT archive: _build_model_py over one prompt would produce a model with
-        # that prompt's metrics only, and _archive_model would overwrite the month's real snapshot
-        # with it. Re-running a single prompt refreshes its answers, not the campaign's numbers.
-        if campaign_id and not is_partial:
-            ok_cells = sum(1 for o in results if (o.get("res") or {}).get("ok"))
-            ratio = (ok_cells / len(results)) if results else 0.0
-            cname = cfg.get("brand") or campaign_id
-            if ratio >= MIN_OK_RATIO:
-                try:
-                    _archive_model(campaign_id, archive_month,
-                                   _build_model_py(cfg, results), answers_key,
-                                   run_date=archive_date)
-                except Exception as e:
-                    _alert("GEO monthly: archive FAILED for %s (%s): %s" % (cname, archive_month, str(e)[:180]))
-            else:
-                _table.update_item(Key=key, UpdateExpression="SET incompleteRatio = :r",
-                                   ExpressionAttributeValues={":r": str(round(ratio, 2))})
-                _alert("GEO monthly: %s INCOMPLETE for %s — only %d%% of %d calls succeeded; "
-                       "not archived, will retry on reconcile."
-                       % (cname, archive_month, round(ratio * 100), len(results)))
+        _finish_live_run(key, run_id, cfg, [o for o in outs if o is not None], total)
     except Exception as e:
-        _alert("GEO monthly: run CRASHED for campaign %s: %s"
-               % (cfg.get("brand") or campaign_id, str(e)[:180]))
-        _table.update_item(Key=key, UpdateExpression="SET #s = :s, runError = :e",
-                           ExpressionAttributeNames={"#s": "status"},
-                           ExpressionAttributeValues={":s": "error", ":e": str(e)[:500]})
+        _live_run_crashed(key, cfg, e)
     finally:
-        # Only a full run claims activeRunId, so only a full run may clear it. A partial run
-        # clearing it here would un-flag a full run happening concurrently on the same campaign.
-        if campaign_id and not bool(cfg.get("partial")):
+        _release_campaign_run(cfg)
+    return _resp(200, {"ok": True, "runId": run_id})
+
+
+def _live_run_crashed(key, cfg, e):
+    _alert("GEO monthly: run CRASHED for campaign %s: %s"
+           % (cfg.get("brand") or cfg.get("campaignId") or "", str(e)[:180]))
+    _table.update_item(Key=key, UpdateExpression="SET #s = :s, runError = :e",
+                       ExpressionAttributeNames={"#s": "status"},
+                       ExpressionAttributeValues={":s": "error", ":e": str(e)[:500]})
+
+
+def _release_campaign_run(cfg):
+    # Only a full run claims activeRunId, so only a full run may clear it. A partial run
+    # clearing it here would un-flag a full run happening concurrently on the same campaign.
+    campaign_id = cfg.get("campaignId") or ""
+    if campaign_id and not bool(cfg.get("partial")):
+        try:
+            _table.update_item(Key={"id": campaign_id}, UpdateExpression="REMOVE activeRunId")
+        except Exception:
+            pass
+
+
+def _finish_live_run(key, run_id, cfg, results, total):
+    """Persist a finished run's results: answers to S3, the slimmed results onto the run item,
+    and — for a full campaign run that mostly succeeded — the archived month model."""
+    campaign_id = cfg.get("campaignId") or ""
+    archive_month = cfg.get("month") or _cur_month()
+    archive_date = cfg.get("runDate") or _today().strftime("%Y-%m-%d")
+    is_partial = bool(cfg.get("partial"))
+
+    # A partial run was given a one-prompt list, so its jobs came back as pi=0. Restore the
+    # prompt's real index before anything persists it, or the merged cells would collide with
+    # prompt 0 and the model's {ei,pi,pl} coordinates would point at the wrong answer.
+    if is_partial:
+        real_pi = int(cfg.get("promptIndex", -1))
+        for o in results:
+            o["pi"] = real_pi
+
+    # 1. Full answers → S3 (no size ceiling), while `results` still carries the text.
+    answers_key = None
+    if campaign_id:
+        answers_key = (_merge_answers(campaign_id, archive_month, run_id, cfg, results, int(cfg.get("promptIndex", -1)))
+                       if is_partial
+                       else _write_answers(campaign_id, archive_month, run_id, cfg, results))
+
+    # 2. Now that the text is safely in S3, strip it from the DynamoDB copy — the UI
+    #    lazy-loads it by {ei,pi,pl}, so the run item stays small and the old shed-cascade
+    #    (1200 chars → 400 → dropped) that silently degraded big campaigns is gone.
+    #
+    #    If the S3 write FAILED, do NOT strip: fall back to the previous behaviour (a bounded
+    #    inline excerpt for the self brand). Stripping unconditionally would delete the only
+    #    copy of the text and leave users worse off than before this change.
+    if is_partial:
+        # One prompt × a few platforms is a handful of answers — orders of magnitude under the
+        # item cap. Keep the text on the run item so run_status hands it straight back and the
+        # page renders the moment the run finishes, with or without the answer store.
+        pass
+    elif answers_key:
+        for o in results:
+            (o.get("res") or {}).pop("response", None)
+    else:
+        print("[GEO] no answer-store key — keeping inline excerpts as fallback")
+        for o in results:
+            r = o.get("res") or {}
+            if o.get("ei") != 0:
+                r.pop("response", None)
+            elif r.get("response"):
+                r["response"] = r["response"][:1200]
+    payload = json.dumps(results)
+    if len(payload) > MAX_ITEM_BYTES:
+        # Backstop for the fallback path (and unbounded citations).
+        for o in results:
+            r = o.get("res") or {}
+            if r.get("response"):
+                r["response"] = r["response"][:400]
+            if isinstance(r.get("citations"), list):
+                r["citations"] = r["citations"][:3]
+        payload = json.dumps(results)
+    if len(payload) > MAX_ITEM_BYTES:
+        for o in results:
+            (o.get("res") or {}).pop("response", None)
+        payload = json.dumps(results)
+    upd = ("SET #s = :s, results = :r, finishedAt = :t, progress = :p"
+           + (", answersKey = :ak" if answers_key else ""))
+    vals = {":s": "done", ":r": payload, ":t": _now(), ":p": {"done": total, "total": total}}
+    if answers_key:
+        vals[":ak"] = answers_key
+    _table.update_item(
+        Key=key, UpdateExpression=upd,
+        ExpressionAttributeNames={"#s": "status"},
+        ExpressionAttributeValues=vals,
+    )
+    # Headless archive: build the model server-side and persist it permanently under this
+    # month, so scheduled (cron) runs archive with no browser open. Interactive runs are also
+    # archived here, then harmlessly overwritten by the browser's richer client-built model.
+    # BUT only archive a run that mostly succeeded — a degraded run (e.g. rate-limited/low
+    # balance, most calls failed) is left UNarchived so the reconcile pass re-runs just this
+    # campaign, instead of freezing bad data into the permanent monthly history.
+    # A partial run must NOT archive: _build_model_py over one prompt would produce a model with
+    # that prompt's metrics only, and _archive_model would overwrite the month's real snapshot
+    # with it. Re-running a single prompt refreshes its answers, not the campaign's numbers.
+    if campaign_id and not is_partial:
+        ok_cells = sum(1 for o in results if (o.get("res") or {}).get("ok"))
+        ratio = (ok_cells / len(results)) if results else 0.0
+        cname = cfg.get("brand") or campaign_id
+        if ratio >= MIN_OK_RATIO:
             try:
-                _table.update_item(Key={"id": campaign_id}, UpdateExpression="REMOVE activeRunId")
+                _archive_model(campaign_id, archive_month,
+                               _build_model_py(cfg, results), answers_key,
+                               run_date=archive_date)
+            except Exception as e:
+                _alert("GEO monthly: archive FAILED for %s (%s): %s" % (cname, archive_month, str(e)[:180]))
+        else:
+            _table.update_item(Key=key, UpdateExpression="SET incompleteRatio = :r",
+                               ExpressionAttributeValues={":r": str(round(ratio, 2))})
+            _alert("GEO monthly: %s INCOMPLETE for %s — only %d%% of %d calls succeeded; "
+                   "not archived, will retry on reconcile."
+                   % (cname, archive_month, round(ratio * 100), len(results)))
+
+
+# ---------------------------------------------------------------------------
+# Scheduled-run work queue. h_monthly_run_all used to start one 900s worker per campaign, so a big
+# campaign could outgrow a single invocation and a busy cron day fired every campaign at
+# DataForSEO at once. Scheduled runs now go through a durable queue instead:
+#
+#   * each run is split into work units of SCHED_SLICE_PROMPTS prompts (all entities × platforms),
+#     one small item per unit (`sched#unit#<runId>#<k>`); `sched#runs` is just the set of queued
+#     run ids, so nothing grows with the backlog and no write rewrites anyone else's state;
+#   * each engine has SCHED_ENGINE_LIMITS lease slots (`sched#slot#<engine>#<i>`). A unit starts by
+#     taking a slot that is free or whose lease has expired, in the same transaction that flips the
+#     unit to running — so racing dispatchers can't oversubscribe an engine, and a dead worker's
+#     slot frees itself when its lease runs out;
+#   * a unit worker that nears its budget saves what it has (S3, sched/<runId>/<k>.json), drops
+#     back to pending and is picked up again where it left off;
+#   * finishing a unit (unit state, slot release, the run's progress and `unitsDone`) is one
+#     transaction, so a worker can't die between marking its unit done and counting it;
+#   * the run archives once `unitsDone` reaches `unitsTotal`, in a separate finalize invocation,
+#     through the same _finish_live_run as an interactive run.
+#
+# Every worker re-invokes the dispatcher (`_sched_tick`) as it exits, which keeps the queue
+# draining. The tick (from another worker, the daily cron, or an optional `sched_tick` rate rule)
+# also puts units whose lease expired back in line and re-finalizes any run that is complete but
+# still running, so a lost finalize invoke or a finalizer that died is retried.
+# ---------------------------------------------------------------------------
+SCHED_PREFIX = "sched#"
+SCHED_SLICE_PROMPTS = int(os.environ.get("GEO_SCHED_SLICE_PROMPTS", "5"))
+SCHED_ENGINE_LIMITS = {"dataforseo": int(os.environ.get("GEO_SCHED_LIMIT_DATAFORSEO", "3")),
+                       "brightdata": int(os.environ.get("GEO_SCHED_LIMIT_BRIGHTDATA", "2"))}
+SCHED_UNIT_BUDGET_SEC = 720       # leaves the rest of the 900s for the S3 checkpoint + hand-off
+SCHED_LEASE_SEC = 960             # > one invocation, so a live worker never loses its lease
+SCHED_MAX_ATTEMPTS = 6            # a unit still short after this many invocations completes with errors
+_SCHED_RUNS_KEY = {"id": SCHED_PREFIX + "runs"}
+
+
+def _sched_unit_id(run_id, k):
+    return "%sunit#%s#%d" % (SCHED_PREFIX, run_id, k)
+
+
+def _sched_slot_id(engine, i):
+    return "%sslot#%s#%d" % (SCHED_PREFIX, engine, i)
+
+
+def _sched_invoke(payload):
+    try:
+        _lambda_client.invoke(FunctionName=FUNCTION_NAME, InvocationType="Event",
+                              Payload=json.dumps(payload).encode())
+    except Exception as e:
+        print("[GEO] sched invoke failed:", str(e)[:160])
+
+
+def _sched_get_many(ids):
+    """{id: item} for the given campaigns-table ids (strongly consistent, unprocessed keys retried)."""
+    out, ids = {}, list(dict.fromkeys(ids))
+    for i in range(0, len(ids), 100):
+        req = {TABLE_NAME: {"Keys": [{"id": x} for x in ids[i:i + 100]], "ConsistentRead": True}}
+        for _attempt in range(5):
+            got = _ddb.batch_get_item(RequestItems=req)
+            for it in (got.get("Responses") or {}).get(TABLE_NAME) or []:
+                out[it["id"]] = it
+            req = got.get("UnprocessedKeys") or {}
+            if not req:
+                break
+            time.sleep(0.2)
+    return out
+
+
+def _tx_update(item_id, expr, cond, names=None, vals=None):
+    """One Update entry for transact_write_items. The resource's client takes plain values."""
+    op = {"TableName": TABLE_NAME, "Key": {"id": item_id}, "UpdateExpression": expr,
+          "ConditionExpression": cond}
+    if names:
+        op["ExpressionAttributeNames"] = names
+    if vals:
+        op["ExpressionAttributeValues"] = vals
+    return {"Update": op}
+
+
+def _sched_enqueue(cfg):
+    """Create a queued run for `cfg` and its work units. Returns the runId."""
+    jobs = _build_jobs(cfg)
+    n_prompts = len(cfg.get("prompts") or [])
+    slices = [[a, min(a + SCHED_SLICE_PROMPTS, n_prompts)] for a in range(0, n_prompts, SCHED_SLICE_PROMPTS)]
+    run_id = uuid.uuid4().hex
+    engine = _engine_of(cfg.get("source") or "dataforseo")
+    ttl = int(time.time()) + RUN_TTL_SECONDS
+    _table.put_item(Item={
+        "id": RUN_PREFIX + run_id, "type": "live_run", "status": "running", "queued": True,
+        "startedAt": _now(), "progress": {"done": 0, "total": len(jobs)},
+        "unitsTotal": len(slices), "unitsDone": 0,
+        "config": cfg, "ttl": ttl,
+    })
+    if cfg.get("campaignId"):
+        try:
+            _table.update_item(Key={"id": cfg["campaignId"]}, UpdateExpression="SET activeRunId = :r",
+                               ExpressionAttributeValues={":r": run_id})
+        except Exception:
+            pass
+    now = _now()
+    with _table.batch_writer() as bw:
+        for k, sl in enumerate(slices):
+            bw.put_item(Item={"id": _sched_unit_id(run_id, k), "type": "sched_unit", "run": run_id, "k": k,
+                              "engine": engine, "pis": sl, "st": "pending", "attempts": 0,
+                              "enq": now, "ttl": ttl})
+    # Listed only once its units exist, so a tick never sees a run without them.
+    _table.update_item(Key=_SCHED_RUNS_KEY, UpdateExpression="ADD runs :r",
+                       ExpressionAttributeValues={":r": {run_id}})
+    return run_id
+
+
+def _sched_cleanup(run_id, n_units):
+    """Drop a finished run's units, checkpoints and queue entry. Safe to repeat."""
+    try:
+        with _table.batch_writer() as bw:
+            for k in range(n_units):
+                bw.delete_item(Key={"id": _sched_unit_id(run_id, k)})
+        for k in range(n_units):
+            _s3.delete_object(Bucket=ANSWERS_BUCKET, Key=_sched_unit_key(run_id, k))
+        _table.update_item(Key=_SCHED_RUNS_KEY, UpdateExpression="DELETE runs :r",
+                           ExpressionAttributeValues={":r": {run_id}})
+    except Exception as e:
+        print("[GEO] sched cleanup failed for %s: %s" % (run_id, str(e)[:160]))
+
+
+def h_sched_tick(req=None):
+    """Dispatcher: re-finalize complete runs, put units with expired leases back in line, then start
+    pending units while their engine has free slots. Safe to run concurrently — the unit's own claim
+    is the real gate."""
+    runs = sorted((_table.get_item(Key=_SCHED_RUNS_KEY, ConsistentRead=True).get("Item") or {}).get("runs") or [])
+    run_items = _sched_get_many([RUN_PREFIX + r for r in runs])
+    now = int(time.time())
+    unit_ids, finalize = [], []
+    for r in runs:
+        it = run_items.get(RUN_PREFIX + r)
+        total = int((it or {}).get("unitsTotal") or 0)
+        if not it or it.get("status") != "running":
+            _sched_cleanup(r, total)   # finished (or expired) but its cleanup never ran
+        elif int(it.get("unitsDone") or 0) >= total:
+            finalize.append(r)
+            _sched_invoke({"action": "_sched_finalize", "runId": r})
+        else:
+            unit_ids += [_sched_unit_id(r, k) for k in range(total)]
+    units = _sched_get_many(unit_ids)
+    for uid, u in units.items():
+        if u.get("st") == "running" and int(u.get("lease") or 0) <= now:
+            # Dead worker: put its unit back in line (attempts already counted). Its slot frees
+            # itself — a claim may take any slot whose lease has run out.
+            try:
+                _table.update_item(
+                    Key={"id": uid}, UpdateExpression="SET st = :p REMOVE lease, slot",
+                    ConditionExpression="st = :r AND lease = :exp",
+                    ExpressionAttributeValues={":p": "pending", ":r": "running", ":exp": u["lease"]})
+                u["st"] = "pending"
             except Exception:
                 pass
-    return _resp(200, {"ok": True, "runId": run_id})
+    slots = _sched_get_many([_sched_slot_id(e, i) for e, n in SCHED_ENGINE_LIMITS.items() for i in range(n)])
+    free = {e: sum(1 for i in range(n)
+                   if int((slots.get(_sched_slot_id(e, i)) or {}).get("exp") or 0) <= now)
+            for e, n in SCHED_ENGINE_LIMITS.items()}
+    started = []
+    for uid, u in sorted(units.items(), key=lambda kv: (str(kv[1].get("enq")), kv[0])):
+        engine = u.get("engine") or "dataforseo"
+        if u.get("st") != "pending" or free.get(engine, 0) <= 0:
+            continue
+        free[engine] -= 1
+        _sched_invoke({"action": "_sched_unit", "unit": uid})
+        started.append(uid)
+    return _resp(200, {"ok": True, "started": started, "finalizing": finalize,
+                       "pending": sum(1 for u in units.values() if u.get("st") == "pending"),
+                       "running": sum(1 for u in units.values() if u.get("st") == "running")})
+
+
+def _sched_claim(uid, engine):
+    """Take a free (or expired) slot of `engine` and flip the unit to running, atomically.
+    Returns (slot id, lease expiry), or None if the unit isn't pending or every slot is busy."""
+    client = _table.meta.client
+    for i in range(SCHED_ENGINE_LIMITS.get(engine, 1)):
+        now = int(time.time())
+        exp = now + SCHED_LEASE_SEC
+        sid = _sched_slot_id(engine, i)
+        try:
+            client.transact_write_items(TransactItems=[
+                _tx_update(sid, "SET #u = :u, exp = :exp, #t = :t",
+                           "attribute_not_exists(#u) OR exp <= :now",
+                           {"#u": "unit", "#t": "type"},
+                           {":u": uid, ":exp": exp, ":now": now, ":t": "sched_slot"}),
+                _tx_update(uid, "SET st = :r, attempts = attempts + :one, lease = :exp, slot = :s",
+                           "st = :p", None,
+                           {":r": "running", ":p": "pending", ":one": 1, ":exp": exp, ":s": sid}),
+            ])
+            return sid, exp
+        except client.exceptions.TransactionCanceledException as e:
+            reasons = e.response.get("CancellationReasons") or []
+            if len(reasons) > 1 and reasons[1].get("Code") == "ConditionalCheckFailed":
+                return None    # someone else has the unit
+            # This slot is busy (or the write conflicted) — try the next one.
+        except Exception as e:
+            print("[GEO] sched claim failed for %s: %s" % (uid, str(e)[:160]))
+            return None
+    return None   # engine full — the next tick retries
+
+
+def _sched_unit_key(run_id, k):
+    return "sched/%s/%s.json" % (run_id, k)
+
+
+def _sched_load_outs(run_id, k):
+    try:
+        body = _s3.get_object(Bucket=ANSWERS_BUCKET, Key=_sched_unit_key(run_id, k))["Body"].read()
+        return {int(x): v for x, v in json.loads(body.decode("utf-8")).items()}
+    except Exception:
+        return {}
+
+
+def h_sched_unit_worker(req):
+    """Run one work unit: claim it, verify whatever it hasn't finished yet, checkpoint, and either
+    complete it or hand it back to the queue for the next invocation."""
+    uid = str(req.get("unit") or "")
+    u = _table.get_item(Key={"id": uid}, ConsistentRead=True).get("Item") if uid else None
+    engine = (u or {}).get("engine") or "dataforseo"
+    claim = _sched_claim(uid, engine) if u else None
+    # No tick on a lost claim: whoever holds the unit (or the slot) ticks when it finishes.
+    if not claim:
+        return _resp(200, {"ok": False, "unit": uid, "why": "not claimable"})
+    sid, lease = claim
+    try:
+        run_id, k = u["run"], int(u["k"])
+        run_key = {"id": RUN_PREFIX + run_id}
+        it = _table.get_item(Key=run_key).get("Item") or {}
+        cfg = it.get("config") or {}
+        jobs = _build_jobs(cfg)
+        lo, hi = (int(x) for x in u.get("pis") or [0, 0])
+        idxs = [i for i, j in enumerate(jobs) if lo <= j["pi"] < hi]
+        outs = _sched_load_outs(run_id, k)
+        todo = [i for i in idxs if i not in outs]
+        lock, pend = threading.Lock(), {"n": 0}
+
+        def record(idx, res):
+            # A call cut off by this invocation's deadline isn't an answer — leave it for the resume.
+            if (res.get("error") or "").startswith("deadline"):
+                return
+            with lock:
+                outs[idx] = _job_out(jobs[idx], res)
+                pend["n"] += 1
+
+        if todo:
+            _skipped, tp = _run_verify_jobs(jobs, todo, cfg.get("source") or "dataforseo",
+                                            cfg.get("location") or "", time.time() + SCHED_UNIT_BUDGET_SEC, record)
+            print("[GEO] sched unit %s throughput: %s" % (uid, json.dumps(tp)))
+        attempts = int(u.get("attempts") or 0) + 1
+        complete = all(i in outs for i in idxs)
+        if not complete and attempts >= SCHED_MAX_ATTEMPTS:
+            for i in idxs:
+                outs.setdefault(i, _job_out(jobs[i], {"ok": False, "error": "gave up after %d attempts" % attempts}))
+            complete = True
+        _s3.put_object(Bucket=ANSWERS_BUCKET, Key=_sched_unit_key(run_id, k),
+                       Body=json.dumps({str(x): v for x, v in outs.items()}).encode("utf-8"),
+                       ContentType="application/json")
+        ops = [
+            _tx_update(uid, "SET st = :s REMOVE lease, slot", "st = :r AND lease = :exp", None,
+                       {":s": "done" if complete else "pending", ":r": "running", ":exp": lease}),
+            _tx_update(sid, "REMOVE #u, exp", "#u = :u AND exp = :exp", {"#u": "unit"},
+                       {":u": uid, ":exp": lease}),
+        ]
+        if pend["n"] or complete:
+            ops.append(_tx_update(run_key["id"],
+                                  "ADD progress.#d :n" + (", unitsDone :one" if complete else ""),
+                                  "attribute_exists(id)", {"#d": "done"},
+                                  {":n": pend["n"], **({":one": 1} if complete else {})}))
+        try:
+            _table.meta.client.transact_write_items(TransactItems=ops)
+        except Exception as e:
+            # Only if the lease was lost; the tick requeues the unit and its checkpoint carries the work.
+            print("[GEO] sched unit %s hand-back failed: %s" % (uid, str(e)[:160]))
+            return _resp(200, {"ok": False, "unit": uid, "why": "lease lost"})
+        if complete:
+            got = _table.get_item(Key=run_key, ConsistentRead=True).get("Item") or {}
+            if int(got.get("unitsDone") or 0) >= int(got.get("unitsTotal") or 0):
+                _sched_invoke({"action": "_sched_finalize", "runId": run_id})
+        return _resp(200, {"ok": True, "unit": uid, "complete": complete})
+    finally:
+        _sched_invoke({"action": "_sched_tick"})
+
+
+def h_sched_finalize(req):
+    """A queued run's last unit is done: stitch the unit checkpoints together, persist and archive
+    exactly as an interactive run does, then clear the run's units out of the queue. Claimed with a
+    conditional stamp, so duplicate invokes (worker + tick) archive once; a finalizer that dies is
+    retried by the tick once its stamp is SCHED_LEASE_SEC old."""
+    run_id = str(req.get("runId") or "")
+    key = {"id": RUN_PREFIX + run_id}
+    now = int(time.time())
+    try:
+        _table.update_item(
+            Key=key, UpdateExpression="SET finalizingAt = :now",
+            ConditionExpression=("#s = :r AND unitsDone >= unitsTotal AND "
+                                 "(attribute_not_exists(finalizingAt) OR finalizingAt < :stale)"),
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={":now": now, ":r": "running", ":stale": now - SCHED_LEASE_SEC})
+    except _table.meta.client.exceptions.ConditionalCheckFailedException:
+        return _resp(200, {"ok": False, "error": "run not found, not complete, or already finalizing"})
+    it = _table.get_item(Key=key, ConsistentRead=True).get("Item") or {}
+    cfg = it.get("config") or {}
+    n_units = int(it.get("unitsTotal") or 0)
+    try:
+        outs = {}
+        for k in range(n_units):
+            outs.update(_sched_load_outs(run_id, k))
+        _finish_live_run(key, run_id, cfg, [outs[i] for i in sorted(outs)], len(_build_jobs(cfg)))
+    except Exception as e:
+        _live_run_crashed(key, cfg, e)
+    finally:
+        _release_campaign_run(cfg)
+        _sched_cleanup(run_id, n_units)
+    return _resp(200, {"ok": True, "runId": run_id, "units": n_units})
 
 
 def h_run_status(req):
@@ -3210,6 +4381,12 @@ def lambda_handler(event, context):
             return h_set_prompts(req)
         if action == "run_status":
             return h_run_status(req)
+        if action in ("_sched_tick", "sched_tick"):
+            return h_sched_tick(req)
+        if action == "_sched_unit":
+            return h_sched_unit_worker(req)
+        if action == "_sched_finalize":
+            return h_sched_finalize(req)
         if action == "_live_run_worker":
             return h_live_run_worker(req)
         if action == "migrate_all":
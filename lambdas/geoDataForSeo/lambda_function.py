@@ -5,11 +5,15 @@ Drop-in alternative to the Bright Data `aiMentions` endpoint: it accepts the SAM
 `verify_mentions` request shape and returns the SAME `{ verification: [ { status, analysis } ] }`
 response shape, so the frontend only has to swap the endpoint URL.
 
+Actions: verify_mentions (default), fetch_answer (engine call only — step 1 below, so a caller
+can fetch once and pass the answer back to verify_mentions per brand), health.
+
 Pipeline per (prompt, engine):
   1. Ask the engine via DataForSEO's AI Optimization API (ChatGPT / Gemini / Perplexity / Claude
      LLM responses) or the SERP API (Google AI Overview / AI Mode) for a real answer + citations.
   2. Citations come straight from DataForSEO annotations (authoritative, no hallucination).
-  3. A small Claude model extracts is_mentioned / sentiment / visibility_score / rank / snippet.
+  3. A small Claude model extracts is_mentioned / sentiment / visibility_score / rank / snippet —
+     for every tracked entity in one call when the request carries `entities`.
 
 Pure stdlib (urllib) so it deploys as a single-file zip with no layer.
 Env: DATAFORSEO_AUTH (full "Basic <b64>" header), ANTHROPIC_API_KEY.
@@ -289,12 +293,10 @@ def call_serp_ai(engine, prompt, iso):
 # ---------------------------------------------------------------------------
 # Claude extraction
 # ---------------------------------------------------------------------------
-EXTRACT_SYSTEM = (
-    "You analyse an AI assistant's answer to determine how a specific brand appears in it. "
-    "Respond with ONLY a compact JSON object, no prose. Schema: "
-    '{"is_mentioned":bool,"sentiment":"positive"|"neutral"|"negative",'
-    '"sentiment_reason":string,"sentiment_theme":string,'
-    '"visibility_score":0-100,"rank":int,"mention_snippet":string}. '
+_EXTRACT_FIELDS = ('"is_mentioned":bool,"sentiment":"positive"|"neutral"|"negative",'
+                   '"sentiment_reason":string,"sentiment_theme":string,'
+                   '"visibility_score":0-100,"rank":int,"mention_snippet":string')
+_EXTRACT_RULES = (
     # Without this, the grader matches the brand string literally and scores a prominent
     # sub-brand mention as absent: "Da Paolo Group" was graded not_mentioned against an answer
     # recommending "Tutto by Da Paolo" as its top pick.
@@ -317,6 +319,21 @@ EXTRACT_SYSTEM = (
     "mentions sharing an angle can be grouped (e.g. 'Convenient Locations', 'Pricing Concerns', "
     "'Reliable Service', 'Limited Availability'); empty string if not mentioned."
 )
+EXTRACT_SYSTEM = (
+    "You analyse an AI assistant's answer to determine how a specific brand appears in it. "
+    "Respond with ONLY a compact JSON object, no prose. Schema: {" + _EXTRACT_FIELDS + "}. "
+    + _EXTRACT_RULES
+)
+# Same rules, every tracked brand graded against one answer in one call. Each brand is judged
+# independently: a rival appearing doesn't lower the tracked brand's score, and rank is each
+# brand's own position in the answer's list.
+EXTRACT_MULTI_SYSTEM = (
+    "You analyse an AI assistant's answer to determine how each of several numbered brands "
+    "appears in it. Judge every brand independently. Respond with ONLY a compact JSON object, "
+    'no prose. Schema: {"entities":[{"index":int,' + _EXTRACT_FIELDS + "}]} with exactly one "
+    "element per numbered brand, index matching its number. The rules below apply to each brand "
+    "on its own. " + _EXTRACT_RULES
+)
 
 
 # Corporate noise words: present in the registered name, absent from how anyone refers to the
@@ -356,39 +373,24 @@ def heuristic_mentioned(brand, answer, aliases=None):
     return False
 
 
-def extract_with_claude(brand, answer, aliases=None):
-    if not answer:
-        return {"is_mentioned": False, "sentiment": "neutral", "sentiment_reason": "",
-                "sentiment_theme": "", "visibility_score": 0, "rank": 0, "mention_snippet": ""}
+def _alias_line(brand, aliases):
     # Aliases are curated per campaign and cover what the general rule can't infer (acronyms like
     # HLAS/FSBP). They ADD to the rule rather than replace it: an unlisted sub-brand must still
     # count, which is exactly the case that produced the original false negative.
     known = [a for a in (aliases or []) if a and a.strip().lower() != (brand or "").strip().lower()]
-    alias_line = ("\nAlso known as (these ALL count as the brand): "
-                  + ", ".join(known[:20]) + "\n") if known else ""
-    user = f"Brand: {brand}\n{alias_line}\nAI answer:\n{answer[:6000]}"
-    payload = {"model": EXTRACT_MODEL, "max_tokens": 300, "system": EXTRACT_SYSTEM,
-               "messages": [{"role": "user", "content": user}]}
-    status, body = _http_json("https://api.anthropic.com/v1/messages", payload, headers={
-        "x-api-key": ANTHROPIC_API_KEY, "anthropic-version": "2023-06-01",
-        "Content-Type": "application/json"})
-    if status == 200:
-        _emit_llm_from_body("claude", body)
-    if status != 200:
-        # Fallback: heuristic mention detection on the raw text.
-        mentioned = heuristic_mentioned(brand, answer, aliases)
-        return {"is_mentioned": mentioned, "sentiment": "neutral", "sentiment_reason": "",
-                "sentiment_theme": "", "visibility_score": 50 if mentioned else 0,
-                "rank": 0, "mention_snippet": ""}
-    try:
-        txt = "".join(b.get("text", "") for b in body.get("content", []) if b.get("type") == "text")
-        m = re.search(r"\{.*\}", txt, re.DOTALL)
-        data = json.loads(m.group(0) if m else txt)
-    except Exception:
-        mentioned = heuristic_mentioned(brand, answer, aliases)
-        return {"is_mentioned": mentioned, "sentiment": "neutral", "sentiment_reason": "",
-                "sentiment_theme": "", "visibility_score": 50 if mentioned else 0,
-                "rank": 0, "mention_snippet": ""}
+    return ("\nAlso known as (these ALL count as the brand): "
+            + ", ".join(known[:20]) + "\n") if known else ""
+
+
+def _heuristic_analysis(brand, answer, aliases=None):
+    """Fallback when the grader is unreachable or unparseable: mention detection on the raw text."""
+    mentioned = heuristic_mentioned(brand, answer, aliases)
+    return {"is_mentioned": mentioned, "sentiment": "neutral", "sentiment_reason": "",
+            "sentiment_theme": "", "visibility_score": 50 if mentioned else 0,
+            "rank": 0, "mention_snippet": ""}
+
+
+def _analysis_from(data):
     return {
         "is_mentioned": bool(data.get("is_mentioned")),
         "sentiment": (data.get("sentiment") or "neutral").lower(),
@@ -400,39 +402,90 @@ def extract_with_claude(brand, answer, aliases=None):
     }
 
 
+def _claude_json(system, user, max_tokens):
+    """One grader call → parsed JSON object, or None (HTTP failure / unparseable reply)."""
+    payload = {"model": EXTRACT_MODEL, "max_tokens": max_tokens, "system": system,
+               "messages": [{"role": "user", "content": user}]}
+    status, body = _http_json("https://api.anthropic.com/v1/messages", payload, headers={
+        "x-api-key": ANTHROPIC_API_KEY, "anthropic-version": "2023-06-01",
+        "Content-Type": "application/json"})
+    if status != 200:
+        return None
+    _emit_llm_from_body("claude", body)
+    try:
+        txt = "".join(b.get("text", "") for b in body.get("content", []) if b.get("type") == "text")
+        m = re.search(r"\{.*\}", txt, re.DOTALL)
+        return json.loads(m.group(0) if m else txt)
+    except Exception:
+        return None
+
+
+def extract_with_claude(brand, answer, aliases=None):
+    if not answer:
+        return _heuristic_analysis(brand, answer)
+    user = f"Brand: {brand}\n{_alias_line(brand, aliases)}\nAI answer:\n{answer[:6000]}"
+    data = _claude_json(EXTRACT_SYSTEM, user, 300)
+    if not isinstance(data, dict):
+        return _heuristic_analysis(brand, answer, aliases)
+    try:
+        return _analysis_from(data)
+    except (TypeError, ValueError):
+        return _heuristic_analysis(brand, answer, aliases)
+
+
+def extract_entities_with_claude(entities, answer):
+    """Grade every entity ({brand, aliases}) against ONE answer in a single call — the answer is
+    sent once, not once per brand. Returns one analysis per entity, in order; any entity the
+    grader skipped or garbled falls back to heuristic_mentioned on its own."""
+    if not answer or not entities:
+        return [_heuristic_analysis(e.get("brand"), answer) for e in entities]
+    if len(entities) == 1:
+        return [extract_with_claude(entities[0].get("brand"), answer, entities[0].get("aliases"))]
+    lines = []
+    for i, e in enumerate(entities):
+        lines.append(f"{i}. Brand: {e.get('brand')}{_alias_line(e.get('brand'), e.get('aliases'))}".rstrip())
+    user = "Brands:\n" + "\n".join(lines) + f"\n\nAI answer:\n{answer[:6000]}"
+    data = _claude_json(EXTRACT_MULTI_SYSTEM, user, min(4000, 300 * len(entities)))
+    graded = {}
+    for row in ((data or {}).get("entities") if isinstance(data, dict) else None) or []:
+        try:
+            graded[int(row.get("index"))] = _analysis_from(row)
+        except (AttributeError, TypeError, ValueError):
+            continue
+    return [graded.get(i) or _heuristic_analysis(e.get("brand"), answer, e.get("aliases"))
+            for i, e in enumerate(entities)]
+
+
 # ---------------------------------------------------------------------------
 # Orchestration
 # ---------------------------------------------------------------------------
-def verify_one(prompt, brand, url, location, model_id, aliases=None):
+def fetch_answer(prompt, location, model_id):
+    """The engine's raw answer for one (prompt, engine, location): (answer, citations, meta).
+    Brand-independent — the only paid DataForSEO call in the pipeline."""
     iso = LOCATION_ISO.get((location or "").strip().lower(), "")
     if model_id in SERP_ENGINES:
-        answer, citations, meta = call_serp_ai(model_id, prompt, iso)
-    else:
-        engine_path, model_name = LLM_ENGINES.get(model_id, LLM_ENGINES["chatgpt"])
-        try:
-            answer, citations, meta = call_llm_engine(engine_path, model_name, prompt, iso)
-        except RuntimeError as e:
-            # Model-name mismatch: retry once with the first model the engine advertises.
-            if "task error" in str(e) or "no result" in str(e):
-                alt = _first_model(engine_path)
-                if alt and alt != model_name:
-                    answer, citations, meta = call_llm_engine(engine_path, alt, prompt, iso)
-                else:
-                    raise
-            else:
-                raise
-
-    target_domain = domain_of(url)
-    citation_urls = []
-    seen = set()
-    for c in citations:
-        if c["url"] not in seen:
-            seen.add(c["url"])
-            citation_urls.append(c["url"])
-    is_cited = bool(target_domain) and any(domain_of(u) == target_domain for u in citation_urls)
-
+        return call_serp_ai(model_id, prompt, iso)
+    engine_path, model_name = LLM_ENGINES.get(model_id, LLM_ENGINES["chatgpt"])
+    try:
+        return call_llm_engine(engine_path, model_name, prompt, iso)
+    except RuntimeError as e:
+        # Model-name mismatch: retry once with the first model the engine advertises.
+        if "task error" in str(e) or "no result" in str(e):
+            alt = _first_model(engine_path)
+            if alt and alt != model_name:
+                return call_llm_engine(engine_path, alt, prompt, iso)
+        raise
+
+
+def verify_one(prompt, brand, url, location, model_id, aliases=None, fetched=None):
+    """Grade one brand against the engine's answer. `fetched` is a pre-fetched
+    (answer, citations, meta) — every entity checked against the same prompt shares one
+    answer, so geoCampaigns fetches it once and sends it back here for each brand."""
+    answer, citations, meta = fetched or fetch_answer(prompt, location, model_id)
+
+    citation_urls = _citation_urls(citations)
     a = extract_with_claude(brand, answer, aliases)
-    a["is_cited"] = is_cited
+    a["is_cited"] = _is_cited(url, citation_urls)
     a["citation_urls"] = citation_urls
     # Full answer, untruncated. It used to be cut to 4000 chars here and then again to 1200 in
     # geoCampaigns, so the text the dashboard showed under "Full AI response" never was one.
@@ -441,6 +494,34 @@ def verify_one(prompt, brand, url, location, model_id, aliases=None):
             "engine": model_id, "model_name": meta.get("model_name"), "cost": meta.get("cost")}
 
 
+def verify_many(prompt, entities, location, model_id, fetched=None):
+    """verify_one for several entities ({brand, url, aliases}) sharing one prompt: one engine
+    answer, one grading call. Returns one result per entity, in order."""
+    answer, citations, meta = fetched or fetch_answer(prompt, location, model_id)
+    citation_urls = _citation_urls(citations)
+    out = []
+    for ent, a in zip(entities, extract_entities_with_claude(entities, answer)):
+        a["is_cited"] = _is_cited(ent.get("url"), citation_urls)
+        a["citation_urls"] = citation_urls
+        out.append({"status": "success", "analysis": a, "response": answer, "engine": model_id,
+                    "model_name": meta.get("model_name"), "cost": meta.get("cost")})
+    return out
+
+
+def _citation_urls(citations):
+    out, seen = [], set()
+    for c in citations:
+        if c["url"] not in seen:
+            seen.add(c["url"])
+            out.append(c["url"])
+    return out
+
+
+def _is_cited(url, citation_urls):
+    target_domain = domain_of(url)
+    return bool(target_domain) and any(domain_of(u) == target_domain for u in citation_urls)
+
+
 def _first_model(engine_path):
     status, body = _http_json(
         f"{DFS_BASE}/ai_optimization/{engine_path}/llm_responses/models",
@@ -479,6 +560,18 @@ def lambda_handler(event, context):
     if action == "health":
         return _resp(200, {"ok": True, "has_dfs": bool(DFS_AUTH), "has_anthropic": bool(ANTHROPIC_API_KEY)})
 
+    if action == "fetch_answer":
+        prompt = req.get("prompt") or ""
+        model_id = (req.get("models") or ["chatgpt"])[0]
+        if not prompt:
+            return _resp(400, {"error": "prompt is required"})
+        try:
+            answer, citations, meta = fetch_answer(prompt, req.get("location") or "", model_id)
+            return _resp(200, {"answer": answer, "citations": citations, "engine": model_id,
+                               "model_name": meta.get("model_name"), "cost": meta.get("cost")})
+        except Exception as e:
+            return _resp(200, {"error": str(e), "engine": model_id})
+
     if action != "verify_mentions":
         return _resp(400, {"error": f"unsupported action: {action}"})
 
@@ -492,12 +585,32 @@ def lambda_handler(event, context):
     # catches names that LOOK like the brand. These carry the ones it cannot guess.
     aliases = [str(a).strip() for a in (req.get("aliases") or []) if str(a).strip()]
     model_id = models[0]
+    # Batched form: {entities: [{brand, url, aliases}]} grades them all against one answer and
+    # returns one verification per entity, in order.
+    entities = [{"brand": str(e.get("brand") or "").strip(), "url": e.get("url") or "",
+                 "aliases": [str(a).strip() for a in (e.get("aliases") or []) if str(a).strip()]}
+                for e in (req.get("entities") or []) if isinstance(e, dict)]
 
-    if not prompt or not brand:
+    if not prompt or not (brand or entities):
         return _resp(400, {"error": "prompt and brand are required"})
+    if any(not e["brand"] for e in entities):
+        return _resp(400, {"error": "every entity needs a brand"})
+
+    # A caller that already holds the engine's answer for this prompt (see fetch_answer) sends
+    # it back so only the grading runs — the engine isn't paid again per brand.
+    fetched = None
+    if isinstance(req.get("answer"), str):
+        fetched = (req["answer"], [c for c in (req.get("citations") or []) if isinstance(c, dict) and c.get("url")],
+                   {"model_name": req.get("model_name") or model_id, "cost": 0})
+
+    if entities:
+        try:
+            return _resp(200, {"verification": verify_many(prompt, entities, location, model_id, fetched)})
+        except Exception as e:
+            return _resp(200, {"verification": [{"status": "error", "error": str(e), "engine": model_id}]})
 
     try:
-        result = verify_one(prompt, brand, url, location, model_id, aliases)
+        result = verify_one(prompt, brand, url, location, model_id, aliases, fetched)
         return _resp(200, {"verification": [result]})
     except Exception as e:
         return _resp(200, {"verification": [{"status": "error", "error": str(e), "engine": model_id}]})
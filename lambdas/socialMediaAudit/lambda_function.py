@@ -26,6 +26,7 @@ See DEPLOY.md in this folder for the create-infra commands.
 """
 
 import html as html_lib
+import itertools
 import json
 import os
 import re
@@ -34,8 +35,9 @@ import uuid
 import base64
 import hashlib
 import statistics
+import threading
 from decimal import Decimal
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timezone, timedelta
 from urllib.parse import quote, urlencode
 
@@ -357,6 +359,7 @@ def lambda_handler(event, context):
 
     body = _parse_body(event)
     action = (body.get('action') or 'start').lower()
+    _cache_memo.clear()   # per-invocation: a warm container mustn't serve another run's lookups
 
     try:
         if action == 'start':
@@ -481,6 +484,10 @@ def handle_start(body):
 
     cached_n = 0
     runs = {}
+    if not no_cache:
+        _cache_prefetch([(p, (handles.get(p) or '').strip()) for p in platforms if ACTORS.get(p)]
+                        + [((c.get('platform') or '').strip(), (c.get('handle') or '').strip())
+                           for c in competitors if ACTORS.get((c.get('platform') or '').strip())])
     # Split cached (instant) from to-scrape, then launch every non-cached client
     # scrape concurrently — each _start_platform is a network POST to Apify, so
     # serial launches added seconds of dead time before polling could even begin.
@@ -985,6 +992,29 @@ def _statuses(run_ids):
     return dict(zip(ids, res))
 
 
+def _extract_run(platform, r, statuses, ok):
+    """_extract over a run entry's streamed, field-projected dataset(s). The
+    result carries `_items` (how many data items were read) and `_truncated`
+    (a dataset page couldn't be read) for the caller's found/cache decision —
+    pop both before storing the metrics."""
+    seen, status = [0], {}
+
+    def _count(stream):
+        for it in stream:
+            seen[0] += 1
+            yield it
+    fields = _apify_fields(platform)
+    items = _count(_apify_iter(r.get('dataset_id'), fields, status=status)) if ok else ()
+    # Facebook posts come from a second actor (posts-scraper).
+    post_items = ()
+    if r.get('posts_dataset_id') and statuses.get(r.get('posts_run_id')) == 'SUCCEEDED':
+        post_items = _count(_apify_iter(r.get('posts_dataset_id'), fields, status=status))
+    m = _extract(platform, items, post_items)
+    m['_items'] = seen[0]
+    m['_truncated'] = bool(status.get('truncated'))
+    return m
+
+
 def _lite_card(platform, m):
     """A _platform_card with the heavy per-post array stripped — small enough to
     store on the job item and stream back in every poll response."""
@@ -1001,6 +1031,7 @@ def _collect_partials(item, runs, statuses):
     partials = (json.loads(_raw) if isinstance(_raw, str) else dict(_raw or {}))
     ready    = set(item.get('partials_ready') or [])
     changed  = False
+    _cache_prefetch([(p, r.get('handle')) for p, r in runs.items() if r.get('cached') and p not in partials])
     for p, r in runs.items():
         if p in partials:
             continue
@@ -1012,13 +1043,9 @@ def _collect_partials(item, runs, statuses):
         rid = r.get('run_id')
         if not rid or statuses.get(rid) not in TERMINAL:
             continue                              # primary run not done yet
-        ok = statuses.get(rid) == 'SUCCEEDED'
-        items = _apify_items(r.get('dataset_id')) if ok else []
-        post_items = []
-        if r.get('posts_dataset_id') and statuses.get(r.get('posts_run_id')) == 'SUCCEEDED':
-            post_items = _apify_items(r.get('posts_dataset_id'))
-        m = _extract(p, items, post_items)
-        m['handle'] = r.get('handle'); m['found'] = bool(items or post_items)
+        m = _extract_run(p, r, statuses, statuses.get(rid) == 'SUCCEEDED')
+        m.pop('_truncated', None)
+        m['handle'] = r.get('handle'); m['found'] = bool(m.pop('_items'))
         partials[p] = _lite_card(p, m)
         ready.add(rid); changed = True
     return partials, ready, changed
@@ -1048,150 +1075,268 @@ def _serialize_scorecard(scorecard):
     return s
 
 
+FINALIZE_WORKERS = int(os.environ.get('SMA_FINALIZE_WORKERS', '12'))
+# Concurrent vision/LLM calls allowed across finalize's stages — the old single
+# creative/profile pool's size, so the graph doesn't raise the Anthropic load.
+FINALIZE_LANES = {'llm': 5}
+
+
+def _run_stages(stages, timings, workers=None):
+    """Run finalize's stage graph. `stages` maps name -> (deps, fn, lane); fn(res)
+    receives the dict of finished results and its return value is stored under
+    the stage's name. A stage starts as soon as all its deps have finished and
+    its lane (FINALIZE_LANES, None = unbounded) has room. timings[name] is filled
+    with [start_ms, duration_ms] relative to the graph's start. A stage that
+    raises fails the graph; best-effort stages catch their own errors."""
+    res, pending, running = {}, dict(stages), {}
+    in_lane = {}
+    t0 = time.time()
+
+    def _timed(name, fn):
+        t = time.time()
+        try:
+            return fn(res)
+        finally:
+            timings[name] = [int((t - t0) * 1000), int((time.time() - t) * 1000)]
+
+    with ThreadPoolExecutor(max_workers=workers or FINALIZE_WORKERS) as ex:
+        while pending or running:
+            for name, (deps, fn, lane) in list(pending.items()):
+                if any(d not in res for d in deps):
+                    continue
+                if lane and in_lane.get(lane, 0) >= FINALIZE_LANES.get(lane, 1):
+                    continue
+                in_lane[lane] = in_lane.get(lane, 0) + 1
+                running[ex.submit(_timed, name, fn)] = (name, lane)
+                del pending[name]
+            if not running:
+                raise RuntimeError('finalize stage graph stuck on: ' + ', '.join(sorted(pending)))
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in done:
+                name, lane = running.pop(fut)
+                in_lane[lane] -= 1
+                res[name] = fut.result()
+    return res
+
+
 def handle_finalize(body):
+    """Build the scorecard once every scrape has landed (or the source deadline
+    passed). Runs as a dependency graph (_run_stages) rather than in sequence:
+    dataset downloads, brand health, listening, the connected-client pull and
+    every vision/profile call start the moment their inputs exist. Per-stage
+    [start_ms, duration_ms] are stored on the job as finalize_stages, with the
+    wall-clock total in finalize_ms."""
     job_id = body.get('jobId')
     item = _jobs().get_item(Key={'jobId': job_id}).get('Item')
     if not item or item.get('scorecard'):
         return {'ok': True}
+    timings, t0 = {}, time.time()
     try:
         runs      = item.get('runs') or {}
         comp_runs = item.get('comp_runs') or []
         brand     = item.get('brand') or 'brand'
-        live_ids = _all_live_ids(runs, comp_runs)
-        statuses = _statuses(live_ids)          # concurrent — was serial per run id
+        _loc        = item.get('location') or 'Singapore'
+        _listen_cfg = item.get('listening') or {}
+        extra_ctx   = item.get('extra_context') or ''
+        native_pid  = item.get('native_project') or ''
+        _cache_prefetch([(p, r.get('handle')) for p, r in runs.items() if r.get('cached')]
+                        + [(c['platform'], c.get('handle')) for c in comp_runs if c.get('cached')])
 
-        def _metrics_for(platform, r):
+        def _metrics_for(platform, r, statuses):
             """Cache hit → reuse stored metrics; else fetch the dataset, extract,
-            and write to the 30-day cache so the next audit skips the scrape."""
+            and write to the 30-day cache so the next audit skips the scrape.
+            A truncated read is used for this audit but never cached."""
             if r.get('cached'):
                 return _cache_get(platform, r.get('handle')) or _empty_metrics(), 'cache'
-            ok = statuses.get(r.get('run_id')) == 'SUCCEEDED'
-            items = _apify_items(r.get('dataset_id')) if ok else []
-            # Facebook posts come from a second actor (posts-scraper).
-            post_items = []
-            if r.get('posts_dataset_id') and statuses.get(r.get('posts_run_id')) == 'SUCCEEDED':
-                post_items = _apify_items(r.get('posts_dataset_id'))
-            m = _extract(platform, items, post_items)
-            if items or post_items:
+            m = _extract_run(platform, r, statuses, statuses.get(r.get('run_id')) == 'SUCCEEDED')
+            got, truncated = m.pop('_items'), m.pop('_truncated', False)
+            if got and not truncated:
                 _cache_put(platform, r.get('handle'), m)
-            return m, ('apify' if (items or post_items) else 'empty')
+            return m, ('apify' if got else 'empty')
+
+        stages = {
+            'statuses': ((), lambda res: _statuses(_all_live_ids(runs, comp_runs)), None),
+            # Brand-health + social-listening both hit DataForSEO and need nothing
+            # from the scrapes. Listening is opt-in (frontend sets enabled) so
+            # daily cron captures skip it.
+            'brand_health': ((), lambda res: fetch_brand_health(item.get('domain'), brand, _loc), None),
+            'listening': ((), lambda res: (fetch_social_listening(brand, item.get('domain'), _loc, 'English',
+                                                                  _listen_cfg)
+                                           if _listen_cfg.get('enabled') else None), None),
+        }
 
-        client_metrics = {}
+        # ── Client datasets ──────────────────────────────────────────────────
+        def _client_stage(p, r):
+            def run(res):
+                m, src = _metrics_for(p, r, res['statuses'])
+                m['handle'] = r.get('handle')
+                m['found']  = src != 'empty'
+                return _add_growth(brand, p, m)
+            return run
+        client_keys = []
         for p, r in runs.items():
-            m, src = _metrics_for(p, r)
-            m['handle'] = r.get('handle')
-            m['found']  = src != 'empty'
-            m = _add_growth(brand, p, m)
-            client_metrics[p] = m
+            client_keys.append('client:' + p)
+            stages['client:' + p] = (('statuses',), _client_stage(p, r), None)
 
         # ── First-party enrichment ───────────────────────────────────────────
         # If this audit was tied to a connected Monthly-Social-Reports client,
         # overlay that client's private API metrics onto the scraped cards.
         # Platforms without a live connection keep their public Apify data; a
         # platform connected but never scraped gets a card built from native data.
-        native_sources, native_errors, native_month = [], {}, ''
-        native_pid = item.get('native_project') or ''
-        if native_pid:
+        # The pull itself needs no scrape, so it runs alongside the downloads.
+        def _native(res):
+            month = ''
+            if not native_pid:
+                return None, [], {}, month
             try:
                 proj = _rprojects().get_item(Key={'projectId': native_pid}).get('Item')
-                if proj:
-                    proj = _dec(proj)
-                    native_month = (item.get('native_month') or '').strip() or _current_month()
-                    native_cards, native_errors = _native_cards_for_month(proj, native_month)
-                    for nc in native_cards:
-                        np = nc.get('platform')
-                        if not np:
-                            continue
-                        had_apify = bool((client_metrics.get(np) or {}).get('found'))
-                        base = client_metrics.get(np) or {'handle': (proj.get('handles') or {}).get(np)}
-                        _overlay_native(base, nc, had_apify)
-                        base['found'] = True
-                        base['data_source'] = 'connected'
-                        client_metrics[np] = base
-                        native_sources.append(np)
+                if not proj:
+                    return None, [], {}, month
+                proj = _dec(proj)
+                month = (item.get('native_month') or '').strip() or _current_month()
+                cards, errors = _native_cards_for_month(proj, month)
+                return proj, cards, errors, month
             except Exception as e:
-                native_errors['_'] = str(e)[:200]
+                return None, [], {'_': str(e)[:200]}, month
 
-        competitor_metrics = []
-        comp_creative_jobs = []   # (entry, name, platform, full_metrics) for creative eval
-        comp_profile_src   = {}   # brand name -> [(platform, full_metrics)] for the profile
-        for c in comp_runs:
-            m, src = _metrics_for(c['platform'], c)
-            entry = {
-                'name': c.get('name'), 'platform': c['platform'], 'found': src != 'empty',
-                'followers': m.get('followers'), 'engagement_rate': m.get('engagement_rate'),
-                'posts_per_week': m.get('posts_per_week'),
-                'days_since_last_post': m.get('days_since_last_post'),
-                'avg_likes': m.get('avg_likes'), 'avg_comments': m.get('avg_comments'),
-                'avg_video_views': m.get('avg_video_views'),
-                'content_mix': m.get('content_mix'), 'top_hashtags': m.get('top_hashtags'),
-                'top_posts': m.get('top_posts'),
-                'handle': c.get('handle'),
-                'posts': m.get('posts') or [],
-            }
-            competitor_metrics.append(entry)
-            if src != 'empty' and (m.get('captions') or m.get('image_urls')):
-                m['found'] = True   # _analyze_creative skips entries without it
-                comp_creative_jobs.append((entry, c.get('name') or c.get('handle'), c['platform'], m))
-            if src != 'empty' and (m.get('captions') or m.get('bio')):
-                comp_profile_src.setdefault(
-                    c.get('name') or c.get('handle') or 'Competitor', []).append((c['platform'], m))
-
-        # Brand-health + social-listening both hit DataForSEO; fetch concurrently.
-        # Listening is opt-in (frontend sets enabled) so daily cron captures skip it.
-        _loc        = item.get('location') or 'Singapore'
-        _listen_cfg = item.get('listening') or {}
-        with ThreadPoolExecutor(max_workers=2) as _bx:
-            _bh_fut = _bx.submit(fetch_brand_health, item.get('domain'), brand, _loc)
-            _sl_fut = (_bx.submit(fetch_social_listening, brand, item.get('domain'), _loc, 'English', _listen_cfg)
-                       if _listen_cfg.get('enabled') else None)
-            brand_health     = _bh_fut.result()
-            social_listening = _sl_fut.result() if _sl_fut else None
-        indicators   = _flatten_indicators(client_metrics, brand_health)
-
-        # Creative/design/colour eval for the brand AND each competitor — run
-        # concurrently so the extra vision calls don't blow the 180s budget.
-        extra_ctx = item.get('extra_context') or ''
-        with ThreadPoolExecutor(max_workers=5) as ex:
-            brand_fut = ex.submit(_analyze_creative, brand, client_metrics, extra_ctx)
-            sent_fut  = ex.submit(_content_sentiment, brand, client_metrics)
-            comp_futs = [(entry, ex.submit(_analyze_creative, name, {plat: cm}, '',
-                                           MAX_CREATIVE_IMAGES_COMP))
-                         for (entry, name, plat, cm) in comp_creative_jobs]
-            prof_futs = [ex.submit(_analyze_competitor_profile, nm, srcs, _loc)
-                         for nm, srcs in list(comp_profile_src.items())[:MAX_COMPETITOR_PROFILES]]
-            creative = brand_fut.result()
-            for entry, fut in comp_futs:
+        def _client_metrics(res):
+            client_metrics = {p: res['client:' + p] for p in runs}
+            proj, native_cards, native_errors, native_month = res['native']
+            native_sources = []
+            try:
+                for nc in native_cards:
+                    np = nc.get('platform')
+                    if not np:
+                        continue
+                    had_apify = bool((client_metrics.get(np) or {}).get('found'))
+                    base = client_metrics.get(np) or {'handle': (proj.get('handles') or {}).get(np)}
+                    _overlay_native(base, nc, had_apify)
+                    base['found'] = True
+                    base['data_source'] = 'connected'
+                    client_metrics[np] = base
+                    native_sources.append(np)
+            except Exception as e:
+                native_errors['_'] = str(e)[:200]
+            return client_metrics, native_sources, native_errors, native_month
+
+        stages['native'] = ((), _native, None)
+        stages['client_metrics'] = (tuple(client_keys) + ('native',), _client_metrics, None)
+
+        # ── Competitor datasets, creative eval and profiles ──────────────────
+        def _comp_stage(c):
+            def run(res):
+                m, src = _metrics_for(c['platform'], c, res['statuses'])
+                entry = {
+                    'name': c.get('name'), 'platform': c['platform'], 'found': src != 'empty',
+                    'followers': m.get('followers'), 'engagement_rate': m.get('engagement_rate'),
+                    'posts_per_week': m.get('posts_per_week'),
+                    'days_since_last_post': m.get('days_since_last_post'),
+                    'avg_likes': m.get('avg_likes'), 'avg_comments': m.get('avg_comments'),
+                    'avg_video_views': m.get('avg_video_views'),
+                    'content_mix': m.get('content_mix'), 'top_hashtags': m.get('top_hashtags'),
+                    'top_posts': m.get('top_posts'),
+                    'handle': c.get('handle'),
+                    'posts': m.get('posts') or [],
+                }
+                creative_ok = src != 'empty' and bool(m.get('captions') or m.get('image_urls'))
+                if creative_ok:
+                    m['found'] = True   # _analyze_creative skips entries without it
+                profile_ok = src != 'empty' and bool(m.get('captions') or m.get('bio'))
+                return entry, m, creative_ok, profile_ok
+            return run
+
+        def _comp_creative_stage(key, c):
+            def run(res):
+                entry, m, creative_ok, _ = res[key]
+                if not creative_ok:
+                    return None
                 try:
-                    entry['creative'] = fut.result()
+                    entry['creative'] = _analyze_creative(c.get('name') or c.get('handle'), {c['platform']: m},
+                                                          '', MAX_CREATIVE_IMAGES_COMP)
                 except Exception:
                     entry['creative'] = None
-            competitor_profiles = []
-            for fut in prof_futs:
+                return None
+            return run
+
+        comp_keys, creative_keys, comp_names = [], [], []
+        for i, c in enumerate(comp_runs):
+            key = 'comp:%d' % i
+            comp_keys.append(key)
+            stages[key] = (('statuses',), _comp_stage(c), None)
+            creative_keys.append('comp_creative:%d' % i)
+            stages['comp_creative:%d' % i] = ((key,), _comp_creative_stage(key, c), 'llm')
+            nm = c.get('name') or c.get('handle') or 'Competitor'
+            if nm not in comp_names:
+                comp_names.append(nm)
+
+        def _profile_srcs(res, upto):
+            """{name: [(platform, metrics)]} for profile-worthy competitors among
+            comp_runs[:upto], in first-seen order (the order profiles are capped in)."""
+            srcs = {}
+            for i, c in enumerate(comp_runs[:upto]):
+                _, m, _, profile_ok = res['comp:%d' % i]
+                if profile_ok:
+                    srcs.setdefault(c.get('name') or c.get('handle') or 'Competitor', []).append((c['platform'], m))
+            return srcs
+
+        def _profile_stage(nm, upto):
+            # Waits only on the competitor runs up to this name's last one — enough
+            # to know its sources and whether it makes the MAX_COMPETITOR_PROFILES cut.
+            def run(res):
+                srcs = _profile_srcs(res, upto)
+                if nm not in list(srcs)[:MAX_COMPETITOR_PROFILES]:
+                    return None
                 try:
-                    prof = fut.result()
+                    return _analyze_competitor_profile(nm, srcs[nm], _loc)
                 except Exception:
-                    prof = None
-                if prof:
-                    competitor_profiles.append(prof)
-            content_sentiment = sent_fut.result()
-
-        # Benchmark block (Share of Voice / format mix / word cloud / sentiment).
-        benchmark = _compute_benchmark(brand, client_metrics, competitor_metrics)
-        if content_sentiment:
-            benchmark['content_sentiment'] = content_sentiment
-
-        scorecard    = _narrate(brand, client_metrics, competitor_metrics, brand_health,
-                                indicators, extra_ctx, creative=creative,
-                                competitor_profiles=competitor_profiles)
+                    return None
+            return run
+
+        profile_keys = []
+        for nm in comp_names:
+            upto = max(i for i, c in enumerate(comp_runs)
+                       if (c.get('name') or c.get('handle') or 'Competitor') == nm) + 1
+            key = 'profile:%d' % len(profile_keys)
+            profile_keys.append(key)
+            stages[key] = (tuple(comp_keys[:upto]), _profile_stage(nm, upto), 'llm')
+
+        # ── Brand creative, sentiment, indicators, benchmark ─────────────────
+        stages['creative'] = (('client_metrics',), lambda res: _analyze_creative(
+            brand, res['client_metrics'][0], extra_ctx), 'llm')
+        stages['content_sentiment'] = (('client_metrics',), lambda res: _content_sentiment(
+            brand, res['client_metrics'][0]), 'llm')
+        stages['indicators'] = (('client_metrics', 'brand_health'), lambda res: _flatten_indicators(
+            res['client_metrics'][0], res['brand_health']), None)
+        stages['competitors'] = (tuple(comp_keys) + tuple(creative_keys),
+                                 lambda res: [res[k][0] for k in comp_keys], None)
+
+        def _benchmark(res):
+            # Share of Voice / format mix / word cloud / sentiment.
+            benchmark = _compute_benchmark(brand, res['client_metrics'][0], res['competitors'])
+            if res['content_sentiment']:
+                benchmark['content_sentiment'] = res['content_sentiment']
+            return benchmark
+        stages['benchmark'] = (('client_metrics', 'competitors', 'content_sentiment'), _benchmark, None)
+
+        def _narrate_stage(res):
+            profiles = [res[k] for k in profile_keys if res[k]]
+            return _narrate(brand, res['client_metrics'][0], res['competitors'], res['brand_health'],
+                            res['indicators'], extra_ctx, creative=res['creative'],
+                            competitor_profiles=profiles), profiles
+        stages['narrate'] = (('client_metrics', 'competitors', 'brand_health', 'indicators', 'creative')
+                             + tuple(profile_keys), _narrate_stage, None)
+
+        res = _run_stages(stages, timings)
+        client_metrics, native_sources, native_errors, native_month = res['client_metrics']
+        scorecard, competitor_profiles = res['narrate']
         scorecard.update({
             'platforms': [_platform_card(p, m) for p, m in client_metrics.items()],
-            'indicators': indicators,
-            'brand_health': brand_health,
-            'social_listening': social_listening,
-            'creative': creative,
-            'benchmark': benchmark,
-            'competitors': [c for c in competitor_metrics if c.get('followers') is not None],
+            'indicators': res['indicators'],
+            'brand_health': res['brand_health'],
+            'social_listening': res['listening'],
+            'creative': res['creative'],
+            'benchmark': res['benchmark'],
+            'competitors': [c for c in res['competitors'] if c.get('followers') is not None],
             'competitor_profiles': competitor_profiles,
             'native_sources': native_sources,
             'native_month': native_month if native_pid else '',
@@ -1199,12 +1344,14 @@ def handle_finalize(body):
         if native_errors:
             scorecard['native_errors'] = native_errors
         _jobs().update_item(Key={'jobId': job_id},
-                            UpdateExpression='SET scorecard = :s',
-                            ExpressionAttributeValues={':s': _serialize_scorecard(scorecard)})
+                            UpdateExpression='SET scorecard = :s, finalize_stages = :st, finalize_ms = :ms',
+                            ExpressionAttributeValues={':s': _serialize_scorecard(scorecard), ':st': timings,
+                                                       ':ms': int((time.time() - t0) * 1000)})
     except Exception as e:
         _jobs().update_item(Key={'jobId': job_id},
-                            UpdateExpression='SET finalize_error = :e',
-                            ExpressionAttributeValues={':e': str(e)[:300]})
+                            UpdateExpression='SET finalize_error = :e, finalize_stages = :st, finalize_ms = :ms',
+                            ExpressionAttributeValues={':e': str(e)[:300], ':st': timings,
+                                                       ':ms': int((time.time() - t0) * 1000)})
     return {'ok': True}
 
 
@@ -1254,24 +1401,96 @@ def _apify_status(run_id):
         return 'RUNNING'
 
 
-def _apify_items(dataset_id):
+APIFY_PAGE_SIZE = int(os.environ.get('SMA_APIFY_PAGE_SIZE', '200'))
+APIFY_PAGE_ATTEMPTS = 3
+
+# Top-level item fields the extractors (_extract → _collect_posts / _post_image /
+# _post_type / _youtube_thumb) actually read, requested via the dataset API's
+# `fields=` so Apify never ships the rest (TikTok/Instagram items carry large
+# music/subtitle/comment/child-post blobs we ignore). Nested objects we do read
+# (latestPosts, authorMeta, author, videoMeta, media…) come back whole. Adding a
+# field to an extractor means adding it here too.
+_APIFY_FIELDS = (
+    # control rows (see _apify_iter)
+    'noResults', 'noResult',
+    # profile
+    'author', 'authorMeta', 'followersCount', 'followers', 'fans', 'fanCount', 'subscriberCount',
+    'followerCount', 'edge_followed_by', 'numberOfSubscribers', 'channelTotalSubscribers', 'subscribers',
+    'followsCount', 'following', 'followingCount', 'verified', 'isVerified', 'is_verified',
+    'isChannelVerified', 'biography', 'bio', 'channelDescription', 'description', 'about', 'signature',
+    'externalUrl', 'website', 'link', 'externalUrls', 'bioLink', 'businessCategoryName', 'category',
+    'categoryName', 'profilePicUrl', 'channelAvatarUrl', 'profilePicture', 'avatar', 'profileImage',
+    'originalAvatarUrl',
+    # nested post lists
+    'latestPosts', 'posts', 'videos', 'topPosts',
+    # post
+    'caption', 'text', 'title', 'likesCount', 'likes', 'diggCount', 'reactionsCount', 'topReactionsCount',
+    'likeCount', 'timestamp', 'createTime', 'publishedAt', 'date', 'taken_at', 'time', 'createdAt',
+    'commentsCount', 'comments', 'commentCount', 'replyCount', 'sharesCount', 'shares', 'shareCount',
+    'reshareCount', 'repostCount', 'retweetCount', 'quoteCount', 'videoViewCount', 'playCount', 'views',
+    'viewCount', 'viewsCount', 'url', 'webVideoUrl', 'postUrl', 'videoUrl', 'topLevelUrl', 'id', 'videoId',
+    'isVideo', 'type', 'productType', 'mediaType',
+    # post image
+    'displayUrl', 'imageUrl', 'thumbnailUrl', 'thumbnailSrc', 'thumbnail', 'cover', 'coverUrl', 'image',
+    'previewImageUrl', 'displayImageUrl', 'videoMeta', 'video', 'media', 'images', 'covers', 'thumbnails',
+)
+# harvestapi's LinkedIn company-posts shape (see _collect_posts).
+_APIFY_FIELDS_LINKEDIN = ('noResults', 'noResult', 'author', 'engagement', 'content', 'postedAt',
+                          'postVideo', 'postImages', 'document', 'linkedinUrl', 'shareLinkedinUrl')
+
+
+def _apify_fields(platform):
+    return ','.join(_APIFY_FIELDS_LINKEDIN if platform == 'linkedin' else _APIFY_FIELDS)
+
+
+def _apify_page(dataset_id, params):
+    """One dataset page as a list, retried with backoff; None if it never came."""
+    for attempt in range(APIFY_PAGE_ATTEMPTS):
+        if attempt:
+            time.sleep(0.5 * 2 ** attempt)
+        try:
+            data = requests.get(f'{APIFY_BASE}/datasets/{dataset_id}/items',
+                                params=params, timeout=30).json()
+        except (requests.exceptions.RequestException, ValueError):
+            continue
+        if isinstance(data, list):
+            return data
+    return None
+
+
+def _apify_iter(dataset_id, fields=None, page_size=None, status=None):
+    """Yield a dataset's items a page at a time (offset/limit), so callers fold
+    over the stream instead of holding the whole dataset. `fields` is an Apify
+    `fields=` projection (see _apify_fields); None returns every field. A page
+    that still fails after retries ends the stream early and sets
+    status['truncated'] (when a `status` dict is given), so callers can tell a
+    short read from a small dataset. Stops fetching as soon as the caller stops
+    iterating."""
     if not dataset_id:
-        return []
-    try:
-        r = requests.get(f'{APIFY_BASE}/datasets/{dataset_id}/items',
-                         params={'token': APIFY_TOKEN, 'clean': 'true'}, timeout=30)
-        data = r.json()
-        if not isinstance(data, list):
-            return []
-        # Some actors emit control/marker rows instead of data — notably apidojo's
-        # tweet-scraper returns `{"noResults": true}` placeholder rows (e.g. when
-        # the Apify account is on the free plan and the paid actor is gated).
-        # Drop them so an empty scrape reads as "no data" (found=False) rather than
-        # a card full of blank posts.
-        return [it for it in data
-                if not (isinstance(it, dict) and (it.get('noResults') or it.get('noResult')))]
-    except (requests.exceptions.RequestException, ValueError):
-        return []
+        return
+    limit = page_size or APIFY_PAGE_SIZE
+    params = {'token': APIFY_TOKEN, 'clean': 'true', 'limit': limit}
+    if fields:
+        params['fields'] = fields
+    offset = 0
+    while True:
+        data = _apify_page(dataset_id, dict(params, offset=offset))
+        if data is None:
+            print(f'[apify] dataset {dataset_id} truncated at offset {offset}')
+            if status is not None:
+                status['truncated'] = True
+            return
+        for it in data:
+            # Some actors emit control/marker rows instead of data — notably apidojo's
+            # tweet-scraper returns `{"noResults": true}` placeholder rows (e.g. when
+            # the Apify account is on the free plan and the paid actor is gated).
+            # Drop them so an empty scrape reads as "no data" (found=False) rather than
+            # a card full of blank posts.
+            if not (isinstance(it, dict) and (it.get('noResults') or it.get('noResult'))):
+                yield it
+        if len(data) < limit:
+            return
+        offset += limit
 
 
 def _start_platform(platform, handle):
@@ -1350,10 +1569,15 @@ def _extract(platform, items, post_items=None):
 
     `post_items` is an optional SECOND dataset holding the posts (Facebook: the
     pages-scraper `items` carry the profile, the posts-scraper `post_items`
-    carry the posts). When given, posts are read from it instead of `items`."""
-    if not items and not post_items:
+    carry the posts). When given, posts are read from it instead of `items`.
+
+    Both may be any iterable (typically _apify_iter streams): only the first item
+    is looked at up front, the rest is folded through _collect_posts."""
+    items, first = _peek(items)
+    post_items, post_first = _peek(post_items)
+    if first is _NONE and post_first is _NONE:
         return _empty_metrics()
-    head = items[0] if (items and isinstance(items[0], dict)) else {}
+    head = first if isinstance(first, dict) else {}
 
     # LinkedIn: the company-posts actor returns one item PER POST; the company
     # profile (follower count, name, avatar) lives on each post's `author`.
@@ -1384,14 +1608,24 @@ def _extract(platform, items, post_items=None):
     pfp       = _g(prof, 'profilePicUrl', 'channelAvatarUrl', 'profilePicture', 'avatar',
                    'profileImage', 'originalAvatarUrl', 'thumbnailUrl', default='')
 
-    if post_items:
-        post_head = post_items[0] if isinstance(post_items[0], dict) else {}
+    if post_first is not _NONE:
+        post_head = post_first if isinstance(post_first, dict) else {}
         posts = _collect_posts(platform, post_items, post_head)
     else:
         posts = _collect_posts(platform, items, head)
     return _metrics_from(followers, following, verified, bio, link, category, pfp, posts)
 
 
+_NONE = object()
+
+
+def _peek(items):
+    """(iterable equivalent to `items`, its first element or _NONE if empty)."""
+    it = iter(items or ())
+    first = next(it, _NONE)
+    return (it if first is _NONE else itertools.chain((first,), it)), first
+
+
 _PROFILE_HEAD_KEYS = ('followersCount', 'followers', 'subscriberCount', 'fans',
                       'edge_followed_by', 'followerCount')
 
@@ -1401,7 +1635,8 @@ def _collect_posts(platform, items, head):
 
     Three actor shapes: (a) head carries a nested post list (Instagram), (b) head
     is itself a post and items[1:] are more posts (TikTok — items[0] is a video
-    with authorMeta), (c) head is a profile and items[1:] are posts."""
+    with authorMeta), (c) head is a profile and items[1:] are posts. `items` is
+    consumed once, lazily; in shape (a) it isn't read past the head at all."""
     # LinkedIn posts come from harvestapi's company-posts actor — a distinct,
     # nested shape (engagement.*, postedAt.*, postImages/postVideo). Normalise it
     # directly rather than via the generic field-name guessing below.
@@ -1447,8 +1682,10 @@ def _collect_posts(platform, items, head):
     else:
         head_is_profile = ('authorMeta' not in head
                            and any(k in head for k in _PROFILE_HEAD_KEYS))
-        src = items[1:] if head_is_profile else items
-        raw = [it for it in src if isinstance(it, dict)]
+        src = iter(items)
+        if head_is_profile:
+            next(src, None)
+        raw = (it for it in src if isinstance(it, dict))
     is_youtube = (platform == 'youtube')
     out = []
     for p in raw:
@@ -2282,9 +2519,8 @@ def _sl_social_pull(terms, platforms, cap=None):
             time.sleep(10)
 
     for p, ent in started.items():
-        items = _apify_items(ent['dataset_id'])
         posts, seen = [], set()
-        for it in items:
+        for it in _apify_iter(ent['dataset_id']):
             m = _sl_norm_social(p, it)
             if not m or not m.get('url') or m['url'] in seen:
                 continue
@@ -3297,9 +3533,9 @@ def _narrate(brand, client_metrics, competitor_metrics, brand_health, indicators
 # single project never blows past DynamoDB's 400KB item cap). All staff share the
 # same store — no per-user filtering — mirroring the recruitment database model.
 
-def _rprojects(): return boto3.resource('dynamodb', region_name=REGION).Table(REPORT_PROJECTS_TABLE)
-def _rmonths():   return boto3.resource('dynamodb', region_name=REGION).Table(REPORT_MONTHS_TABLE)
-def _rdays():     return boto3.resource('dynamodb', region_name=REGION).Table(REPORT_DAYS_TABLE)
+def _rprojects(): return _tbl(REPORT_PROJECTS_TABLE)
+def _rmonths():   return _tbl(REPORT_MONTHS_TABLE)
+def _rdays():     return _tbl(REPORT_DAYS_TABLE)
 
 def _enc(obj):
     """Encode for DynamoDB writes — JSON round-trip turns floats into Decimal
@@ -5102,9 +5338,9 @@ def report_extract_pdf(body):
 # ──────────────────────────────────────────────────────────────────────────────
 SL_SNAPSHOT_TTL_SECS = 400 * 86400   # ~13 months — old snapshots self-clean via DynamoDB TTL
 
-def _slclients():   return boto3.resource('dynamodb', region_name=REGION).Table(SL_CLIENTS_TABLE)
-def _sltopics():    return boto3.resource('dynamodb', region_name=REGION).Table(SL_TOPICS_TABLE)
-def _slsnapshots(): return boto3.resource('dynamodb', region_name=REGION).Table(SL_SNAPSHOTS_TABLE)
+def _slclients():   return _tbl(SL_CLIENTS_TABLE)
+def _sltopics():    return _tbl(SL_TOPICS_TABLE)
+def _slsnapshots(): return _tbl(SL_SNAPSHOTS_TABLE)
 
 
 def sl_list_clients(body):
@@ -8100,39 +8336,112 @@ def _cron_tiktok_platforms(proj, month):
 # ──────────────────────────────────────────────────────────────────────────────
 # Small utils
 # ──────────────────────────────────────────────────────────────────────────────
-def _jobs():  return boto3.resource('dynamodb', region_name=REGION).Table(JOBS_TABLE)
-def _snaps(): return boto3.resource('dynamodb', region_name=REGION).Table(SNAP_TABLE)
-def _cache(): return boto3.resource('dynamodb', region_name=REGION).Table(CACHE_TABLE)
+# One DynamoDB resource and one Table handle per table for the container's
+# lifetime — building a resource per call cost a session + endpoint setup every
+# time, and creating them concurrently from worker threads isn't thread-safe.
+_ddb_res = None
+_ddb_tables = {}
+_ddb_lock = threading.Lock()
+
+
+def _ddb():
+    global _ddb_res
+    if _ddb_res is None:
+        with _ddb_lock:
+            if _ddb_res is None:
+                _ddb_res = boto3.resource('dynamodb', region_name=REGION)
+    return _ddb_res
+
+
+def _tbl(name):
+    t = _ddb_tables.get(name)
+    if t is None:
+        res = _ddb()
+        with _ddb_lock:
+            t = _ddb_tables.get(name)
+            if t is None:
+                t = _ddb_tables[name] = res.Table(name)
+    return t
+
+
+def _jobs():  return _tbl(JOBS_TABLE)
+def _snaps(): return _tbl(SNAP_TABLE)
+def _cache(): return _tbl(CACHE_TABLE)
 
 
 # 30-day Apify cache, keyed by platform#handle and shared across client +
 # competitor lookups so repeat audits skip (and don't pay for) the scrape.
+# Lookups go through a per-invocation memo (cleared by lambda_handler) that
+# _cache_prefetch fills for a whole job with BatchGetItem, so start/poll/finalize
+# make one round-trip per 100 keys instead of one GetItem per platform handle.
+_cache_memo = {}   # ckey -> metrics JSON, or None for a known miss
+
+
 def _cache_key(platform, handle):
     return f'{platform}#{(handle or "").strip().lstrip("@").rstrip("/").lower()}'
 
 
-def _cache_get(platform, handle):
+def _cache_metrics(item):
+    """A cache row's metrics JSON, or None if it's missing, expired or stale."""
     try:
-        item = _cache().get_item(Key={'ckey': _cache_key(platform, handle)}).get('Item')
         if item and item.get('metrics') and int(item.get('ttl', 0)) > int(time.time()):
-            m = json.loads(item['metrics'])
             # Ignore entries written under an older metrics shape (e.g. the
             # pre-fix TikTok scrape) so they re-scrape instead of serving bad data.
-            if m.get('_schema') == METRICS_SCHEMA:
-                return m
+            if json.loads(item['metrics']).get('_schema') == METRICS_SCHEMA:
+                return item['metrics']
     except Exception:
         pass
     return None
 
 
+def _cache_prefetch(pairs):
+    """Resolve every (platform, handle) in `pairs` into the memo with
+    BatchGetItem. Best-effort: a key it can't resolve is simply left for
+    _cache_get to fetch on its own."""
+    keys = list(dict.fromkeys(_cache_key(p, h) for p, h in pairs if h))
+    keys = [k for k in keys if k not in _cache_memo]
+    for i in range(0, len(keys), 100):
+        want = {'Keys': [{'ckey': k} for k in keys[i:i + 100]], 'ProjectionExpression': 'ckey, metrics, #t',
+                'ExpressionAttributeNames': {'#t': 'ttl'}}
+        found = {}
+        try:
+            for attempt in range(4):
+                resp = _ddb().batch_get_item(RequestItems={CACHE_TABLE: want})
+                for it in (resp.get('Responses') or {}).get(CACHE_TABLE, []):
+                    found[it['ckey']] = it
+                want = (resp.get('UnprocessedKeys') or {}).get(CACHE_TABLE)
+                if not want:
+                    break
+                time.sleep(0.05 * 2 ** attempt)
+        except Exception:
+            continue
+        unresolved = {k['ckey'] for k in (want or {}).get('Keys', [])}
+        for k in keys[i:i + 100]:
+            if k not in unresolved:
+                _cache_memo[k] = _cache_metrics(found.get(k))
+
+
+def _cache_get(platform, handle):
+    key = _cache_key(platform, handle)
+    if key not in _cache_memo:
+        try:
+            _cache_memo[key] = _cache_metrics(_cache().get_item(Key={'ckey': key}).get('Item'))
+        except Exception:
+            return None
+    m = _cache_memo[key]
+    return json.loads(m) if m is not None else None
+
+
 def _cache_put(platform, handle, metrics):
     try:
+        blob = json.dumps(metrics, default=str)
         _cache().put_item(Item={
             'ckey': _cache_key(platform, handle),
-            'metrics': json.dumps(metrics, default=str),
+            'metrics': blob,
             'cached_at': int(time.time()),
             'ttl': int(time.time()) + CACHE_TTL_SECS,
         })
+        _cache_memo[_cache_key(platform, handle)] = blob
     except Exception:
         pass
 
@@ -5,9 +5,15 @@ import re
 import base64
 import time
 import hashlib
+import threading
 import traceback
+from collections import OrderedDict
 from datetime import datetime, timezone, timedelta
 from pymongo import MongoClient, UpdateOne
+try:
+    import numpy as np   # in-process KB index; without it KB search uses Atlas $vectorSearch
+except ImportError:
+    np = None
 
 SGT = timezone(timedelta(hours=8))  # Singapore time, for error-report display
 
@@ -84,6 +90,11 @@ KB_EMBED_MODEL  = os.environ.get('KB_EMBED_MODEL', 'text-embedding-3-small')
 KB_EMBED_DIMS   = 1536
 KB_WRITE_KEY    = os.environ.get('KB_WRITE_KEY')   # shared secret for the Apps Script sync
 KB_SCORE_FLOOR  = float(os.environ.get('KB_SCORE_FLOOR', '0.6'))  # cosine vectorSearchScore (0..1)
+KB_META_COLLECTION  = 'kb_meta'   # {_id: "index_version"} bumped whenever sync changes rows
+KB_EMBED_CACHE_COLLECTION = 'kb_embedding_cache'
+KB_EMBED_CACHE_LRU_MAX    = 2048   # in-memory tier, per warm container
+KB_QUERY_EMBED_TTL_DAYS   = 90     # query vectors expire; KB-row vectors are kept
+KB_INDEX_CHECK_SEC  = int(os.environ.get('KB_INDEX_CHECK_SEC', '60'))  # version re-check throttle
 
 def get_db():
     global mongo_client
@@ -282,6 +293,131 @@ def embed_texts(texts, body=None):
         out.extend([d["embedding"] for d in data])
     return out
 
+# ── Embedding cache ──────────────────────────────────────────────────────────
+# WhatsApp clients ask the same handful of questions over and over, and every
+# sync used to re-embed any row missing from the collection. Vectors are cached
+# under sha256(model + whitespace-normalised text — case kept, since a case-only
+# edit is a real edit): first in a per-container LRU, then in the
+# kb_embedding_cache collection, so repeats never pay an OpenAI round-trip and a
+# wiped knowledge_base re-syncs without re-embedding unchanged rows. Query
+# vectors expire by TTL; KB-row vectors are pruned to the current KB on full sync.
+_EMBED_LRU = OrderedDict()
+_EMBED_LRU_LOCK = threading.Lock()
+_embed_cache_indexed = False
+
+
+def _embed_cache_key(text):
+    norm = re.sub(r'\s+', ' ', text or '').strip()
+    return hashlib.sha256(f"{KB_EMBED_MODEL}\u241f{norm}".encode('utf-8')).hexdigest()
+
+
+def _embed_cache_coll():
+    """kb_embedding_cache with its query-vector TTL index ensured once per container."""
+    global _embed_cache_indexed
+    db = get_db()
+    if db is None:
+        return None
+    coll = db[KB_EMBED_CACHE_COLLECTION]
+    if not _embed_cache_indexed:
+        try:
+            coll.create_index("created_at", expireAfterSeconds=KB_QUERY_EMBED_TTL_DAYS * 86400,
+                              partialFilterExpression={"kind": "query"})
+            _embed_cache_indexed = True
+        except Exception:
+            pass  # index may already exist / Mongo hiccup — never block embedding
+    return coll
+
+
+def _embed_lru_put(key, vec):
+    with _EMBED_LRU_LOCK:
+        _EMBED_LRU[key] = vec
+        _EMBED_LRU.move_to_end(key)
+        while len(_EMBED_LRU) > KB_EMBED_CACHE_LRU_MAX:
+            _EMBED_LRU.popitem(last=False)
+
+
+def _embed_cache_prune_kb(texts):
+    """Drop cached KB-row vectors for any text not in `texts` (the current KB).
+    Returns how many were removed; best-effort."""
+    try:
+        coll = _embed_cache_coll()
+        if coll is None:
+            return 0
+        keep = list({_embed_cache_key(t) for t in texts})
+        return coll.delete_many({"kind": "kb", "_id": {"$nin": keep}}).deleted_count
+    except Exception as e:
+        print(f"[KB] embedding cache prune failed: {e}")
+        return 0
+
+
+def embed_texts_cached(texts, body=None, kind="query"):
+    """embed_texts behind the LRU → Mongo → OpenAI tiers. `kind` is "query" for
+    search text (expires) or "kb" for knowledge-base rows (kept). A vector first
+    cached as a query is promoted to "kb" once a KB row reuses it, so the TTL
+    index can't expire a live KB vector."""
+    keys = [_embed_cache_key(t) for t in texts]
+    resolved = {}   # cache key -> vector
+    with _EMBED_LRU_LOCK:
+        for k in keys:
+            if k in _EMBED_LRU:
+                _EMBED_LRU.move_to_end(k)
+                resolved[k] = _EMBED_LRU[k]
+    lru_hits = len(resolved)
+
+    coll = None
+    mongo_hits = 0
+    missing = set(keys) - set(resolved)
+    if missing:
+        try:
+            coll = _embed_cache_coll()
+            if coll is not None:
+                for d in coll.find({"_id": {"$in": list(missing)}}, {"embedding": 1}):
+                    resolved[d["_id"]] = d["embedding"]
+                    _embed_lru_put(d["_id"], d["embedding"])
+                    missing.discard(d["_id"])
+                    mongo_hits += 1
+        except Exception as e:
+            print(f"[KB] embedding cache read failed: {e}")
+
+    reused = list(resolved)   # cache keys served from the LRU or Mongo
+    fresh = {}
+    if missing:
+        first_text = {}
+        for k, t in zip(keys, texts):
+            if k in missing:
+                first_text.setdefault(k, t)
+        todo = list(first_text)
+        for k, vec in zip(todo, embed_texts([first_text[k] for k in todo], body)):
+            fresh[k] = resolved[k] = vec
+            _embed_lru_put(k, vec)
+        if coll is not None:
+            now = datetime.utcnow()
+            on_insert = {"model": KB_EMBED_MODEL, "created_at": now}
+            if kind != "kb":
+                on_insert["kind"] = kind
+            try:
+                coll.bulk_write([
+                    UpdateOne({"_id": k}, {"$setOnInsert": {"embedding": v, **on_insert},
+                                           **({"$set": {"kind": "kb"}} if kind == "kb" else {})},
+                              upsert=True)
+                    for k, v in fresh.items()
+                ], ordered=False)
+            except Exception as e:
+                print(f"[KB] embedding cache write failed: {e}")
+
+    if kind == "kb" and reused:
+        try:
+            coll = coll if coll is not None else _embed_cache_coll()
+            if coll is not None:
+                coll.update_many({"_id": {"$in": reused}, "kind": {"$ne": "kb"}},
+                                 {"$set": {"kind": "kb"}})
+        except Exception as e:
+            print(f"[KB] embedding cache kind promotion failed: {e}")
+
+    print(f"[KB] embeddings: {len(texts)} requested, lru={lru_hits} mongo={mongo_hits} "
+          f"openai={len(fresh)}")
+    return [resolved[k] for k in keys]
+
 # Rows that EXPOSE a secret (a password value, wifi password, or email+password
 # pair) must never be embedded into a client-facing knowledge base. These patterns
 # look for a value-bearing leak, not just the word "password" (so legitimate
@@ -347,10 +483,14 @@ def sync_knowledge_base(body):
         })
 
     # Only (re)embed rows whose content changed
-    existing = {d['qid']: d.get('content_hash') for d in coll.find({}, {"qid": 1, "content_hash": 1})}
-    to_embed = [c for c in clean if existing.get(c['qid']) != c['content_hash']]
+    existing = {d['qid']: d for d in coll.find({}, {"qid": 1, "content_hash": 1, "tags": 1, "sheet_tab": 1})}
+    to_embed = [c for c in clean if (existing.get(c['qid']) or {}).get('content_hash') != c['content_hash']]
+    # tags / sheet_tab don't need a re-embed but are served from the local index's docs.
+    retagged = [c for c in clean if c['qid'] in existing
+                and ((existing[c['qid']].get('tags') or []) != c['tags']
+                     or (existing[c['qid']].get('sheet_tab') or '') != c['sheet_tab'])]
     if to_embed:
-        vectors = embed_texts([f"{c['question']}\n{c['answer']}" for c in to_embed], body)
+        vectors = embed_texts_cached([f"{c['question']}\n{c['answer']}" for c in to_embed], body, kind="kb")
         for c, v in zip(to_embed, vectors):
             c['embedding'] = v
 
@@ -374,6 +514,22 @@ def sync_knowledge_base(body):
     deleted = 0
     if body.get('full_sync', True):
         deleted = coll.delete_many({"qid": {"$nin": list(seen_qids)}}).deleted_count
+        _embed_cache_prune_kb([f"{c['question']}\n{c['answer']}" for c in clean])
+
+    # Any changed content_hash, tags/sheet_tab or removed row invalidates every warm
+    # container's in-process index: bump the shared version and drop our own copy now
+    # (matrix and check time too, or _kb_local_index would keep serving it until the
+    # next version check).
+    if to_embed or retagged or deleted:
+        try:
+            db[KB_META_COLLECTION].update_one(
+                {"_id": "index_version"},
+                {"$set": {"version": hashlib.sha256(f"{time.time()}:{len(clean)}".encode()).hexdigest()[:16],
+                          "updated_at": now}},
+                upsert=True)
+        except Exception as e:
+            print(f"[KB] index version bump failed: {e}")
+        _KB_INDEX.update(version=None, matrix=None, docs=[], checked_at=0.0)
 
     return {"statusCode": 200, "body": json.dumps({
         "received":       len(rows),
@@ -412,8 +568,67 @@ def kb_ensure_index(body):
     except Exception as e:
         return {"statusCode": 500, "body": json.dumps({"error": f"create_search_index failed: {e}"})}
 
+# ── In-process KB vector index ───────────────────────────────────────────────
+# The KB is a few thousand Q&A rows, so a warm container keeps every embedding in
+# one L2-normalised float32 matrix and scores a query with a single dot product
+# instead of an Atlas $vectorSearch round-trip per lookup. The matrix reloads
+# only when sync_knowledge_base bumps kb_meta.index_version (checked at most once
+# per KB_INDEX_CHECK_SEC).
+_KB_INDEX = {"version": None, "checked_at": 0.0, "matrix": None, "docs": []}
+
+
+def _kb_index_version(db):
+    doc = db[KB_META_COLLECTION].find_one({"_id": "index_version"}, {"version": 1}) or {}
+    return doc.get("version") or "initial"
+
+
+def _kb_local_index(db):
+    """The warm container's (matrix, docs), reloading if the KB changed.
+    Returns (None, None) when numpy is unavailable or the KB is empty."""
+    if np is None:
+        return None, None
+    now = time.time()
+    if _KB_INDEX["matrix"] is not None and now - _KB_INDEX["checked_at"] < KB_INDEX_CHECK_SEC:
+        return _KB_INDEX["matrix"], _KB_INDEX["docs"]
+    version = _kb_index_version(db)
+    _KB_INDEX["checked_at"] = now
+    if _KB_INDEX["matrix"] is not None and version == _KB_INDEX["version"]:
+        return _KB_INDEX["matrix"], _KB_INDEX["docs"]
+    t0 = time.time()
+    docs, vecs = [], []
+    for d in db[KB_COLLECTION].find({"embedding": {"$exists": True}},
+                                    {"_id": 0, "question": 1, "answer": 1, "tags": 1,
+                                     "sheet_tab": 1, "embedding": 1}):
+        emb = d.pop("embedding", None)
+        if isinstance(emb, list) and len(emb) == KB_EMBED_DIMS:
+            docs.append(d)
+            vecs.append(emb)
+    if not vecs:
+        _KB_INDEX.update(version=version, matrix=None, docs=[])
+        return None, None
+    matrix = np.asarray(vecs, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms == 0, 1.0, norms)
+    _KB_INDEX.update(version=version, matrix=matrix, docs=docs)
+    print(f"[KB] local index loaded: {len(docs)} rows, version={version} in {time.time() - t0:.2f}s")
+    return matrix, docs
+
+
+def _kb_local_search(matrix, docs, qvec, top_k):
+    """Top-k by cosine over the normalised matrix. Scores are mapped to Atlas's
+    cosine vectorSearchScore scale, (1 + cos) / 2, so KB_SCORE_FLOOR keeps its meaning."""
+    q = np.asarray(qvec, dtype=np.float32)
+    q /= (np.linalg.norm(q) or 1.0)
+    sims = matrix @ q
+    k = min(top_k, len(docs))
+    idx = np.argpartition(-sims, k - 1)[:k]
+    idx = idx[np.argsort(-sims[idx])]
+    return [dict(docs[i], score=float((1.0 + sims[i]) / 2.0)) for i in idx]
+
+
 def search_knowledge_base_db(query, top_k=4, body=None):
-    """Semantic search over the knowledge base via Atlas Vector Search."""
+    """Semantic search over the knowledge base: the warm container's in-process
+    index when available, otherwise Atlas Vector Search."""
     query = (query or '').strip()
     if not query:
         return {"matches": [], "returned": 0, "error": "empty query"}
@@ -421,13 +636,22 @@ def search_knowledge_base_db(query, top_k=4, body=None):
     if db is None:
         return {"matches": [], "returned": 0, "error": "Knowledge base unavailable"}
     try:
-        qvec = embed_texts([query], body)[0]
+        qvec = embed_texts_cached([query], body)[0]
     except Exception as e:
         return {"matches": [], "returned": 0, "error": f"Embedding failed: {e}"}
     try:
         top_k = max(1, min(int(top_k or 4), 10))
     except (TypeError, ValueError):
         top_k = 4
+    try:
+        matrix, docs = _kb_local_index(db)
+    except Exception as e:
+        print(f"[KB] local index unavailable, using Atlas: {e}")
+        matrix, docs = None, None
+    if matrix is not None:
+        results = _kb_local_search(matrix, docs, qvec, top_k)
+        matches = [r for r in results if r.get('score', 0) >= KB_SCORE_FLOOR]
+        return {"query": query, "matches": matches, "returned": len(matches)}
     try:
         pipeline = [
             {"$vectorSearch": {
@@ -2363,11 +2587,91 @@ def get_board_items(body):
         return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
 
 # ── Monday GraphQL helper (updated for crawler support) ──────────────────────
-def run_monday_graphql(query, variables=None, api_key=None):
-    """Execute a raw GraphQL query against Monday.com and return parsed JSON."""
+# ── Read-query cache for run_monday_graphql ─────────────────────────────────
+# The chat loop re-issues identical reads (board schemas, items_page pulls of the
+# same board) across rounds and consecutive turns. Successful non-mutation
+# results are cached per warm container, content-addressed on normalised query +
+# variables + API key, for a short TTL. Every mutation (cached caller or not)
+# evicts entries that mention any board/item id it touches; a mutation with no
+# recognisable id flushes that key's entries. A read that was in flight while a
+# mutation started or finished may hold pre-mutation data, so it is served but
+# not stored: a miss records the invalidation generation, and the store is
+# skipped if it moved or a mutation is still running. Least-recently-used
+# entries are evicted at MONDAY_GQL_CACHE_MAX.
+MONDAY_GQL_CACHE_TTL = int(os.environ.get('MONDAY_GQL_CACHE_TTL', '90'))
+MONDAY_GQL_CACHE_MAX = 256
+_GQL_CACHE = OrderedDict()   # cache key -> {"exp", "data", "ids", "key_hash"}, LRU order
+_GQL_CACHE_STATS = {"hits": 0, "misses": 0, "evictions": 0}
+_GQL_CACHE_GEN = {"gen": 0, "mutating": 0}   # bumped on every mutation start/finish
+_GQL_CACHE_LOCK = threading.Lock()   # chat tool calls run concurrently
+_GQL_ID_RE = re.compile(r'\b\d{6,}\b')   # Monday board/item ids (avoids limit:/page numbers)
+_GQL_MUTATION_RE = re.compile(r'^\s*mutation\b', re.I)
+
+
+def _gql_ids(*parts):
+    """Every Monday-sized numeric id mentioned in the given query/vars/result."""
+    ids = set()
+    for part in parts:
+        if part is None:
+            continue
+        ids.update(_GQL_ID_RE.findall(part if isinstance(part, str) else json.dumps(part)))
+    return ids
+
+
+def _gql_cache_key(query, variables, key):
+    norm = re.sub(r'\s+', ' ', query or '').strip()
+    raw = json.dumps([norm, variables or {}, hashlib.sha256(key.encode()).hexdigest()], sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _gql_cache_invalidate(query, variables, key):
+    """Drop cached reads a mutation could have made stale. Marks the mutation
+    as running until _gql_mutation_done."""
+    key_hash = hashlib.sha256(key.encode()).hexdigest()
+    touched = _gql_ids(query, variables)
+    with _GQL_CACHE_LOCK:
+        _GQL_CACHE_GEN["gen"] += 1
+        _GQL_CACHE_GEN["mutating"] += 1
+        stale = [k for k, e in _GQL_CACHE.items()
+                 if e["key_hash"] == key_hash and (not touched or e["ids"] & touched)]
+        for k in stale:
+            _GQL_CACHE.pop(k, None)
+        _GQL_CACHE_STATS["evictions"] += len(stale)
+    if stale:
+        print(f"[MONDAY-GQL] cache: mutation evicted {len(stale)} entr{'y' if len(stale) == 1 else 'ies'} "
+              f"(ids={sorted(touched)[:5] or 'all'})")
+
+
+def _gql_mutation_done():
+    with _GQL_CACHE_LOCK:
+        _GQL_CACHE_GEN["gen"] += 1
+        _GQL_CACHE_GEN["mutating"] -= 1
+
+
+def run_monday_graphql(query, variables=None, api_key=None, cache=False):
+    """Execute a raw GraphQL query against Monday.com and return parsed JSON.
+
+    cache=True serves/stores non-mutation results from the short-TTL read cache.
+    """
     key = api_key or MONDAY_API_KEY
     if not key:
         return {"error": "MONDAY_API_KEY not configured and no api_key provided"}
+    is_mutation = bool(_GQL_MUTATION_RE.match(query or ""))
+    if is_mutation:
+        _gql_cache_invalidate(query, variables, key)
+    elif cache:
+        ck = _gql_cache_key(query, variables, key)
+        with _GQL_CACHE_LOCK:
+            entry = _GQL_CACHE.get(ck)
+            if entry and entry["exp"] > time.time():
+                _GQL_CACHE.move_to_end(ck)
+                _GQL_CACHE_STATS["hits"] += 1
+                print(f"[MONDAY-GQL] cache hit (hits={_GQL_CACHE_STATS['hits']} "
+                      f"misses={_GQL_CACHE_STATS['misses']})")
+                return json.loads(entry["data"])
+            _GQL_CACHE.pop(ck, None)
+            _GQL_CACHE_STATS["misses"] += 1
+            gen = _GQL_CACHE_GEN["gen"]
     start_time = time.time()
     try:
         payload = {"query": query}
@@ -2410,11 +2714,32 @@ def run_monday_graphql(query, variables=None, api_key=None):
                                   "`text` is the status label. Use `creator { id name }` not `creator_name`, "
                                   "and `items_page { items { ... } }` not a bare `items` field on a board.")
             return result
-        return data.get("data", data)
+        result = data.get("data", data)
+        if cache and not is_mutation:
+            # Stored serialised so callers can't mutate a shared cached object.
+            blob = json.dumps(result)
+            with _GQL_CACHE_LOCK:
+                stored = _GQL_CACHE_GEN["gen"] == gen and not _GQL_CACHE_GEN["mutating"]
+                if stored:
+                    while len(_GQL_CACHE) >= MONDAY_GQL_CACHE_MAX:
+                        _GQL_CACHE.popitem(last=False)
+                    _GQL_CACHE[ck] = {
+                        "exp": time.time() + MONDAY_GQL_CACHE_TTL,
+                        "data": blob,
+                        "ids": _gql_ids(query, variables, blob),
+                        "key_hash": hashlib.sha256(key.encode()).hexdigest(),
+                    }
+            print(f"[MONDAY-GQL] cache miss {'stored' if stored else 'not stored (raced a mutation)'} "
+                  f"(hits={_GQL_CACHE_STATS['hits']} misses={_GQL_CACHE_STATS['misses']} "
+                  f"size={len(_GQL_CACHE)})")
+        return result
     except requests.exceptions.Timeout:
         return {"error": "Monday.com API timed out"}
     except Exception as e:
         return {"error": str(e)}
+    finally:
+        if is_mutation:
+            _gql_mutation_done()
 # ───────────────────────────────────────────────────────────────────────────
 
 # ── Google Chat MCP helper ──────────────────────────────────────────────────
@@ -3575,6 +3900,124 @@ TOOL_LABELS = {
     "analyze_image":                   "Reading image with Claude",
 }
 
+# ── Parallel tool dispatch ───────────────────────────────────────────────────
+# A single model round often asks for several independent lookups at once
+# ("crawl the boards + pull GSC + pull Ads"). Running them one after another made
+# a round cost the SUM of its tools and pushed long chats into the API Gateway
+# ceiling. They now fan out on a bounded pool so a round costs its slowest tool.
+# Writes (Monday mutations, Chat posts) share one ordered lane so their side
+# effects still land in the order the model issued them.
+CHAT_TOOL_WORKERS = int(os.environ.get('CHAT_TOOL_WORKERS', '6'))
+TOOL_TIMEOUT_DEFAULT = int(os.environ.get('CHAT_TOOL_TIMEOUT_SEC', '90'))
+TOOL_TIMEOUTS = {                      # seconds; tools that legitimately run long
+    "get_ads_mcc_change_sweep": 240,
+    "get_ads_change_history":   150,
+    "get_seranking_report":     180,
+    "list_mcp_tools":           30,
+    "save_memory_note":         5,
+}
+
+
+def _tool_is_write(tool_name, tool_input):
+    """True for tool calls with side effects (they must not be reordered)."""
+    if tool_name == "send_message":
+        return True
+    if tool_name == "monday_graphql":
+        return bool(_GQL_MUTATION_RE.match((tool_input or {}).get("query") or ""))
+    return False
+
+
+def _dispatch_tool_round(tool_blocks, execute):
+    """Run one round's tool_use blocks → (tool_results, log_lines), both in
+    tool_use order. Reads run concurrently on the pool; writes run sequentially
+    in one lane on their own thread, so they never queue behind a hung read. A
+    call that raises, or a read that overruns its timeout, becomes an is_error
+    tool_result so the model can recover instead of the whole turn failing. A
+    read's timeout counts from when it starts running, not from when it was
+    queued. The write lane is never timed out: an abandoned Monday mutation or
+    Chat send would keep running, and a "timed out — retry" would duplicate it."""
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+    if not tool_blocks:
+        return [], []
+
+    def _error(block, message):
+        return [{
+            "type":        "tool_result",
+            "tool_use_id": block.get("id"),
+            "content":     json.dumps({"error": message}),
+            "is_error":    True,
+        }], []
+
+    def _budget(i):
+        return TOOL_TIMEOUTS.get(tool_blocks[i].get("name"), TOOL_TIMEOUT_DEFAULT)
+
+    outputs = {}      # block index -> (tool_results, log_lines)
+    started_at = {}   # block index -> when its call actually began running
+
+    def _run_lane(lane):
+        for i in lane:
+            block = tool_blocks[i]
+            started_at[i] = time.time()
+            try:
+                outputs[i] = execute(block)
+            except Exception as e:
+                print(f"[TOOLS] {block.get('name')} raised: {e}\n{traceback.format_exc()}")
+                outputs[i] = _error(block, f"{block.get('name')} failed: {e}")
+
+    writes = [i for i, b in enumerate(tool_blocks) if _tool_is_write(b.get("name"), b.get("input"))]
+    reads = [i for i in range(len(tool_blocks)) if i not in writes]
+
+    timed_out = set()
+    started = time.time()
+    write_ex = ThreadPoolExecutor(max_workers=1) if writes else None
+    workers = max(1, min(CHAT_TOOL_WORKERS, len(reads)))
+    read_ex = ThreadPoolExecutor(max_workers=workers) if reads else None
+    try:
+        write_fut = write_ex.submit(_run_lane, writes) if writes else None
+        read_futs = {i: read_ex.submit(_run_lane, [i]) for i in reads}
+        pending = set(reads)
+        while pending:
+            pending = {i for i in pending if not read_futs[i].done()}
+            now = time.time()
+            for i in sorted(pending):
+                if i in started_at and now >= started_at[i] + _budget(i):
+                    print(f"[TOOLS] {tool_blocks[i].get('name')} timed out after {_budget(i)}s")
+                    timed_out.add(i)
+            pending -= timed_out
+            if not pending:
+                break
+            running = [i for i in pending if i in started_at]
+            stuck = sum(1 for i in timed_out if not read_futs[i].done())
+            if not running and stuck >= workers:
+                # Every worker is held by an overrun read, so these would never start.
+                print(f"[TOOLS] {[tool_blocks[i].get('name') for i in sorted(pending)]} never started "
+                      "— all workers held by timed-out calls")
+                timed_out |= pending
+                break
+            deadline = min((started_at[i] + _budget(i) for i in running), default=now + 0.05)
+            wait([read_futs[i] for i in pending], timeout=max(0.05, deadline - now),
+                 return_when=FIRST_COMPLETED)
+        if write_fut:
+            write_fut.result()   # writes always run to completion (see docstring)
+    finally:
+        # Never block the turn on a straggling read; it finishes (and is discarded) in the background.
+        for ex in (read_ex, write_ex):
+            if ex:
+                ex.shutdown(wait=False, cancel_futures=True)
+
+    tool_results, log_lines = [], []
+    for i, block in enumerate(tool_blocks):
+        name = block.get("name")
+        res, log = (None if i in timed_out else outputs.get(i)) or _error(
+            block, f"{name} timed out after {TOOL_TIMEOUTS.get(name, TOOL_TIMEOUT_DEFAULT)}s — "
+                   "retry with a narrower request")
+        tool_results.extend(res)
+        log_lines.extend(log)
+    print(f"[TOOLS] Round ran {len(tool_blocks)} call(s) in {len(reads) + bool(writes)} lane(s) "
+          f"in {time.time() - started:.2f}s")
+    return tool_results, log_lines
+
 # ── DeepSeek (OpenAI-compatible) provider adapter ────────────────────────────
 # The agentic loop below is written entirely against Anthropic's wire format
 # (content blocks, tool_use/tool_result, stop_reason). DeepSeek speaks the
@@ -4884,22 +5327,28 @@ def claude_chat_with_tools(body):
                 # Add assistant's full response (including tool_use blocks) to history
                 messages.append({"role": "assistant", "content": content_blocks})
 
-                # Build the tool_result message with one result per tool_use block
-                tool_results = []
-                for block in content_blocks:
-                    if block.get("type") != "tool_use":
-                        continue
-
+                # Record every call + beacon real progress before executing, so
+                # the browser shows what is running right now.
+                tool_blocks = [b for b in content_blocks if b.get("type") == "tool_use"]
+                _round_labels = []
+                for block in tool_blocks:
+                    _tool_label = TOOL_LABELS.get(block["name"], block["name"].replace('_', ' ').title())
+                    tool_events.append({"name": block["name"], "label": _tool_label})
+                    if _tool_label not in _round_labels:
+                        _round_labels.append(_tool_label)
+                _report_progress(" · ".join(_round_labels))
+
+                def _execute_tool(block):
+                    """Run one tool_use block → (tool_results, tool_call_log) for it.
+                    Calls in a round run concurrently, so each collects into its own
+                    lists (shadowing the turn-level log) and the dispatcher merges
+                    them back in tool_use order."""
+                    tool_results = []
+                    tool_call_log = []
                     tool_id    = block.get("id", f"call_{int(time.time())}")
                     tool_name  = block["name"]
                     tool_input = block.get("input", {})
 
-                    # Record the call + beacon real progress before executing,
-                    # so the browser shows what is running right now.
-                    _tool_label = TOOL_LABELS.get(tool_name, tool_name.replace('_', ' ').title())
-                    tool_events.append({"name": tool_name, "label": _tool_label})
-                    _report_progress(_tool_label)
-
                     # ── Google Chat opt-in gate ─────────────────────────────
                     # No spaces picked in Settings = the user doesn't want Chat
                     # searched. Return a sentinel that stops the model and makes it
@@ -4922,7 +5371,7 @@ def claude_chat_with_tools(body):
                                 ),
                             }),
                         })
-                        continue
+                        return tool_results, tool_call_log
 
                     # ── Google Chat space scope ─────────────────────────────
                     # A selection is a whitelist, not a hint: refuse any call that
@@ -4938,14 +5387,14 @@ def claude_chat_with_tools(body):
                                 "tool_use_id": tool_id,
                                 "content":     json.dumps(_gchat_denied(_target, GCHAT_ALLOWED_SPACES)),
                             })
-                            continue
+                            return tool_results, tool_call_log
 
                     if tool_name == "monday_graphql":
                         gql_query = tool_input.get("query", "")
                         print(f"[TOOLS] Executing monday_graphql: {gql_query[:120]}...")
                         tool_call_log.append(f"▸ {gql_query[:100].strip()}{'…' if len(gql_query) > 100 else ''}")
 
-                        result_data = run_monday_graphql(gql_query, api_key=body.get('monday_api_key'))
+                        result_data = run_monday_graphql(gql_query, api_key=body.get('monday_api_key'), cache=True)
                         result_str  = json.dumps(result_data)
 
                         # Truncate very large payloads to prevent blowing token budget
@@ -5144,7 +5593,7 @@ def claude_chat_with_tools(body):
                                 "content": json.dumps({"error": error_msg}),
                                 "is_error": True
                             })
-                            continue
+                            return tool_results, tool_call_log
                         
                         ser_headers = {"Authorization": f"Token {SERANKING_TOKEN}", "Content-Type": "application/json"}
                         
@@ -5209,7 +5658,7 @@ def claude_chat_with_tools(body):
                                 "content": json.dumps({"error": f"Error: Site ID '{site_id}' looks like a Monday.com Item ID, not a SE Ranking Site ID. Use the site_id from 'loaded_seranking_campaigns'."}),
                                 "is_error": True
                             })
-                            continue
+                            return tool_results, tool_call_log
 
                         ser_headers = {"Authorization": f"Token {SERANKING_TOKEN}", "Content-Type": "application/json"}
                         try:
@@ -5700,16 +6149,23 @@ def claude_chat_with_tools(body):
                             "is_error":    True
                         })
 
+                    return tool_results, tool_call_log
+
+                # Build the tool_result message with one result per tool_use block
+                tool_results, _round_log = _dispatch_tool_round(tool_blocks, _execute_tool)
+                tool_call_log.extend(_round_log)
+
                 # ── Central safety cap ────────────────────────────────────
                 # Every tool result is capped here so a single large payload
                 # (e.g. full GSC/GA4/SE Ranking coverage) can't blow the next
                 # round's request past the 200k-token context ceiling. Only
                 # monday_graphql truncated itself before; this covers ALL tools.
                 TOOL_RESULT_CHAR_LIMIT = 40000   # ~10k tokens per result
+                _tool_names = {b.get("id"): b.get("name") for b in tool_blocks}
                 for _tr in tool_results:
                     _c = _tr.get("content")
                     if isinstance(_c, str) and len(_c) > TOOL_RESULT_CHAR_LIMIT:
-                        print(f"[TOOLS] Capping {block.get('name','result')} result ({len(_c)} chars)")
+                        print(f"[TOOLS] Capping {_tool_names.get(_tr.get('tool_use_id'), 'result')} result ({len(_c)} chars)")
                         _tr["content"] = _c[:TOOL_RESULT_CHAR_LIMIT] + "\n... [result truncated to fit token budget — narrow the date range, fields, or row count]"
 
                 # Report any failed tool calls to Google Chat (covers ALL tools;
@@ -1,7 +1,8 @@
 import json
 import os
-from datetime import datetime
-from pymongo import MongoClient
+from datetime import datetime, timedelta
+from pymongo import MongoClient, ReturnDocument, ASCENDING
+from pymongo.errors import DuplicateKeyError
 import bson
 from bson import ObjectId
 
@@ -12,11 +13,32 @@ MONGODB_DATABASE = os.environ.get('MONGODB_DATABASE', 'recruitment')
 # Global client to reuse connection across warm Lambda invocations
 client = None
 
+CANDIDATE_INDEXES = [
+    # Keyset pagination (handle_get_candidates): per job, and across the repository.
+    ([("jobId", ASCENDING), ("createdAt", ASCENDING), ("_id", ASCENDING)], {"name": "job_created"}),
+    ([("createdAt", ASCENDING), ("_id", ASCENDING)], {"name": "created"}),
+    ([("id", ASCENDING)], {"name": "cand_id"}),
+]
+_indexes_ready = False
+
+def _ensure_indexes(db):
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    _indexes_ready = True
+    for keys, opts in CANDIDATE_INDEXES:
+        try:
+            db.candidates.create_index(keys, **opts)
+        except Exception as e:
+            print(f"Index {opts['name']} not created: {str(e)}")
+
 def get_db():
     global client
     if client is None:
         client = MongoClient(MONGODB_URI)
-    return client[MONGODB_DATABASE]
+    db = client[MONGODB_DATABASE]
+    _ensure_indexes(db)
+    return db
 
 def lambda_handler(event, context):
     # Enable CORS
@@ -81,6 +103,10 @@ def lambda_handler(event, context):
             return handle_bulk_delete_candidates(db, data.get('ids'), current_user, headers)
         elif action == 'bulk_restore_candidates':
             return handle_bulk_restore_candidates(db, data.get('ids'), current_user, headers)
+        elif action == 'rebuild_stats':
+            if not _rebuild_stats(db):
+                return response(409, "A counter rebuild is already running", headers)
+            return response(200, {"success": True}, headers)
         else:
             return response(400, f"Unknown action: {action}", headers)
 
@@ -118,19 +144,179 @@ def log_audit(db, action, target_type, target_id, user, details=""):
     except Exception as e:
         print(f"Log Error: {str(e)}")
 
+# --- Candidate counters ---
+# Per-job counters (job_stats, one doc per jobId) and a repository-wide doc
+# (dashboard_stats) kept in step by the candidate write handlers, so job lists,
+# dashboards and candidate totals never count the candidates collection per view.
+# Built from the collection the first time they're needed; `rebuild_stats`
+# recomputes them should they ever drift. A rebuild $merges fresh per-job rows over
+# the old ones (no window where job_stats is empty) under a lock doc in
+# dashboard_stats, so concurrent cold starts don't all rebuild at once.
+STATS_ID = 'candidates'
+STATS_LOCK_ID = 'candidates:rebuild'
+STATS_LOCK_SECS = 300   # a rebuild lock older than this belongs to a dead builder
+_COUNTED_FIELDS = ("jobId", "status", "aiScore", "deleted")
+_stats_ready = False
+
+def _contrib(doc):
+    """Counters a stored candidate contributes to ({} for no document)."""
+    if not doc:
+        return {}
+    counts = {"total": 1}
+    if doc.get('deleted') is not True:
+        counts["applicants"] = 1
+        if doc.get('status') == 'Shortlisted':
+            counts["shortlisted"] = 1
+        score = doc.get('aiScore')
+        if isinstance(score, (int, float)) and not isinstance(score, bool) and score > 80:
+            counts["highQuality"] = 1
+    return counts
+
+def _ensure_stats(db):
+    global _stats_ready
+    if not _stats_ready:
+        _stats_ready = db.dashboard_stats.find_one({"_id": STATS_ID}, {"_id": 1}) is not None or _rebuild_stats(db)
+    return _stats_ready
+
+def _take_rebuild_lock(db):
+    """Conditionally insert the rebuild lock doc; returns its stamp, or None while
+    another live rebuild holds it."""
+    now = datetime.utcnow()
+    try:
+        db.dashboard_stats.insert_one({"_id": STATS_LOCK_ID, "at": now})
+        return now
+    except DuplicateKeyError:
+        pass
+    stale = now - timedelta(seconds=STATS_LOCK_SECS)
+    taken = db.dashboard_stats.find_one_and_update(
+        {"_id": STATS_LOCK_ID, "at": {"$lt": stale}}, {"$set": {"at": now}})
+    return now if taken else None
+
+def _rebuild_stats(db):
+    """Recompute the counters from the candidates collection. Returns False if another
+    rebuild is already running."""
+    stamp = _take_rebuild_lock(db)
+    if stamp is None:
+        return False
+    live = {"$ne": ["$deleted", True]}
+    counts = {
+        "total": {"$sum": 1},
+        "applicants": {"$sum": {"$cond": [live, 1, 0]}},
+        "shortlisted": {"$sum": {"$cond": [{"$and": [live, {"$eq": ["$status", "Shortlisted"]}]}, 1, 0]}},
+        "highQuality": {"$sum": {"$cond": [{"$and": [live, {"$isNumber": "$aiScore"},
+                                                     {"$gt": ["$aiScore", 80]}]}, 1, 0]}},
+    }
+    try:
+        db.candidates.aggregate([
+            {"$group": dict(counts, _id="$jobId")},
+            {"$match": {"_id": {"$ne": None}}},
+            {"$set": {"rebuiltAt": stamp}},
+            {"$merge": {"into": "job_stats", "on": "_id",
+                        "whenMatched": "replace", "whenNotMatched": "insert"}},
+        ])
+        # Rows from an earlier rebuild that this one didn't replace are jobs with no
+        # candidates left. Counter updates clear rebuiltAt, so a row written since is kept.
+        db.job_stats.delete_many({"rebuiltAt": {"$lt": stamp}})
+        totals = next(db.candidates.aggregate([{"$group": dict(counts, _id=None)}]), None) or {}
+        db.dashboard_stats.replace_one(
+            {"_id": STATS_ID},
+            {**{k: totals.get(k, 0) for k in counts}, "rebuiltAt": stamp}, upsert=True)
+    finally:
+        db.dashboard_stats.delete_one({"_id": STATS_LOCK_ID, "at": stamp})
+    return True
+
+def _apply_counts(db, changes):
+    """Adjust the counters for (before, after) candidate states; None = no document.
+    Writers call _ensure_stats before writing, so a first-time build can't count the
+    write and then have it applied again here."""
+    if not _stats_ready:
+        return
+    total, per_job = {}, {}
+    for before, after in changes:
+        for doc, sign in ((before, -1), (after, 1)):
+            for k, n in _contrib(doc).items():
+                total[k] = total.get(k, 0) + sign * n
+                if doc.get('jobId') is not None:
+                    job = per_job.setdefault(doc['jobId'], {})
+                    job[k] = job.get(k, 0) + sign * n
+    try:
+        for job_id, inc in per_job.items():
+            inc = {k: n for k, n in inc.items() if n}
+            if inc:
+                db.job_stats.update_one({"_id": job_id}, {"$inc": inc, "$unset": {"rebuiltAt": ""}},
+                                        upsert=True)
+        inc = {k: n for k, n in total.items() if n}
+        if inc:
+            db.dashboard_stats.update_one({"_id": STATS_ID}, {"$inc": inc})
+    except Exception as e:
+        print(f"Counter update failed: {str(e)}")
+
+def _set_candidate(db, query, fields, upsert=False):
+    """$set `fields` on one candidate and keep the counters in step. Returns the prior
+    counted fields (None if the candidate didn't exist)."""
+    _ensure_stats(db)
+    before = db.candidates.find_one_and_update(
+        query, {"$set": fields}, upsert=upsert,
+        projection={f: 1 for f in _COUNTED_FIELDS}, return_document=ReturnDocument.BEFORE)
+    if before is not None or upsert:
+        after = dict(before or {}, **{f: fields[f] for f in _COUNTED_FIELDS if f in fields})
+        _apply_counts(db, [(before, after)])
+    return before
+
+def _set_deleted_many(db, ids, deleted):
+    """Bulk soft-delete/restore with counter upkeep; returns the update result."""
+    query = {"id": {"$in": ids}}
+    _ensure_stats(db)
+    before = list(db.candidates.find(query, {f: 1 for f in _COUNTED_FIELDS}))
+    result = db.candidates.update_many(query, {"$set": {"deleted": deleted}})
+    _apply_counts(db, [(b, dict(b, deleted=deleted)) for b in before])
+    return result
+
+# --- Candidate list cursors ---
+# Candidates page by (createdAt, _id) ascending — `id` is a string or a float depending
+# on the writer, so _id is the tie-breaker. createdAt is a datetime when the server
+# stamped it but whatever the client sent on an upsert, and a Mongo range only matches
+# its own BSON type, so "after the cursor" also takes every type sorting after it.
+_CREATED_TYPES = ("null", "number", "string", "date")   # BSON sort order
+
+def _candidate_cursor(doc):
+    v = doc.get('createdAt')
+    if isinstance(v, datetime):
+        kind, v = "date", v.isoformat()
+    elif isinstance(v, str):
+        kind = "string"
+    elif isinstance(v, (int, float)) and not isinstance(v, bool):
+        kind = "number"
+    else:
+        kind, v = "null", None
+    return json.dumps([kind, v, str(doc['_id'])])
+
+def _after_cursor(cursor):
+    kind, value, oid = json.loads(cursor)
+    oid = ObjectId(oid)
+    if kind == "date":
+        value = datetime.fromisoformat(value)
+    clauses = [{"createdAt": value, "_id": {"$gt": oid}}]
+    if kind != "null":
+        clauses.append({"createdAt": {"$gt": value}})
+    later = list(_CREATED_TYPES[_CREATED_TYPES.index(kind) + 1:])
+    if later:
+        clauses.append({"createdAt": {"$type": later}})
+    return {"$or": clauses}
+
 # --- Handlers ---
 
 def handle_get_jobs(db, headers):
     jobs = list(db.jobs.find({"deleted": {"$ne": True}}))
+    _ensure_stats(db)
+    ids = [job.get('id') for job in jobs if job.get('id')]
+    counts = {c['_id']: c for c in db.job_stats.find({"_id": {"$in": ids}})}
     for job in jobs:
         jid = job.get('id')
         if jid:
-            # Count applicants (not deleted)
-            count = db.candidates.count_documents({"jobId": jid, "deleted": {"$ne": True}})
-            job['applicants'] = count
-            # Count shortlisted (not deleted)
-            shortlisted = db.candidates.count_documents({"jobId": jid, "status": "Shortlisted", "deleted": {"$ne": True}})
-            job['shortlisted'] = shortlisted
+            # Applicants / shortlisted (not deleted), from the per-job counters
+            job['applicants'] = counts.get(jid, {}).get('applicants', 0)
+            job['shortlisted'] = counts.get(jid, {}).get('shortlisted', 0)
     return response(200, jobs, headers)
 
 def handle_upsert_job(db, job_data, user, headers):
@@ -162,6 +348,10 @@ def handle_get_candidates(db, data, headers):
     page = int(data.get('page', 1))
     limit = int(data.get('limit', 20))
     skip = (page - 1) * limit
+    # Passing `cursor` (empty for the first page) switches to keyset pagination: each
+    # page resumes from the previous page's last candidate on the job_created/created
+    # index instead of skipping over every earlier one. The reply carries nextCursor.
+    paged = 'cursor' in data
 
     query = {}
     if not data.get('includeDeleted'):
@@ -181,8 +371,28 @@ def handle_get_candidates(db, data, headers):
         "hopperDetails": 0
     }
     
-    total = db.candidates.count_documents(query)
+    if _ensure_stats(db):
+        counts = (db.job_stats.find_one({"_id": str(job_id)}) if job_id
+                  else db.dashboard_stats.find_one({"_id": STATS_ID})) or {}
+        total = counts.get('total' if data.get('includeDeleted') else 'applicants', 0)
+    else:
+        total = db.candidates.count_documents(query)
     
+    if paged:
+        if data.get('cursor'):
+            try:
+                query.update(_after_cursor(data['cursor']))
+            except (ValueError, TypeError, bson.errors.InvalidId):
+                return response(400, "Invalid cursor", headers)
+        candidates = list(db.candidates.find(query, projection)
+                          .sort([("createdAt", 1), ("_id", 1)]).limit(limit))
+        return response(200, {
+            "candidates": candidates,
+            "total": total,
+            "limit": limit,
+            "nextCursor": _candidate_cursor(candidates[-1]) if len(candidates) == limit else None
+        }, headers)
+
     pipeline = [
         {"$match": query},
         {"$skip": skip},
@@ -207,23 +417,18 @@ def handle_get_candidate_detail(db, cand_id, headers):
         return response(404, {"error": "Candidate not found"}, headers)
 
 def handle_get_dashboard_stats(db, headers):
-    total_applicants = db.jobs.aggregate([
-        {"$match": {"deleted": {"$ne": True}}},
-        {"$group": {"_id": None, "total": {"$sum": "$applicants"}}}
-    ])
-    total_applicants_val = 0
-    for res in total_applicants:
-        total_applicants_val = res['total']
-
-    high_quality_count = db.candidates.count_documents({
-        "deleted": {"$ne": True},
-        "aiScore": {"$gt": 80}
-    })
+    # Applicants across live jobs, from the per-job counters; jobs and job_stats are both
+    # one small doc per job, so none of this reads candidates.
+    _ensure_stats(db)
+    job_ids = [j['id'] for j in db.jobs.find({"deleted": {"$ne": True}}, {"id": 1}) if j.get('id')]
+    total_applicants_val = sum(c.get('applicants', 0) for c in
+                               db.job_stats.find({"_id": {"$in": job_ids}}, {"applicants": 1}))
+    stats = db.dashboard_stats.find_one({"_id": STATS_ID}) or {}
 
     return response(200, {
         "totalApplicants": total_applicants_val,
-        "highQualityLeads": high_quality_count,
-        "totalJobs": db.jobs.count_documents({"deleted": {"$ne": True}})
+        "highQualityLeads": stats.get('highQuality', 0),
+        "totalJobs": len(job_ids)
     }, headers)
 
 def handle_add_candidate(db, cand_data, user, headers):
@@ -231,7 +436,9 @@ def handle_add_candidate(db, cand_data, user, headers):
     cand_data['id'] = cand_id
     cand_data['deleted'] = False
     cand_data['createdAt'] = datetime.utcnow()
+    _ensure_stats(db)
     db.candidates.insert_one(cand_data)
+    _apply_counts(db, [(None, cand_data)])
     log_audit(db, "add", "candidate", cand_id, user, f"Added candidate: {cand_data.get('name')}")
     return response(200, {"success": True, "candidate": cand_data}, headers)
 
@@ -239,12 +446,12 @@ def handle_update_candidate(db, cand_data, user, headers):
     cand_id = cand_data.get('id')
     if '_id' in cand_data:
         del cand_data['_id']
-    db.candidates.update_one({"id": cand_id}, {"$set": cand_data})
+    _set_candidate(db, {"id": cand_id}, cand_data)
     log_audit(db, "update", "candidate", cand_id, user, f"Updated candidate: {cand_data.get('name')}")
     return response(200, {"success": True}, headers)
 
 def handle_delete_candidate(db, cand_id, user, headers):
-    db.candidates.update_one({"id": cand_id}, {"$set": {"deleted": True}})
+    _set_candidate(db, {"id": cand_id}, {"deleted": True})
     log_audit(db, "soft_delete", "candidate", cand_id, user, f"Candidate soft-deleted ID: {cand_id}")
     return response(200, {"success": True}, headers)
 
@@ -261,16 +468,13 @@ def handle_bulk_delete_candidates(db, ids, user, headers):
         except:
             pass
 
-    result = db.candidates.update_many(
-        {"id": {"$in": typed_ids}},
-        {"$set": {"deleted": True}}
-    )
+    result = _set_deleted_many(db, typed_ids, True)
     
     log_audit(db, "bulk_soft_delete", "candidate", ",".join(map(str, ids)), user, f"Batch soft-deleted {result.modified_count} candidates")
     return response(200, {"success": True, "count": result.modified_count}, headers)
 
 def handle_restore_candidate(db, cand_id, user, headers):
-    db.candidates.update_one({"id": cand_id}, {"$set": {"deleted": False}})
+    _set_candidate(db, {"id": cand_id}, {"deleted": False})
     log_audit(db, "restore", "candidate", cand_id, user, f"Candidate restored ID: {cand_id}")
     return response(200, {"success": True}, headers)
 
@@ -287,10 +491,7 @@ def handle_bulk_restore_candidates(db, ids, user, headers):
         except:
             pass
 
-    result = db.candidates.update_many(
-        {"id": {"$in": typed_ids}},
-        {"$set": {"deleted": False}}
-    )
+    result = _set_deleted_many(db, typed_ids, False)
     
     log_audit(db, "bulk_restore", "candidate", "batch", user, f"Batch restored {result.modified_count} candidates (matched {result.matched_count})")
     return response(200, {"success": True, "count": result.modified_count, "matched": result.matched_count}, headers)
@@ -300,7 +501,7 @@ def handle_upsert_candidate(db, cand_data, user, headers):
     if cand_id:
         # Avoid overwriting deleted flag if not provided
         if '_id' in cand_data: del cand_data['_id']
-        db.candidates.update_one({"id": cand_id}, {"$set": cand_data}, upsert=True)
+        _set_candidate(db, {"id": cand_id}, cand_data, upsert=True)
         log_audit(db, "update", "candidate", cand_id, user, f"Updated candidate: {cand_data.get('name')}")
     else:
         return handle_add_candidate(db, cand_data, user, headers)
@@ -0,0 +1,117 @@
+"""Benchmark the crawler.py engine against a local synthetic site.
+
+Serves N interlinked pages (plus robots.txt and a sitemap) from a local HTTP/1.1
+keep-alive server with a fixed per-request latency standing in for the network,
+then crawls it at each requested concurrency. Reports wall time, pages/s and how
+many TCP connections the server saw, and checks every run yields the same records.
+
+    python scripts/crawler_bench.py --pages 300 --latency 50 --concurrency 1,8,32
+
+Needs the crawler's own dependencies (requests, beautifulsoup4). The UI/UX review
+is skipped: it calls OpenAI and would dominate the timings.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import crawler  # noqa: E402
+
+
+def build_site(base, pages, fanout, seed):
+    rnd = random.Random(seed)
+    paths = [f'/page/{i}/' for i in range(pages)]
+    site = {}
+    for i, path in enumerate(paths):
+        # A chain through every page keeps them all reachable; the rest are random.
+        targets = {paths[(i + 1) % pages]} | set(rnd.sample(paths, min(fanout, pages)))
+        links = ''.join(f'<a href="{base}{t}">link</a>' for t in sorted(targets))
+        site[path] = (
+            f'<html><head><title>Page {i}</title>'
+            f'<meta name="description" content="Description {i}">'
+            f'<link rel="canonical" href="{base}{path}">'
+            f'<link rel="alternate" hreflang="en-sg" href="{base}{path}"></head>'
+            f'<body><h1>Heading {i}</h1><h2>Sub {i % 7}</h2><img src="/i.png" alt="img {i % 5}">'
+            f'<p>{"lorem ipsum " * 50}</p>{links}<script>var x = {i};</script></body></html>'
+        ).encode()
+    site['/'] = (f'<html><head><title>Home</title></head><body>'
+                 f'<a href="{base}{paths[0]}">start</a></body></html>').encode()
+    site['/robots.txt'] = f'User-agent: *\nAllow: /\nSitemap: {base}/sitemap.xml\n'.encode()
+    site['/sitemap.xml'] = ('<?xml version="1.0" encoding="UTF-8"?>'
+                            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                            + ''.join(f'<url><loc>{base}{p}</loc></url>' for p in paths[::10])
+                            + '</urlset>').encode()
+    return site
+
+
+def serve(pages, fanout, latency, seed):
+    stats = {'connections': 0, 'requests': 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'   # keep-alive, so connection reuse shows up
+
+        def setup(self):
+            super().setup()
+            with lock:
+                stats['connections'] += 1
+
+        def do_GET(self):
+            with lock:
+                stats['requests'] += 1
+            time.sleep(latency)
+            body = site.get(self.path.split('?')[0])
+            self.send_response(200 if body is not None else 404)
+            body = body if body is not None else b'<html><title>Not found</title></html>'
+            ctype = 'application/xml' if self.path.endswith('.xml') else 'text/html; charset=utf-8'
+            self.send_header('Content-Type', ctype)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    site = build_site(base, pages, fanout, seed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, base, stats
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    ap.add_argument('--pages', type=int, default=200)
+    ap.add_argument('--fanout', type=int, default=8, help='random links per page')
+    ap.add_argument('--latency', type=float, default=50, help='server latency per request, ms')
+    ap.add_argument('--concurrency', default='1,8,32', help='comma-separated levels to run')
+    ap.add_argument('--seed', type=int, default=7)
+    args = ap.parse_args()
+
+    server, base, stats = serve(args.pages, args.fanout, args.latency / 1000, args.seed)
+    reference = None
+    print(f'{"concurrency":>11} {"pages":>6} {"seconds":>8} {"pages/s":>8} {"requests":>9} {"connections":>11}')
+    for level in [int(c) for c in args.concurrency.split(',')]:
+        stats.update(connections=0, requests=0)
+        t0 = time.perf_counter()
+        data = asyncio.run(crawler.crawl_site(base + '/', args.pages, concurrency=level,
+                                              per_host=level, delay=0, uiux=False))
+        secs = time.perf_counter() - t0
+        print(f'{level:>11} {len(data):>6} {secs:>8.2f} {len(data) / secs:>8.1f} '
+              f'{stats["requests"]:>9} {stats["connections"]:>11}')
+        if reference is None:
+            reference = data
+        elif data != reference:
+            diff = sorted(set(data) ^ set(reference)) or [u for u in data if data[u] != reference.get(u)]
+            print(f'  records differ from the first run, e.g. {diff[:3]}')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Build the chatbot_ai_db.conversations indexes (deploy step).
+
+chatbot_persistence_lambda.py used to create these from get_db() on every cold
+start; index builds (the unique conv_user key especially) don't belong in the
+request path, so they are created here once per deploy instead. The index list
+is CONVERSATION_INDEXES from the Lambda itself, so the two cannot drift.
+
+  conv_user     unique (conversationId, userId) — the save upsert key
+  conv_guard    covered read for the save guards (_stored_copies)
+  user_history  covered read for the history sidebar
+
+Reports which indexes are missing and, for conv_user, any duplicate
+(conversationId, userId) pairs that would make the unique build fail — those
+must be merged by hand first. Run with --apply to create what is missing.
+Needs MONGODB_URI in the environment. create_index is a no-op for an index that
+already exists, so re-running is safe.
+"""
+import os, sys
+import certifi
+from pymongo import MongoClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from chatbot_persistence_lambda import MONGODB_DATABASE, CONVERSATION_INDEXES
+
+APPLY = '--apply' in sys.argv
+
+uri = os.environ.get('MONGODB_URI')
+if not uri:
+    sys.exit('MONGODB_URI is not set')
+coll = MongoClient(uri, serverSelectionTimeoutMS=5000, tlsCAFile=certifi.where())[MONGODB_DATABASE].conversations
+
+existing = coll.index_information()
+missing = [(keys, opts) for keys, opts in CONVERSATION_INDEXES if opts['name'] not in existing]
+for keys, opts in CONVERSATION_INDEXES:
+    print('%-13s %s' % (opts['name'], 'present' if opts['name'] in existing else 'MISSING'))
+
+blocked = False
+if any(opts.get('unique') for _, opts in missing):
+    dupes = list(coll.aggregate([
+        {'$group': {'_id': {'c': '$conversationId', 'u': '$userId'}, 'n': {'$sum': 1}}},
+        {'$match': {'n': {'$gt': 1}}},
+        {'$limit': 20},
+    ], allowDiskUse=True))
+    for d in dupes:
+        print('  duplicate conversationId=%s userId=%s x%d' % (d['_id'].get('c'), d['_id'].get('u'), d['n']))
+    blocked = bool(dupes)
+
+if APPLY:
+    for keys, opts in missing:
+        if opts.get('unique') and blocked:
+            print('skipped %s: merge the duplicates above first' % opts['name'])
+            continue
+        coll.create_index(keys, **opts)
+        print('created %s' % opts['name'])
+
+print()
+print(('APPLIED' if APPLY else 'DRY RUN') + ': missing=%d%s'
+      % (len(missing), '  (conv_user blocked by duplicates)' if blocked else ''))